@@ -0,0 +1,71 @@
+"""Bulk evaluation of one calculator over many NDJSON or CSV input rows.
+
+Rows are read lazily from the request stream and pushed through the
+vectorised kernels CHUNK_ROWS at a time, so neither the request nor the
+response body is ever held in memory as a whole.  Every input row produces
+exactly one NDJSON result line, in input order:
+
+    {"row": 0, "status": "success", "results": {...}}
+    {"row": 1, "status": "error", "detail": "..."}
+"""
+import csv
+import json
+
+import kernels
+
+CHUNK_ROWS = 1000
+
+
+def read_rows(stream, mimetype):
+    """Yield the raw rows of a binary request body.
+
+    CSV rows come out as dicts (empty cells dropped so that field defaults
+    apply), NDJSON rows as undecoded byte lines, so that one bad line (not
+    UTF-8, not JSON) only fails its own row.
+    """
+    if mimetype == 'text/csv':
+        # Bytes that are not UTF-8 survive as lone surrogates until _decode
+        lines = (line.decode('utf-8', 'surrogateescape') for line in stream)
+        for row in csv.DictReader(lines):
+            yield {key: value for key, value in row.items() if key is not None and value not in ('', None)}
+    else:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def stream_results(name, rows):
+    """Yield NDJSON result text for ``rows``, one chunk at a time."""
+    chunk = []
+    first_row = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_ROWS:
+            yield _evaluate_chunk(name, chunk, first_row)
+            first_row += len(chunk)
+            chunk = []
+    if chunk:
+        yield _evaluate_chunk(name, chunk, first_row)
+
+
+def _evaluate_chunk(name, chunk, first_row):
+    lines = []
+    for row, (_, results, error) in enumerate(kernels.run_many(name, chunk, decode=_decode), first_row):
+        if error is None:
+            lines.append({"row": row, "status": "success", "results": results})
+        else:
+            lines.append({"row": row, "status": "error", **error})
+    return ''.join(json.dumps(line) + '\n' for line in lines)
+
+
+def _decode(row):
+    try:
+        if isinstance(row, bytes):
+            return json.loads(row.decode('utf-8'))
+        if isinstance(row, dict):
+            for value in row.values():
+                value.encode('utf-8')
+            return row
+    except UnicodeError:
+        raise ValueError("Row is not valid UTF-8") from None
+    return json.loads(row) if isinstance(row, str) else row
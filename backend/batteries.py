@@ -0,0 +1,208 @@
+"""UPS battery discharge simulation.
+
+``kernels.ups`` sizes the battery with one line (Ah = W · h / (480 V · 0.92)).
+This module steps a constant-power discharge through time instead, for
+whole arrays of scenarios at once:
+
+* every string is ``dc_bus_v / block_v`` blocks in series; the inverter
+  draws ``load / efficiency`` from the strings in parallel;
+* the cell open-circuit voltage falls linearly from ``full_v`` to
+  ``empty_v`` over the usable capacity and the terminal voltage is that
+  minus I · R, so the current rises as the battery empties;
+* charge is removed at the Peukert-equivalent rate I · (I / I_rated)^(k-1);
+* usable capacity is derated for temperatures below 25 °C and for end of
+  life (IEEE 485: 80 % → aging factor 1.25);
+* a string is exhausted when its capacity is used up, its cell voltage
+  reaches the end-of-discharge voltage, or it can no longer deliver the
+  power at all.
+
+All state is held in arrays of shape (scenarios, candidates), so thousands
+of vendor options and 1-N parallel strings advance through each time step
+together.
+"""
+import numpy as np
+
+# Per-cell defaults by chemistry
+CHEMISTRIES = {
+    #             nominal, full, empty, end of discharge (V/cell), Peukert k,
+    #             capacity loss per °C below 25 °C, block resistance × Ah (Ω·Ah)
+    'vrla': dict(cell_v=2.0, full_v=2.13, empty_v=1.85, eod_v=1.75, peukert=1.15, temp_coeff=0.008, r_ah=0.45),
+    'li-ion': dict(cell_v=3.2, full_v=3.35, empty_v=3.0, eod_v=2.8, peukert=1.03, temp_coeff=0.004, r_ah=0.25),
+}
+MAX_STRINGS = 16
+# Time steps per simulated horizon
+SIMULATION_STEPS = 500
+# Runtimes are followed up to this multiple of the required runtime (and 24 h)
+HORIZON_FACTOR = 4
+MAX_HORIZON_MIN = 24 * 60
+# Scenarios simulated in one /battery-discharge request
+MAX_SCENARIOS = 2000
+
+
+def _chemistry(chemistry, name, override):
+    """Per-scenario chemistry constant, with 0 in ``override`` meaning the default."""
+    default = np.select([chemistry == key for key in CHEMISTRIES],
+                        [params[name] for params in CHEMISTRIES.values()], np.nan)
+    return np.where(override > 0, override, default) if override is not None else default
+
+
+def cell_model(chemistry, block_v, block_ah, rated_hours, peukert, block_mohm, eod_v_per_cell,
+               temperature_c, end_of_life_pct):
+    """Per-scenario cell constants (arrays) used by ``simulate``."""
+    cell_v = _chemistry(chemistry, 'cell_v', None)
+    cells_per_block = np.round(block_v / cell_v)
+    temp_factor = np.clip(1 - _chemistry(chemistry, 'temp_coeff', None) * (25 - temperature_c), 0.1, 1.0)
+    r_block = np.where(block_mohm > 0, block_mohm / 1000, _chemistry(chemistry, 'r_ah', None) / block_ah)
+    return dict(
+        cells_per_block=cells_per_block,
+        full_v=_chemistry(chemistry, 'full_v', None),
+        empty_v=_chemistry(chemistry, 'empty_v', None),
+        eod_v=_chemistry(chemistry, 'eod_v', eod_v_per_cell),
+        peukert=_chemistry(chemistry, 'peukert', peukert),
+        r_cell=r_block / cells_per_block,
+        rated_a=block_ah / rated_hours,
+        capacity_factor=temp_factor * end_of_life_pct / 100,
+        capacity_ah=block_ah * temp_factor * end_of_life_pct / 100,
+    )
+
+
+def simulate(load_w, strings, cells, cell, horizon_s, profile=None, trace=False):
+    """Runtime (s) of ``strings`` parallel strings of ``cells`` cells each.
+
+    All arguments broadcast together; ``cell`` comes from ``cell_model``.
+    ``profile`` is an optional (end_s, load fraction) pair of arrays of a
+    piecewise-constant load, held at its last step after it ends. Runtimes
+    reaching ``horizon_s`` are reported as ``horizon_s``. With ``trace``
+    the string voltage of every step is returned as well.
+    """
+    power = load_w / strings  # W per string
+    shape = np.broadcast(power, cells, horizon_s, *cell.values()).shape
+    dt = horizon_s / SIMULATION_STEPS
+    used_ah = np.zeros(shape)
+    runtime = np.full(shape, np.nan)
+    alive = np.broadcast_to(np.isfinite(power), shape).copy()
+    volts = []
+    r_string = cells * cell['r_cell']
+    for n in range(SIMULATION_STEPS + 1):
+        load = power
+        if profile is not None:
+            step = np.minimum(np.searchsorted(profile[0], n * dt, side='right'), len(profile[0]) - 1)
+            load = power * profile[1][step]
+
+        # Constant power: P = I · (E - I · R)  →  smaller root of R·I² - E·I + P = 0
+        ocv = cells * (cell['full_v'] - (cell['full_v'] - cell['empty_v']) * used_ah / cell['capacity_ah'])
+        discriminant = ocv ** 2 - 4 * r_string * load
+        current = (ocv - np.sqrt(np.maximum(discriminant, 0))) / (2 * r_string)
+        terminal = ocv - current * r_string
+        if trace:
+            volts.append(np.where(alive, terminal, np.nan))
+
+        dead = alive & ((discriminant < 0) | (terminal <= cells * cell['eod_v']) | (used_ah >= cell['capacity_ah']))
+        runtime[dead] = np.broadcast_to(n * dt, shape)[dead]
+        alive &= ~dead
+        if n == SIMULATION_STEPS or not alive.any():
+            break
+        used_ah += current * (current / cell['rated_a']) ** (cell['peukert'] - 1) * dt / 3600
+
+    runtime = np.where(alive, np.broadcast_to(horizon_s, shape), runtime)
+    if not trace:
+        return runtime
+    volts += [np.full(shape, np.nan)] * (SIMULATION_STEPS + 1 - len(volts))
+    return runtime, np.stack(volts, axis=-1)
+
+
+def _configuration(load_kw, runtime_min, chemistry, block_v, block_ah, rated_hours, peukert, block_mohm,
+                   eod_v_per_cell, temperature_c, end_of_life_pct, dc_bus_v, inverter_efficiency, profile=None):
+    """Broadcast scenario columns into the arrays ``simulate`` needs."""
+    c = dict(zip(('load_kw', 'runtime_min', 'block_v', 'block_ah', 'rated_hours', 'peukert', 'block_mohm',
+                  'eod_v_per_cell', 'temperature_c', 'end_of_life_pct', 'dc_bus_v', 'inverter_efficiency'),
+                 np.broadcast_arrays(*(np.atleast_1d(np.asarray(column, dtype=float)) for column in (
+                     load_kw, runtime_min, block_v, block_ah, rated_hours, peukert, block_mohm, eod_v_per_cell,
+                     temperature_c, end_of_life_pct, dc_bus_v, inverter_efficiency)))))
+    chemistry = np.broadcast_to(np.asarray(chemistry, dtype=str), c['load_kw'].shape)
+    if profile is not None:
+        c['runtime_min'] = np.full(c['load_kw'].shape, profile[0][-1] / 60)
+
+    c['valid'] = ((c['load_kw'] > 0) & (c['runtime_min'] > 0) & (c['block_v'] > 0) & (c['block_ah'] > 0)
+                  & (c['rated_hours'] > 0) & (c['dc_bus_v'] >= c['block_v']) & (c['inverter_efficiency'] > 0)
+                  & (c['end_of_life_pct'] > 0) & np.isin(chemistry, list(CHEMISTRIES)))
+    c['cell'] = cell_model(chemistry, c['block_v'], c['block_ah'], c['rated_hours'], c['peukert'], c['block_mohm'],
+                           c['eod_v_per_cell'], c['temperature_c'], c['end_of_life_pct'])
+    c['blocks'] = np.round(c['dc_bus_v'] / c['block_v'])
+    c['cells'] = c['blocks'] * c['cell']['cells_per_block']
+    c['load_w'] = np.where(c['valid'], c['load_kw'] * 1000 / (c['inverter_efficiency'] / 100), np.nan)
+    c['required_s'] = c['runtime_min'] * 60
+    c['horizon_s'] = np.minimum(c['required_s'] * HORIZON_FACTOR, MAX_HORIZON_MIN * 60)
+    return c
+
+
+def discharge(load_kw, runtime_min, chemistry, block_v, block_ah, rated_hours, peukert, block_mohm, eod_v_per_cell,
+              temperature_c, end_of_life_pct, dc_bus_v, inverter_efficiency, profile=None):
+    """Smallest number of parallel strings that carries the load for the runtime.
+
+    ``profile`` (see ``simulate``) replaces the constant load, and its end
+    time the required runtime.
+    """
+    c = _configuration(load_kw, runtime_min, chemistry, block_v, block_ah, rated_hours, peukert, block_mohm,
+                       eod_v_per_cell, temperature_c, end_of_life_pct, dc_bus_v, inverter_efficiency, profile)
+    cell = c['cell']
+
+    # Pass 1: every candidate string count, only up to the required runtime
+    candidates = np.arange(1, MAX_STRINGS + 1)
+    runtime = simulate(c['load_w'][:, None], candidates, c['cells'][:, None],
+                       {key: value[:, None] for key, value in cell.items()}, c['required_s'][:, None], profile)
+    meets = runtime >= c['required_s'][:, None]
+    found = c['valid'] & meets.any(axis=1)
+    strings = np.where(found, candidates[np.argmax(meets, axis=1)], 0)
+
+    # Pass 2: full runtime of the selected configuration
+    runtime_s = simulate(c['load_w'], np.maximum(strings, 1), c['cells'], cell, c['horizon_s'], profile)
+
+    return dict(
+        valid=c['valid'],
+        found=found,
+        strings=strings,
+        blocks_per_string=c['blocks'],
+        total_blocks=strings * c['blocks'],
+        runtime_min=np.where(found, runtime_s / 60, np.nan),
+        required_runtime_min=c['runtime_min'],
+        capacity_factor=cell['capacity_factor'],
+        installed_kwh=strings * c['blocks'] * c['block_v'] * c['block_ah'] / 1000,
+        string_voltage_v=c['blocks'] * c['block_v'],
+        end_voltage_v=c['cells'] * cell['eod_v'],
+    )
+
+
+def check_scenarios(scenarios):
+    """Reject a /battery-discharge scenario list before anything is simulated."""
+    if not isinstance(scenarios, list):
+        raise ValueError("scenarios must be a list")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"{len(scenarios)} scenarios exceed the limit of {MAX_SCENARIOS}")
+
+
+def parse_profile(steps):
+    """(end_s, load fraction) arrays of [{"minutes": m, "load_pct": p}, ...]."""
+    minutes = np.array([float(step['minutes']) for step in steps])
+    fraction = np.array([float(step.get('load_pct', 100)) / 100 for step in steps])
+    if not len(steps) or np.any(minutes <= 0) or np.any(fraction < 0):
+        raise ValueError("Profile steps need minutes > 0 and load_pct >= 0")
+    return np.cumsum(minutes) * 60, fraction
+
+
+def runtime_curves(columns, strings, profile=None, load_pcts=(25, 50, 75, 100, 125, 150), points=50):
+    """Runtime against load, and string voltage against time, of selected configurations.
+
+    ``columns`` are the ``discharge`` inputs and ``strings`` its selected
+    string counts. Returns runtimes (scenarios × load_pcts, minutes) and
+    the time axis and voltages (scenarios × points) of the 100 % discharge.
+    """
+    c = _configuration(**columns, profile=profile)
+    strings = np.maximum(strings, 1)
+    cell = {key: value[:, None] for key, value in c['cell'].items()}
+    fractions = np.asarray(load_pcts, dtype=float) / 100
+    runtime = simulate(c['load_w'][:, None] * fractions, strings[:, None], c['cells'][:, None], cell,
+                       c['horizon_s'][:, None], profile)
+    _, volts = simulate(c['load_w'], strings, c['cells'], c['cell'], c['horizon_s'], profile, trace=True)
+    keep = np.linspace(0, SIMULATION_STEPS, points).astype(int)
+    return runtime / 60, c['horizon_s'][:, None] / 60 * keep / SIMULATION_STEPS, volts[:, keep]
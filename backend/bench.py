@@ -0,0 +1,453 @@
+"""Benchmarks and golden-value checks for the API.
+
+    python bench.py run [--quick] [--gunicorn] [--out bench.json]
+    python bench.py compare baseline.json bench.json [--threshold 0.25]
+    python bench.py golden [--update]
+
+``run`` measures single-request latency of every route through the Flask
+test client (cache misses and hits separately), throughput against a local
+gunicorn (``--gunicorn``), and rows/s of the batch, sweep and network paths
+as the input grows. Results are written as a flat {metric: value} JSON
+baseline; ``compare`` flags every metric that got worse by more than the
+threshold and exits non-zero if any did.
+
+``golden`` replays a fixed, seeded set of requests against every route and
+compares the responses with bench_golden.json, so a speed-up cannot change
+an engineering result unnoticed. ``--update`` rewrites the snapshot after
+an intended change (bump cache.CACHE_VERSION as well).
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+import cache
+import kernels
+import main
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_FILE = os.path.join(HERE, 'bench_golden.json')
+
+# One representative body per route
+ROUTES = {
+    '/calculate': {"it_load_kw": 120, "runtime_min": 15, "redundancy_level": "N+1", "power_factor": 0.9},
+    '/calculate-power': {"load_kw": 45, "phases": "3F_400V", "cable_mm2": 16, "length_m": 60},
+    '/calculate-transformer': {"loads": [{"kw": 40 + i, "pf": 0.85, "demand_factor": 0.8} for i in range(50)]},
+    '/calculate-generator': {"total_load_kw": 250, "motor_starting_kw": 40, "altitude_m": 1500, "temperature_c": 45},
+    '/calculate-pfc': {"load_kw": 300, "current_pf": 0.72, "target_pf": 0.95},
+    '/calculate-lighting': {"room_length": 20, "room_width": 12, "target_lux": 500},
+    '/calculate-grounding': {"soil_resistivity": 200, "target_resistance": 5, "num_rods": 4},
+    '/calculate-cost': {"load_kw": 80, "hours_per_day": 10, "demand_charge": 5},
+    '/calculate-motor': {"motor_kw": 55, "starting_method": "Star-Delta"},
+    '/calculate-delta-u': {"load_kw": 30, "cable_mm2": 10},
+    '/calculate-min-ika': {"breaker_a": 32, "characteristic": "C", "cable_mm2": 6, "cable_type": "Cu"},
+    '/size-cable': {"load_kw": 75, "length_m": 120, "mounting": "conduit"},
+    '/calculate-battery': {"load_kw": 100, "runtime_min": 10},
+    '/generate-pdf': {"it_load_kw": 120, "runtime_min": 15, "redundancy_level": "N+1", "power_factor": 0.9},
+}
+CACHED_ROUTES = [route for route in ROUTES if route != '/generate-pdf']
+
+
+def _profile_kw(points):
+    t = np.arange(points)
+    return (60 + 25 * np.sin(2 * np.pi * t / (points / 365)) + 10 * np.sin(2 * np.pi * t / points)).round(3).tolist()
+
+
+def _feeder_nodes(n, seed=0):
+    rng = random.Random(seed)
+    nodes = [{"id": "MSB", "load_kw": 0}]
+    for i in range(1, n):
+        nodes.append({"id": f"N{i}", "parent": "MSB" if i < 10 else f"N{rng.randrange(1, i)}",
+                      "load_kw": round(rng.uniform(0, 20), 2), "cable_mm2": rng.choice([2.5, 4, 6, 10, 16, 25]),
+                      "length_m": round(rng.uniform(5, 60), 1), "phases": rng.choice(["3F_400V", "1F_230V"])})
+    return nodes
+
+
+def _switchboard(n, seed=0):
+    rng = random.Random(seed)
+    devices = [{"id": "Q0", "type": "MCCB", "rating_a": 630, "isd": 6, "tsd_s": 0.3, "ii": None}]
+    feeders = max(1, n // 20)
+    devices += [{"id": f"F{i}", "type": "MCCB", "rating_a": rng.choice([100, 160, 250]), "upstream": "Q0",
+                 "ik_ka": 25} for i in range(feeders)]
+    devices += [{"id": f"C{i}", "type": "MCB", "rating_a": rng.choice([10, 16, 20, 32]),
+                 "characteristic": rng.choice(['B', 'C', 'D']), "upstream": f"F{rng.randrange(feeders)}",
+                 "ik_ka": round(rng.uniform(1, 10), 1)} for i in range(n - feeders - 1)]
+    return {"devices": devices}
+
+
+def _short_circuit_network(n, meshes=0, seed=0):
+    rng = random.Random(seed)
+    branches = [{"id": f"TR{t}", "from": "grid", "to": "MSB", "type": "transformer", "kva": 1000, "uk_pct": 6}
+                for t in range(2)]
+    for i in range(1, n):
+        branches.append({"id": f"F{i}", "from": "MSB" if i < 10 else f"B{rng.randrange(1, i)}", "to": f"B{i}",
+                         "cable_mm2": rng.choice([2.5, 6, 16, 50, 95]), "length_m": round(rng.uniform(5, 60), 1),
+                         "breaker_a": rng.choice([16, 32, 63]), "characteristic": rng.choice(['B', 'C', 'D'])})
+    for m in range(meshes):
+        a, b = rng.sample(range(1, n), 2)
+        branches.append({"id": f"L{m}", "from": f"B{a}", "to": f"B{b}", "cable_mm2": 35, "length_m": 30})
+    return {"source": {"sk_mva": 250}, "branches": branches}
+
+
+# ─── Golden values ───────────────────────────────────────────────────
+def golden_cases():
+    """(case id, route, body) of every golden request, in a fixed order."""
+    rng = random.Random(2024)
+    uniform = rng.uniform
+    cases = []
+    for route, body in ROUTES.items():
+        if route != '/generate-pdf':
+            cases.append((f"{route}:default", route, {}))
+            cases.append((f"{route}:typical", route, body))
+    for i in range(12):
+        cases += [
+            (f"ups:{i}", '/calculate', {
+                "it_load_kw": uniform(1, 500), "runtime_min": rng.randint(1, 60),
+                "redundancy_level": rng.choice(['2N', 'N+1', 'N']), "power_factor": uniform(0.6, 1),
+                "growth_margin": rng.randint(0, 50), "safety_margin": rng.randint(0, 50)}),
+            (f"power:{i}", '/calculate-power', {
+                "load_kw": uniform(0.5, 300), "phases": rng.choice(['1F_230V', '3F_400V']),
+                "cable_mm2": rng.choice([1.5, 2.5, 4, 6, 10, 16, 25, 35, 50, 70, 95, 120, 150, 185, 240]),
+                "cable_type": rng.choice(['Cu', 'Al']), "length_m": uniform(1, 300),
+                "mounting": rng.choice(['open', 'conduit']), "power_factor": uniform(0.6, 1)}),
+            (f"transformer:{i}", '/calculate-transformer', {
+                "loads": [{"kw": uniform(1, 200), "pf": uniform(0.7, 1), "demand_factor": uniform(0.3, 1)}
+                          for _ in range(rng.randint(1, 20))], "growth_pct": uniform(0, 50)}),
+            (f"generator:{i}", '/calculate-generator', {
+                "total_load_kw": uniform(10, 2000), "motor_starting_kw": uniform(0, 300),
+                "power_factor": uniform(0.7, 1), "altitude_m": uniform(0, 4000), "temperature_c": uniform(20, 55),
+                "redundancy": rng.choice(['N', 'N+1'])}),
+            (f"pfc:{i}", '/calculate-pfc', {
+                "load_kw": uniform(10, 800), "current_pf": uniform(0.5, 0.9), "target_pf": uniform(0.9, 1),
+                "voltage": rng.choice([400, 230, 690])}),
+            (f"lighting:{i}", '/calculate-lighting', {
+                "room_length": uniform(2, 50), "room_width": uniform(2, 30), "room_height": uniform(2.5, 8),
+                "target_lux": uniform(100, 1000), "luminaire_lm": uniform(1000, 10000), "luminaire_w": uniform(10, 100),
+                "maintenance_factor": uniform(0.6, 0.9), "room_reflectance": rng.choice(['high', 'medium', 'low'])}),
+            (f"grounding:{i}", '/calculate-grounding', {
+                "soil_resistivity": uniform(10, 2000), "rod_length": uniform(1, 6), "target_resistance": uniform(1, 30),
+                "num_rods": rng.randint(1, 10), "rod_spacing": uniform(1, 12)}),
+            (f"cost:{i}", '/calculate-cost', {
+                "load_kw": uniform(0, 300), "hours_per_day": uniform(0, 24), "days_per_month": uniform(0, 31),
+                "price_kwh": uniform(0, 0.4), "demand_charge": uniform(0, 10), "power_factor": uniform(0.7, 1),
+                "efficiency": rng.choice([50, 90, 100])}),
+            (f"motor:{i}", '/calculate-motor', {
+                "motor_kw": uniform(0.5, 300), "voltage": rng.choice([400, 690, 230]), "efficiency": uniform(80, 97),
+                "power_factor": uniform(0.7, 0.95), "starting_method": rng.choice(list(kernels.STARTING_METHODS)),
+                "poles": rng.choice([2, 4, 6, 8])}),
+            (f"delta_u:{i}", '/calculate-delta-u', {
+                "load_kw": uniform(0.5, 300), "phases": rng.choice(['1F_230V', '3F_400V']),
+                "cable_mm2": rng.choice([1.5, 2.5, 4, 16, 240]), "cable_type": rng.choice(['Cu', 'Al']),
+                "power_factor": uniform(0.6, 1), "max_voltage_drop_pct": uniform(1, 8)}),
+            (f"min_ika:{i}", '/calculate-min-ika', {
+                "breaker_a": rng.choice([6, 10, 16, 20, 32, 63]), "characteristic": rng.choice(['B', 'C', 'D']),
+                "cable_mm2": rng.choice([1.5, 2.5, 4, 16]), "cable_type": rng.choice(['Cu', 'Al']),
+                "phases": rng.choice(['1F_230V', '3F_400V'])}),
+            (f"size_cable:{i}", '/size-cable', {
+                "load_kw": uniform(0.5, 150), "phases": rng.choice(['1F_230V', '3F_400V']),
+                "length_m": uniform(5, 250), "mounting": rng.choice(['open', 'conduit']),
+                "characteristic": rng.choice(['B', 'C', 'D']), "cable_type": rng.choice(['any', 'Cu', 'Al'])}),
+            (f"battery:{i}", '/calculate-battery', {
+                "load_kw": uniform(10, 300), "runtime_min": rng.choice([5, 10, 15, 30]),
+                "chemistry": rng.choice(['vrla', 'li-ion']), "block_ah": rng.choice([40, 100, 150, 200]),
+                "temperature_c": uniform(0, 35)}),
+        ]
+    # Invalid inputs must keep failing the same way
+    cases += [
+        ("edge:pfc-pf-above-1", '/calculate-pfc', {"current_pf": 1.2}),
+        ("edge:ups-pf-0", '/calculate', {"power_factor": 0}),
+        ("edge:motor-0-poles", '/calculate-motor', {"poles": 0, "motor_kw": 5}),
+        ("edge:power-0-mm2", '/calculate-power', {"cable_mm2": 0}),
+        ("edge:ups-text", '/calculate', {"runtime_min": 'x'}),
+        ("edge:delta-u-no-load", '/calculate-delta-u', {"load_kw": 0}),
+        ("edge:size-cable-too-long", '/size-cable', {"load_kw": 200, "length_m": 5000}),
+        ("edge:max-length-table-curve", '/max-length-table', {"characteristics": ["K"]}),
+    ]
+    cases += [
+        ("feeder-tree", '/feeder-tree', {"nodes": _feeder_nodes(40), "source": {"transformer_kva": 400}}),
+        ("short-circuit", '/short-circuit', _short_circuit_network(40, meshes=3)),
+        ("selectivity", '/selectivity', _switchboard(40)),
+        ("max-length-table", '/max-length-table', {"breakers": [10, 16, 32, 63], "sections": [1.5, 2.5, 6, 16],
+                                                   "load_pct": 80, "max_voltage_drop_pct": 3}),
+        ("motor-start", '/motor-start', {
+            "source": {"type": "generator"}, "base_load_kw": 80,
+            "motors": [{"id": f"M{i}", "motor_kw": kw, "starting_method": method} for i, (kw, method) in enumerate(
+                [(37, 'DOL'), (22, 'Star-Delta'), (55, 'Soft-Starter'), (15, 'DOL')])]}),
+        ("grounding-grid", '/grounding-grid', {
+            "soil": {"resistivity": 300, "lower_resistivity": 60, "upper_thickness": 2}, "fault_current_a": 8000,
+            "grid": {"length": 40, "width": 30, "spacing": 5, "rods": "perimeter"}}),
+        ("grounding-design", '/grounding-design', {"soil": {"resistivity": 250}, "target_resistance": 5,
+                                                   "arrangement": "grid", "bonded": True}),
+        ("lighting-grid", '/lighting-grid', {"room_length": 18, "room_width": 10, "grid_spacing": 0.5}),
+        ("cost-profile", '/cost-profile', {
+            "profile_kw": _profile_kw(8760), "demand_charge": 8,
+            "bands": [{"name": "peak", "price_kwh": 0.3, "hours": [8, 20], "days": "weekdays"},
+                      {"name": "off-peak", "price_kwh": 0.15}]}),
+        ("capacitor-bank", '/capacitor-bank', {"profile_kw": _profile_kw(8760), "power_factor": 0.82,
+                                               "max_stages": 4}),
+        ("sweep", '/sweep', {"calculator": "generator", "inputs": {"total_load_kw": 250},
+                             "sweep": {"altitude_m": {"start": 0, "stop": 3000, "num": 7}, "temperature_c": [30, 45]}}),
+        ("monte-carlo", '/monte-carlo', {"calculator": "transformer", "samples": 20000, "seed": 1, "inputs": {
+            "loads": [{"kw": 200, "demand_factor": {"dist": "uniform", "low": 0.6, "high": 1.0}}]}}),
+    ]
+    return cases
+
+
+def golden(update=False):
+    client = main.app.test_client()
+    actual = {}
+    for case_id, route, body in golden_cases():
+        response = client.post(route, json=body)
+        actual[case_id] = {"route": route, "status": response.status_code, "response": response.get_json()}
+    if update:
+        with open(GOLDEN_FILE, 'w') as f:
+            json.dump(actual, f, indent=1, sort_keys=True)
+        print(f"Wrote {len(actual)} golden cases to {GOLDEN_FILE}")
+        return 0
+
+    with open(GOLDEN_FILE) as f:
+        expected = json.load(f)
+    failures = [case_id for case_id in expected if actual.get(case_id) != expected[case_id]]
+    missing = [case_id for case_id in actual if case_id not in expected]
+    for case_id in failures:
+        print(f"CHANGED  {case_id}\n  expected {json.dumps(expected[case_id])[:300]}"
+              f"\n  actual   {json.dumps(actual.get(case_id))[:300]}")
+    for case_id in missing:
+        print(f"NEW      {case_id} (run `python bench.py golden --update` to record it)")
+    print(f"{len(expected) - len(failures)}/{len(expected)} golden cases unchanged")
+    return 1 if failures else 0
+
+
+# ─── Benchmarks ──────────────────────────────────────────────────────
+def _summary(prefix, samples_s):
+    samples_s = sorted(samples_s)
+    return {
+        f"{prefix}.p50_us": round(statistics.median(samples_s) * 1e6, 1),
+        f"{prefix}.p95_us": round(samples_s[min(len(samples_s) - 1, int(len(samples_s) * 0.95))] * 1e6, 1),
+        f"{prefix}.rps": round(len(samples_s) / sum(samples_s), 1),
+    }
+
+
+def _varied(body, i):
+    """``body`` with its first numeric input nudged, so every request is a cache miss."""
+    body = json.loads(json.dumps(body))
+    target = body['loads'][0] if 'loads' in body else body
+    key = next(k for k, v in target.items() if isinstance(v, (int, float)))
+    target[key] += i * 1e-6
+    return body
+
+
+def bench_latency(repeat):
+    client = main.app.test_client()
+    main.result_cache = cache.ResultCache(path=None)
+    metrics = {}
+    for route, body in ROUTES.items():
+        count = max(3, repeat // 10) if route == '/generate-pdf' else repeat
+        client.post(route, json=body)  # warm-up
+        samples = []
+        for i in range(count):
+            start = time.perf_counter()
+            response = client.post(route, json=_varied(body, i))
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, (route, response.get_json())
+        metrics.update(_summary(f"latency{route}", samples))
+    for route in CACHED_ROUTES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.post(route, json=ROUTES[route])
+            samples.append(time.perf_counter() - start)
+        metrics.update(_summary(f"cached{route}", samples))
+    return metrics
+
+
+def _rows_per_s(prefix, n, seconds):
+    return {f"{prefix}.{n}.rows_per_s": round(n / seconds, 1)}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_scaling(sizes):
+    client = main.app.test_client()
+    metrics = {}
+    rng = random.Random(1)
+    for n in sizes:
+        for name, make in (
+            ('power', lambda: {"load_kw": rng.uniform(1, 200), "cable_mm2": rng.choice([4, 16, 95]),
+                               "length_m": rng.uniform(5, 200)}),
+            ('size_cable', lambda: {"load_kw": rng.uniform(1, 200), "length_m": rng.uniform(5, 200)}),
+        ):
+            rows = [make() for _ in range(n)]
+            metrics.update(_rows_per_s(f"kernel.{name}", n, _timed(lambda: list(kernels.run_many(name, rows)))))
+            body = ''.join(json.dumps(row) + '\n' for row in rows)
+            metrics.update(_rows_per_s(f"batch.{name}", n, _timed(
+                lambda: client.post(f'/batch/{name}', data=body, content_type='application/x-ndjson').get_data())))
+
+        nodes = _feeder_nodes(n)
+        metrics.update(_rows_per_s("feeder-tree", n, _timed(
+            lambda: client.post('/feeder-tree', json={"nodes": nodes}).get_data())))
+        network = _short_circuit_network(n, meshes=10)
+        metrics.update(_rows_per_s("short-circuit", n, _timed(
+            lambda: client.post('/short-circuit', json=network).get_data())))
+        board = _switchboard(n)
+        metrics.update(_rows_per_s("selectivity", n, _timed(
+            lambda: client.post('/selectivity', json=board).get_data())))
+
+        axis = max(2, int(math.sqrt(n)))
+        sweep = {"calculator": "size_cable", "sweep": {"load_kw": {"start": 1, "stop": 150, "num": axis},
+                                                       "length_m": {"start": 5, "stop": 250, "num": axis}}}
+        metrics.update(_rows_per_s("sweep.size_cable", axis * axis, _timed(
+            lambda: client.post('/sweep', json=sweep).get_data())))
+    return metrics
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def bench_gunicorn(seconds, concurrency, workers):
+    """Closed-loop throughput of a local gunicorn (same flags as render.yaml)."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'main:app', '--bind', f'127.0.0.1:{port}', '--threads', '4',
+         '--workers', str(workers), '--log-level', 'warning'], cwd=HERE)
+    try:
+        for _ in range(100):
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                connection.request('GET', '/health')
+                connection.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("gunicorn did not start")
+
+        metrics = {}
+        for route in ('/calculate-power', '/size-cable', '/calculate-transformer', '/generate-pdf'):
+            latencies = []
+            errors = [0]
+            deadline = time.perf_counter() + seconds
+
+            def client(worker):
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                i = 0
+                while time.perf_counter() < deadline:
+                    body = json.dumps(_varied(ROUTES[route], worker * 1_000_000 + i))
+                    start = time.perf_counter()
+                    connection.request('POST', route, body, {'Content-Type': 'application/json'})
+                    response = connection.getresponse()
+                    response.read()
+                    latencies.append(time.perf_counter() - start)
+                    errors[0] += response.status != 200
+                    i += 1
+
+            threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            summary = _summary(f"gunicorn{route}", latencies)
+            summary[f"gunicorn{route}.rps"] = round(len(latencies) / seconds, 1)
+            summary[f"gunicorn{route}.errors"] = errors[0]
+            metrics.update(summary)
+        return metrics
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(args):
+    metrics = {}
+    metrics.update(bench_latency(20 if args.quick else 200))
+    metrics.update(bench_scaling([100, 1000] if args.quick else [100, 1000, 10000, 50000]))
+    if args.gunicorn:
+        metrics.update(bench_gunicorn(2 if args.quick else 10, args.concurrency, args.workers))
+    baseline = {
+        "meta": {
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": metrics,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+    for key, value in sorted(metrics.items()):
+        print(f"{key:60s} {value:>14}")
+    print(f"Wrote {len(metrics)} metrics to {args.out}")
+    return 0
+
+
+def _higher_is_better(metric):
+    return metric.endswith(('.rps', '.rows_per_s'))
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)['metrics']
+    with open(args.current) as f:
+        current = json.load(f)['metrics']
+    regressions = 0
+    for metric in sorted(set(baseline) & set(current)):
+        before, after = baseline[metric], current[metric]
+        if metric.endswith('.errors'):
+            worse = after > before
+            change = after - before
+        elif before:
+            change = (after - before) / before
+            worse = (-change if _higher_is_better(metric) else change) > args.threshold
+        else:
+            continue
+        regressions += worse
+        flag = 'REGRESSION' if worse else ''
+        change_text = f"{change:+d}" if metric.endswith('.errors') else f"{change:+.1%}"
+        print(f"{metric:60s} {before:>12} {after:>12} {change_text:>8} {flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="measure and write a baseline")
+    run_parser.add_argument('--quick', action='store_true', help="fewer repetitions and sizes")
+    run_parser.add_argument('--gunicorn', action='store_true', help="also measure a local gunicorn")
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--workers', type=int, default=1)
+    run_parser.add_argument('--out', default='bench.json')
+    compare_parser = commands.add_parser('compare', help="flag regressions against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    golden_parser = commands.add_parser('golden', help="check responses against bench_golden.json")
+    golden_parser.add_argument('--update', action='store_true', help="rewrite the snapshot")
+    return parser
+
+
+if __name__ == "__main__":
+    args = _parser().parse_args()
+    if args.command == 'run':
+        sys.exit(run(args))
+    if args.command == 'compare':
+        sys.exit(compare(args))
+    sys.exit(golden(args.update))
@@ -0,0 +1,156 @@
+"""Memoised calculator responses.
+
+Every calculator is a pure function of its parsed inputs, so its serialised
+response is cached under a hash of the calculator name and those inputs
+(``{"load_kw": "10"}`` and ``{"load_kw": 10.0}`` share an entry). The same
+hash is the response ETag, so clients that send If-None-Match get a 304
+without anything being recomputed.
+
+Entries live in a per-process LRU; setting RESULT_CACHE_DB to a file path
+adds a SQLite store behind it that all gunicorn workers on the host share,
+together with their hit/miss counters.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import catalogs
+
+# Bump whenever a formula changes, so stale entries and ETags stop matching
+CACHE_VERSION = '2'
+
+CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 4096))
+CACHE_TTL_S = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+CACHE_DB = os.environ.get('RESULT_CACHE_DB')
+
+
+def key(name, inputs):
+    """Cache key / ETag of a calculator call with parsed ``inputs``."""
+    # Loaded catalog files are part of every result that picks a standard size
+    payload = json.dumps([CACHE_VERSION, catalogs.FINGERPRINT, name, inputs], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class MemoryCache:
+    """Bounded LRU with a time-to-live per entry."""
+
+    def __init__(self, max_size, ttl_s):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """LRU/TTL store in a SQLite file shared by every worker process."""
+
+    def __init__(self, path, max_size, ttl_s):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results "
+                         "(key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS stats "
+                         "(name TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ? AND expires >= ?", (key, now)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        return row[0] if row else None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                             (key, value, now + self.ttl_s, now))
+            self._db.execute("DELETE FROM results WHERE expires < ? OR key IN "
+                             "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                             (now, self.max_size))
+
+    def record(self, name, hit):
+        column = 'hits' if hit else 'misses'
+        with self._lock:
+            self._db.execute(f"INSERT INTO stats (name, {column}) VALUES (?, 1) "
+                             f"ON CONFLICT(name) DO UPDATE SET {column} = {column} + 1", (name,))
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT name, hits, misses FROM stats").fetchall()
+            size = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {name: {"hits": hits, "misses": misses} for name, hits, misses in rows}, size
+
+
+class ResultCache:
+    """Per-process LRU in front of an optional shared SQLite store."""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl_s=CACHE_TTL_S, path=CACHE_DB):
+        self.memory = MemoryCache(max_size, ttl_s)
+        self.shared = SQLiteCache(path, max_size, ttl_s) if path else None
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, key):
+        """Cached response body for ``key``, counting a hit or miss for ``name``."""
+        value = self.memory.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        self.record(name, value is not None)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def record(self, name, hit):
+        if self.shared is not None:
+            self.shared.record(name, hit)
+            return
+        with self._lock:
+            counts = self._counts.setdefault(name, {"hits": 0, "misses": 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        if self.shared is not None:
+            calculators, size = self.shared.stats()
+            backend = 'sqlite'
+        else:
+            with self._lock:
+                calculators = {name: dict(counts) for name, counts in self._counts.items()}
+            size = len(self.memory)
+            backend = 'memory'
+        return {"backend": backend, "entries": size, "calculators": calculators}
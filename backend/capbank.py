@@ -0,0 +1,336 @@
+"""Automatic (multi-step) capacitor bank optimiser over a year of interval data.
+
+``/calculate-pfc`` sizes one fixed bank for one operating point. This
+module takes the same yearly profile as tariffs.py (kW per interval) plus
+its reactive power, as ``profile_kvar`` or a ``power_factor`` (one value
+or one per interval), and searches every bank of up to ``max_stages``
+stages of standard capacitor sizes:
+
+    {"profile_kw": [...], "profile_kvar": [...], "target_pf": 0.95,
+     "penalty_pf": 0.93, "penalty_eur_kvarh": 0.015, "max_stages": 6,
+     "capex_eur_per_kvar": 20, "stage_eur": 150, "lifetime_years": 15,
+     "switching_eur": 0.02, "transformer_kva": 630, "uk_pct": 6}
+
+In every interval the controller switches in the largest combination of
+stages that exceeds the reactive power needed for ``target_pf`` by no more
+than RESPONSE × the smallest stage (its C/k setting). Reactive energy above
+tan(arccos(``penalty_pf``)) × kWh is billed at ``penalty_eur_kvarh``. A
+bank costs its annualised price (``capex_eur_per_kvar`` per kvar plus
+``stage_eur`` per stage over ``lifetime_years``) plus ``switching_eur``
+per stage operation; the best bank has the lowest yearly cost, and is
+``recommended`` when it costs less than the penalty without a bank.
+
+Stage sizes larger than the peak reactive load, and banks larger than it
+by more than one stage, are never considered. The penalty of every bank
+is exact from prefix sums over the intervals sorted by need (see
+Profile); switching needs the year in time order, so it is simulated in
+chunks of banks in order of a lower bound of their cost, until no
+remaining bank can beat the best one found.
+
+The parallel resonance of every switchable level with the transformer is
+at harmonic order h = √(S_T / (uk × Q)); levels within RESONANCE_BAND of a
+characteristic harmonic are reported, and excluded from the search with
+``avoid_resonance``.
+"""
+import itertools
+import math
+
+import numpy as np
+
+import catalogs
+import schemas
+import tariffs
+
+MAX_STAGES = 8
+# Controller response: a level is switched in once the need is within this share of the smallest stage
+RESPONSE = 0.5
+CHUNK_CELLS = 4_000_000  # banks × intervals evaluated per array operation
+CHARACTERISTIC_HARMONICS = (5, 7, 11, 13)
+RESONANCE_BAND = 0.1
+ALTERNATIVES = 5
+
+PARAMS_SCHEMA = schemas.Schema((
+    ('target_pf', schemas.finite, 0.95), ('penalty_pf', schemas.finite, 0.93),
+    ('penalty_eur_kvarh', schemas.finite, 0.015), ('max_stages', int, 6),
+    ('capex_eur_per_kvar', schemas.finite, 20), ('stage_eur', schemas.finite, 150),
+    ('lifetime_years', schemas.finite, 15), ('switching_eur', schemas.finite, 0.02),
+    ('transformer_kva', schemas.finite, 630), ('uk_pct', schemas.finite, 6),
+    ('avoid_resonance', schemas.boolean, False), ('catalog', str, catalogs.DEFAULT), ('year', int, 2025),
+))
+
+
+def _tan(pf):
+    return np.tan(np.arccos(pf))
+
+
+def _banks(sizes, max_stages, peak_kvar):
+    """Every multiset of up to ``max_stages`` sizes, as a zero-padded (banks × stages) array."""
+    sizes = [float(size) for size in sizes if size <= peak_kvar]
+    if not sizes:
+        raise ValueError("No standard capacitor is smaller than the peak reactive load")
+    limit = peak_kvar + min(sizes)
+    banks = [stages + (0.0,) * (max_stages - k)
+             for k in range(1, max_stages + 1)
+             for stages in itertools.combinations_with_replacement(sizes, k)
+             if sum(stages) <= limit]
+    return np.array(banks)
+
+
+def _levels(banks):
+    """Reactive power of every on/off combination of the stages, sorted, and its switch mask."""
+    stages = banks.shape[1]
+    masks = np.arange(2 ** stages)
+    bits = (masks[:, None] >> np.arange(stages)) & 1
+    levels = banks @ bits.T
+    order = np.argsort(levels, axis=1, kind='stable')
+    return np.take_along_axis(levels, order, axis=1), order
+
+
+def _thresholds(banks, levels):
+    """Need from which each level is switched in: the level less half the smallest stage."""
+    smallest = np.where(banks > 0, banks, np.inf).min(axis=1)
+    thresholds = levels - RESPONSE * smallest[:, None]
+    thresholds[:, 0] = -np.inf
+    return thresholds
+
+
+def _penalty(q_net, kw, tan_limit, hours, price):
+    return (np.maximum(q_net - kw * tan_limit, 0) * hours).sum(axis=-1) * price
+
+
+def _bank_levels(banks):
+    """Sorted levels, their switch masks and switch-in thresholds of each bank."""
+    levels, masks = _levels(banks)
+    return levels, masks, _thresholds(banks, levels)
+
+
+class Profile:
+    """A load profile prepared for pricing many banks.
+
+    Sorting the intervals by their reactive need turns the intervals a
+    bank spends at each level into one contiguous range, so the penalty
+    of any bank is a sum of prefix-sum differences, one per level.
+    """
+
+    def __init__(self, kw, kvar, required, hours, tan_limit, price):
+        self.kw, self.kvar, self.required = kw, kvar, required
+        self.hours, self.tan_limit, self.price = hours, tan_limit, price
+        order = np.argsort(required, kind='stable')
+        self.sorted_required = required[order]
+        self._rank = np.empty_like(order)
+        self._rank[order] = np.arange(len(order))
+        self._excess = (kvar - kw * tan_limit)[order]
+        self._values = np.zeros(0)
+        self._prefix = np.zeros((0, len(kw) + 1))
+        # Consecutive intervals as [low, high) ranges of the need: a threshold inside one is crossed
+        self._low = np.sort(np.minimum(required[1:], required[:-1]))
+        self._high = np.sort(np.maximum(required[1:], required[:-1]))
+
+    def _rows(self, values):
+        """Prefix sums of max(excess - value, 0) for each value, computed once per distinct value."""
+        new = np.setdiff1d(values, self._values)
+        if len(new):
+            step = max(1, CHUNK_CELLS // len(self._excess))
+            rows = [np.cumsum(np.maximum(self._excess - v[:, None], 0), axis=1)
+                    for v in np.array_split(new, math.ceil(len(new) / step))]
+            prefix = np.hstack([np.zeros((len(new), 1)), np.vstack(rows)])
+            values = np.concatenate([self._values, new])
+            order = np.argsort(values)
+            self._values = values[order]
+            self._prefix = np.vstack([self._prefix, prefix])[order]
+        return np.searchsorted(self._values, values)
+
+    def penalties(self, levels, thresholds):
+        """Yearly penalty of each bank (rows of sorted levels and their thresholds)."""
+        start = np.searchsorted(self.sorted_required, thresholds)
+        end = np.concatenate([start[:, 1:], np.full((len(start), 1), len(self.sorted_required))], axis=1)
+        values, inverse = np.unique(levels, return_inverse=True)
+        rows = self._rows(values)[inverse.reshape(levels.shape)]
+        excess = (self._prefix[rows, end] - self._prefix[rows, start]).sum(axis=1)
+        return excess * self.hours * self.price
+
+    def least_operations(self, banks, levels, thresholds):
+        """Lower bound of the stage operations of each bank.
+
+        The level follows the need through its thresholds, so its total
+        variation over the year is the sum over thresholds of the level
+        step times the number of times the need crosses it. One operation
+        moves at most the largest stage, and every crossing needs one.
+        """
+        crossings = (np.searchsorted(self._low, thresholds[:, 1:], side='right')
+                     - np.searchsorted(self._high, thresholds[:, 1:], side='right'))
+        variation = (np.diff(levels, axis=1) * crossings).sum(axis=1)
+        return np.maximum(np.ceil(variation / banks.max(axis=1) - 1e-9), crossings.max(axis=1, initial=0))
+
+    def chosen(self, thresholds):
+        """Index of the level each bank switches in, in every interval."""
+        b, n = thresholds.shape[0], len(self.required)
+        # Level index over the sorted intervals: one step up at each threshold
+        start = np.searchsorted(self.sorted_required, thresholds[:, 1:]) + (np.arange(b) * (n + 1))[:, None]
+        steps = np.bincount(start.ravel(), minlength=b * (n + 1)).reshape(b, n + 1)
+        return np.cumsum(steps[:, :n], axis=1, dtype=np.uint8)[:, self._rank]
+
+    def operations(self, masks, chosen):
+        """Stage operations over the year of each bank."""
+        masks = masks.astype(np.uint8)
+        switched = np.stack([row.take(index) for row, index in zip(masks, chosen)])
+        return _POPCOUNT[np.bitwise_xor(switched[:, 1:], switched[:, :-1])].sum(axis=1, dtype=np.int64)
+
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(2 ** MAX_STAGES)], dtype=np.uint8)
+
+
+def resonance_orders(kvar, transformer_kva, uk_pct):
+    """Parallel resonance harmonic order of a capacitor bank with the transformer."""
+    with np.errstate(divide='ignore'):
+        return np.sqrt(transformer_kva / (uk_pct / 100 * np.asarray(kvar, dtype=float)))
+
+
+def _risky(orders):
+    return np.any([np.abs(orders - h) <= RESONANCE_BAND * h for h in CHARACTERISTIC_HARMONICS], axis=0)
+
+
+def parse_params(params):
+    """Typed scalar parameters; raises ``schemas.ValidationError`` naming every bad one."""
+    parsed = PARAMS_SCHEMA.parse(params)
+    checks = (
+        ('target_pf', 0 < parsed['target_pf'] <= 1, "must be in (0, 1]"),
+        ('penalty_pf', 0 < parsed['penalty_pf'] <= 1, "must be in (0, 1]"),
+        ('max_stages', 1 <= parsed['max_stages'] <= MAX_STAGES, f"must be between 1 and {MAX_STAGES}"),
+        ('lifetime_years', parsed['lifetime_years'] > 0, "must be > 0"),
+        ('transformer_kva', parsed['transformer_kva'] > 0, "must be > 0"),
+        ('uk_pct', parsed['uk_pct'] > 0, "must be > 0"),
+        ('catalog', parsed['catalog'] in catalogs.CATALOGS, f"unknown catalog {parsed['catalog']!r}"),
+    )
+    errors = {field: message for field, ok, message in checks if not ok}
+    if errors:
+        raise schemas.ValidationError(errors)
+    return parsed
+
+
+def optimize(profile_kw, params):
+    """Best automatic capacitor bank for a load profile (see the module docstring)."""
+    parsed = parse_params(params)
+    kw = np.asarray(profile_kw, dtype=float)
+    if kw.ndim != 1 or not np.all(np.isfinite(kw)) or np.any(kw < 0):
+        raise ValueError("Profile must be a flat list of finite kW values >= 0")
+    if 'profile_kvar' in params:
+        kvar = np.asarray(params['profile_kvar'], dtype=float)
+        if kvar.shape != kw.shape or not np.all(np.isfinite(kvar)):
+            raise ValueError("profile_kvar must have one finite value per kW value")
+    else:
+        pf = np.asarray(params.get('power_factor', 0.8), dtype=float)
+        if np.any(pf <= 0) or np.any(pf > 1) or pf.ndim > 1 or pf.size not in (1, kw.size):
+            raise ValueError("power_factor must be one value, or one per interval, in (0, 1]")
+        kvar = kw * _tan(pf)
+    interval = tariffs._calendar(parsed['year'], len(kw))[0]
+    hours = interval / 60
+
+    target_pf, penalty_pf, price = parsed['target_pf'], parsed['penalty_pf'], parsed['penalty_eur_kvarh']
+    max_stages, capex_kvar, stage_eur = parsed['max_stages'], parsed['capex_eur_per_kvar'], parsed['stage_eur']
+    lifetime, switching_eur = parsed['lifetime_years'], parsed['switching_eur']
+    transformer_kva, uk_pct = parsed['transformer_kva'], parsed['uk_pct']
+    avoid_resonance, catalog = parsed['avoid_resonance'], parsed['catalog']
+
+    tan_limit = _tan(penalty_pf)
+    required = np.clip(kvar - kw * _tan(target_pf), 0, None)
+    kvar = np.clip(kvar, 0, None)  # leading loads need no capacitors
+    peak = float(kvar.max())
+    penalty_before = float(_penalty(kvar, kw, tan_limit, hours, price))
+
+    banks = _banks(catalogs.CATALOGS[catalog].capacitors.values, max_stages, peak)
+    stages = (banks > 0).sum(axis=1)
+    total = banks.sum(axis=1)
+    annual_capex = (capex_kvar * total + stage_eur * stages) / lifetime
+    if avoid_resonance:
+        levels, _ = _levels(banks)
+        safe = ~np.where(levels > 0, _risky(resonance_orders(levels, transformer_kva, uk_pct)), False).any(axis=1)
+        banks, stages, total, annual_capex = banks[safe], stages[safe], total[safe], annual_capex[safe]
+        if not len(banks):
+            raise ValueError("Every bank has a switchable level resonating near a characteristic harmonic")
+
+    # Exact penalty of every bank, and a lower bound of its switching
+    profile = Profile(kw, kvar, required, hours, tan_limit, price)
+    chunk = max(1, CHUNK_CELLS // 2 ** max_stages)
+    penalty = np.zeros(len(banks))
+    least = np.zeros(len(banks))
+    for i in range(0, len(banks), chunk):
+        levels, _, thresholds = _bank_levels(banks[i:i + chunk])
+        penalty[i:i + chunk] = profile.penalties(levels, thresholds)
+        least[i:i + chunk] = profile.least_operations(banks[i:i + chunk], levels, thresholds)
+    bound = annual_capex + penalty + switching_eur * least
+
+    order = np.lexsort((stages, total, bound))
+    cost = np.full(len(banks), np.inf)
+    operations = np.zeros(len(banks), dtype=int)
+    cutoff = np.inf  # cost of the last of the best banks and alternatives found so far
+    evaluated = 0
+    chunk = max(1, CHUNK_CELLS // len(kw))
+    for start in range(0, len(order), chunk):
+        rows = order[start:start + chunk]
+        if bound[rows[0]] >= cutoff:
+            break  # sorted by bound: nothing left can rank
+        rows = rows[bound[rows] < cutoff]
+        _, masks, thresholds = _bank_levels(banks[rows])
+        operations[rows] = profile.operations(masks, profile.chosen(thresholds))
+        cost[rows] = annual_capex[rows] + penalty[rows] + switching_eur * operations[rows]
+        evaluated += len(rows)
+        if evaluated >= ALTERNATIVES:
+            cutoff = np.partition(cost, ALTERNATIVES - 1)[ALTERNATIVES - 1]
+
+    ranked = np.lexsort((stages, total, cost))[:ALTERNATIVES]
+    ranked = ranked[np.isfinite(cost[ranked])]
+    best = int(ranked[0])
+    levels, _, thresholds = _bank_levels(banks[best:best + 1])
+    q_net = kvar - levels[0, profile.chosen(thresholds)[0]]
+
+    kwh = float(kw.sum() * hours)
+    kvarh_before = float(kvar.sum() * hours)
+    kvarh_after = float(q_net.sum() * hours)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pf_after = np.where(kw > 0, kw / np.hypot(kw, q_net), 1.0)
+    levels, _ = _levels(banks[best:best + 1])
+    levels = np.unique(levels[levels > 0])
+    orders = resonance_orders(levels, transformer_kva, uk_pct)
+
+    def summary(i):
+        return {
+            "stages_kvar": [float(s) for s in sorted(banks[i][banks[i] > 0], reverse=True)],
+            "total_kvar": float(total[i]),
+            "annual_cost_eur": round(float(cost[i]), 2),
+            "penalty_eur": round(float(penalty[i]), 2),
+            "switching_operations": int(operations[i]),
+        }
+
+    return {
+        "points": len(kw),
+        "interval_min": interval,
+        "before": {
+            "annual_pf": round(kwh / math.hypot(kwh, kvarh_before), 4) if kwh > 0 else None,
+            "kvarh": round(kvarh_before, 1),
+            "penalty_eur": round(penalty_before, 2),
+        },
+        "best": {
+            **summary(best),
+            "annual_capex_eur": round(float(annual_capex[best]), 2),
+            "savings_eur": round(penalty_before - float(cost[best]), 2),
+            "recommended": bool(cost[best] < penalty_before),
+            "annual_pf": round(kwh / math.hypot(kwh, kvarh_after), 4) if kwh > 0 else None,
+            "min_pf": round(float(pf_after.min()), 4),
+            "intervals_below_target_pct": round(float((pf_after < target_pf - 1e-9).mean()) * 100, 2),
+            "kvarh": round(kvarh_after, 1),
+        },
+        "resonance": {
+            "transformer_kva": transformer_kva,
+            "uk_pct": uk_pct,
+            "levels": [{"kvar": float(q), "order": round(float(h), 2), "risky": bool(_risky(h))}
+                       for q, h in zip(levels, orders)],
+            "risky_levels": int(_risky(orders).sum()),
+        },
+        "alternatives": [summary(int(i)) for i in ranked[1:]],
+        "search": {
+            "banks": len(banks),
+            "evaluated": evaluated,
+            "pruned": len(banks) - evaluated,
+        },
+    }
@@ -0,0 +1,178 @@
+"""Standard-size catalogs: breakers, contactors, transformers, generators,
+capacitor banks and cable sections with their current capacities.
+
+Every catalog is loaded once into sorted NumPy arrays, so picking the
+smallest standard size for a whole column of values is one
+``searchsorted``. Besides the built-in ``standard`` catalog (IEC ratings,
+IEC 60364-5-52 capacities), every ``*.json`` file in CATALOG_DIR adds a
+manufacturer catalog that calculators select with their ``catalog`` input:
+
+    {"name": "acme",
+     "breakers": [6, 10, 16, 20, 25, 32, 40, 50, 63],
+     "cables": {"sections": [1.5, 2.5, 4, 6, 10],
+                "ampacity": {"Cu": {"open": [20, 28, 37, 48, 66], "conduit": [16, 22, 29, 37, 51]},
+                             "Al": {"open": [null, 22, 29, 37, 51], "conduit": [null, 17, 23, 29, 40]}}}}
+
+Tables a file leaves out (here motor_breakers, contactors, transformers,
+generators and capacitors) come from the standard catalog; null marks a
+section that is not made in that material.
+
+Current capacities of sections between two tabulated ones are interpolated
+on a log-log scale (capacity grows like a power of the section); sections
+outside the table, or next to a missing entry, have none (NaN).
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CATALOG_DIR = os.environ.get('CATALOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalogs'))
+DEFAULT = 'standard'
+MATERIALS = ('Cu', 'Al')
+MOUNTINGS = ('open', 'conduit')
+SIZE_TABLES = ('breakers', 'motor_breakers', 'contactors', 'transformers', 'generators', 'capacitors')
+
+STANDARD = {
+    "name": DEFAULT,
+    "breakers": [6, 10, 13, 16, 20, 25, 32, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630],
+    "motor_breakers": [6, 10, 16, 20, 25, 32, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500, 630],
+    "contactors": [9, 12, 18, 25, 32, 40, 50, 65, 80, 95, 115, 150, 185, 225, 265, 330, 400, 500, 630],
+    "transformers": [25, 50, 63, 100, 160, 200, 250, 315, 400, 500, 630, 800, 1000, 1250, 1600, 2000, 2500],
+    "generators": [20, 30, 40, 50, 60, 80, 100, 125, 150, 200, 250, 300, 350, 400, 500, 625, 750, 800, 1000, 1250,
+                   1500, 2000, 2500],
+    "capacitors": [5, 10, 15, 20, 25, 30, 40, 50, 60, 75, 100, 125, 150, 200, 250, 300, 400, 500],
+    # IEC 60364-5-52 maximum current capacity (A)
+    "cables": {
+        "sections": [1.5, 2.5, 4, 6, 10, 16, 25, 35, 50, 70, 95, 120, 150, 185, 240],
+        "ampacity": {
+            "Cu": {"open": [19.5, 27, 36, 46, 65, 87, 114, 141, 182, 234, 284, 330, 381, 436, 515],
+                   "conduit": [15, 21, 28, 36, 50, 68, 89, 110, 134, 171, 207, 239, 275, 314, 370]},
+            "Al": {"open": [None, 21, 28, 36, 50, 67, 88, 109, 140, 181, 220, 255, 294, 337, 398],
+                   "conduit": [None, 16.5, 22, 28, 39, 53, 70, 86, 104, 133, 161, 186, 215, 245, 289]},
+        },
+    },
+}
+
+
+class Sizes:
+    """Sorted standard sizes."""
+
+    def __init__(self, sizes):
+        self.values = np.unique(np.asarray(sizes))
+        if not len(self.values) or not np.all(self.values > 0):
+            raise ValueError("Catalog sizes must be a non-empty list of positive numbers")
+
+    def index(self, values):
+        """Index of the smallest size >= value, or of the largest size if none is."""
+        return np.minimum(np.searchsorted(self.values, values), len(self.values) - 1)
+
+    def at_least(self, values):
+        return self.values[self.index(values)]
+
+
+class Cables:
+    """Cable sections and their capacities, as ampacity[material, mounting, section]."""
+
+    def __init__(self, table):
+        self.sections = np.asarray(table['sections'], dtype=float)
+        self.ampacity = np.array([[[np.nan if a is None else a for a in table['ampacity'][material][mounting]]
+                                   for mounting in MOUNTINGS] for material in MATERIALS], dtype=float)
+        if (self.ampacity.shape[-1] != len(self.sections) or np.any(np.diff(self.sections) <= 0)
+                or not np.all(self.sections > 0)):
+            raise ValueError("Cable sections must be increasing, with one capacity per section")
+        self._log_sections = np.log(self.sections)
+
+    def capacity(self, material, conduit, cable_mm2):
+        """Current capacity of each section (tabulated, interpolated or NaN).
+
+        ``material`` and ``conduit`` are index columns into MATERIALS and
+        MOUNTINGS.
+        """
+        cable_mm2 = np.asarray(cable_mm2, dtype=float)
+        hi = np.clip(np.searchsorted(self.sections, cable_mm2), 1, len(self.sections) - 1)
+        lo = hi - 1
+        a_lo = self.ampacity[material, conduit, lo]
+        a_hi = self.ampacity[material, conduit, hi]
+        with np.errstate(all='ignore'):
+            t = (np.log(cable_mm2) - self._log_sections[lo]) / (self._log_sections[hi] - self._log_sections[lo])
+            interpolated = a_lo * (a_hi / a_lo) ** t
+        inside = (cable_mm2 > self.sections[0]) & (cable_mm2 < self.sections[-1])
+        return np.select([cable_mm2 == self.sections[lo], cable_mm2 == self.sections[hi], inside],
+                         [a_lo, a_hi, interpolated], np.nan)
+
+    def smallest_section(self, material, conduit, current_a):
+        """First tabulated section rated for ``current_a``, or the largest if none is."""
+        ok = self.ampacity[material, conduit] >= np.asarray(current_a)[..., None]
+        return np.where(ok.any(axis=-1), self.sections[ok.argmax(axis=-1)], self.sections[-1])
+
+
+class Catalog:
+    """One named set of size tables (see the module docstring)."""
+
+    def __init__(self, data, base=None):
+        self.name = str(data['name'])
+        for table in SIZE_TABLES:
+            if table in data:
+                setattr(self, table, Sizes(data[table]))
+            elif base is not None:
+                setattr(self, table, getattr(base, table))
+            else:
+                raise ValueError(f"Catalog '{self.name}' has no {table} table")
+        self.cables = Cables(data['cables']) if 'cables' in data else base.cables
+
+    def summary(self):
+        return {
+            **{table: getattr(self, table).values.tolist() for table in SIZE_TABLES},
+            "cable_sections": self.cables.sections.tolist(),
+        }
+
+
+def _load(directory):
+    """{name: Catalog} of the standard catalog and every file in ``directory``, plus a fingerprint."""
+    standard = Catalog(STANDARD)
+    catalogs = {DEFAULT: standard}
+    digest = hashlib.sha1()
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(directory, filename), 'rb') as f:
+                raw = f.read()
+            digest.update(raw)
+            try:
+                catalog = Catalog(json.loads(raw), base=standard)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid catalog file {filename}: {e}") from None
+            catalogs[catalog.name] = catalog
+    return catalogs, digest.hexdigest()[:12]
+
+
+CATALOGS, FINGERPRINT = _load(CATALOG_DIR)
+
+
+def by_catalog(catalog, fn, *columns):
+    """``fn(Catalog, *columns)`` for the rows of each catalog named in the ``catalog`` column.
+
+    ``fn`` returns an array or a tuple of arrays, merged back in row order.
+    """
+    catalog = np.asarray(catalog, dtype=str)
+    if catalog.size and np.all(catalog == catalog.flat[0]):
+        return fn(CATALOGS[str(catalog.flat[0])], *columns)
+    names = np.unique(catalog)
+
+    shape = np.broadcast_shapes(catalog.shape, *(np.shape(column) for column in columns))
+    catalog = np.broadcast_to(catalog, shape)
+    columns = [np.broadcast_to(column, shape) for column in columns]
+    groups = [(catalog == name, name) for name in names]
+    parts = [fn(CATALOGS[name], *(column[rows] for column in columns)) for rows, name in groups]
+    single = not isinstance(parts[0], tuple)
+    if single:
+        parts = [(part,) for part in parts]
+    merged = []
+    for i in range(len(parts[0])):
+        out = np.empty(shape, dtype=np.result_type(*(part[i] for part in parts)))
+        for (rows, _), part in zip(groups, parts):
+            out[rows] = np.broadcast_to(part[i], (int(rows.sum()),))
+        merged.append(out)
+    return merged[0] if single else tuple(merged)
@@ -0,0 +1,229 @@
+"""Breaker time-current curves and selectivity between upstream and downstream devices.
+
+Every device is stored as its tripping band sampled at MULTIPLES of its
+rating: t_min (the longest time it is sure not to trip) and t_max (the
+longest time it may take to clear), inf where it never trips. A
+switchboard is a list of devices, each naming the device upstream of it
+and the maximum fault current at its terminals:
+
+    {"devices": [
+        {"id": "Q0", "type": "MCCB", "rating_a": 250, "ir": 1, "tr_s": 5, "isd": 8, "tsd_s": 0.2, "ii": 15},
+        {"id": "Q1", "type": "MCB", "rating_a": 32, "characteristic": "C", "upstream": "Q0", "ik_ka": 6},
+        {"id": "Q2", "type": "custom", "rating_a": 63, "upstream": "Q0", "ik_ka": 4,
+         "curve": {"multiples": [1.3, 2, 5, 10], "t_min_s": [3600, 40, 3, 0.01], "t_max_s": [7200, 120, 10, 0.02]}}],
+     "include_curves": false}
+
+* MCB (IEC 60898-1): thermal band through the conventional non-tripping
+  (1.13 In) and tripping (1.45 In) currents at the conventional time and
+  1 s … 60 s (120 s above 32 A) at 2.55 In; instantaneous between
+  MAGNETIC_LOW and kernels.TRIP_MULTIPLIERS × In for B/C/D.
+* MCCB (electronic trip unit): long time I²t through ``tr_s`` at 6 Ir
+  (Ir = ``ir`` × In, pickup 1.05 … 1.20 Ir, -20 % on time), definite
+  short time ``tsd_s`` from ``isd`` × Ir, instantaneous from ``ii`` × In
+  (±10 % pickups); ``isd`` or ``ii`` null switches that protection off.
+* custom: manufacturer points, interpolated on a log-log scale.
+
+A pair is selective at a current when the upstream device is sure not to
+trip before the downstream one has cleared (t_min upstream > t_max
+downstream). Every pair is checked at SAMPLES currents from the rating
+of its downstream device up to its ``ik_ka`` (beyond 1000 × In a band
+keeps its last sampled time) in one array operation, so a board of
+thousands of circuits is a single request.
+"""
+import numpy as np
+
+import kernels
+
+SAMPLES = 256
+MULTIPLES = np.geomspace(1, 1000, SAMPLES)  # I / In
+_STEP = np.log(MULTIPLES[1] / MULTIPLES[0])
+NEVER_S = 1e9  # stands for inf while interpolating on a log scale
+FLOOR_S = 1e-6  # stands for 0 s (e.g. tsd_s = 0) on a log scale
+MAX_DEVICES = 50_000
+CHUNK_PAIRS = 4096
+TYPES = ('MCB', 'MCCB', 'custom')
+
+# IEC 60898-1
+NON_TRIPPING = 1.13
+TRIPPING = 1.45
+CONVENTIONAL_S = {63: 3600, None: 7200}  # conventional time up to 63 A, and above
+MAGNETIC_LOW = {'B': 3, 'C': 5, 'D': 10}
+INSTANTANEOUS_S = (0.005, 0.1)
+
+# Electronic trip units
+LONG_TIME_PICKUP = (1.05, 1.20)
+LONG_TIME_TOLERANCE = 0.8
+PICKUP_TOLERANCE = 0.1
+SHORT_TIME_BAND_S = 0.05
+MCCB_INSTANTANEOUS_S = (0.01, 0.05)
+
+
+def _inverse(x, x1, t1, x2, t2):
+    """t = C / (x² - b²) through (x1, t1) and (x2, t2); inf up to its asymptote."""
+    b2 = (t1 * x1 ** 2 - t2 * x2 ** 2) / (t1 - t2)
+    c = t2 * (x2 ** 2 - b2)
+    with np.errstate(divide='ignore'):
+        return np.where(x ** 2 > b2, c / (x ** 2 - b2), np.inf)
+
+
+def mcb(rating_a, characteristic):
+    """Sampled (t_min, t_max) of MCBs, one row per device."""
+    rating_a = np.asarray(rating_a, dtype=float)[:, None]
+    characteristic = np.asarray(characteristic, dtype=str)[:, None]
+    x = MULTIPLES
+    conventional = np.where(rating_a <= 63, CONVENTIONAL_S[63], CONVENTIONAL_S[None])
+    t_min = _inverse(x, NON_TRIPPING, conventional, 2.55, 1)
+    t_max = _inverse(x, TRIPPING, conventional, 2.55, np.where(rating_a <= 32, 60, 120))
+    low = np.select([characteristic == c for c in MAGNETIC_LOW], list(MAGNETIC_LOW.values()), np.nan)
+    high = kernels.trip_multiplier(characteristic)
+    t_min = np.where(x >= low, INSTANTANEOUS_S[0], t_min)
+    t_max = np.where(x >= high, INSTANTANEOUS_S[1], t_max)
+    return t_min, np.maximum(t_max, t_min)
+
+
+def mccb(ir, tr_s, isd, tsd_s, ii):
+    """Sampled (t_min, t_max) of electronic MCCBs; NaN ``isd`` / ``ii`` are switched off."""
+    ir, tr_s, isd, tsd_s, ii = (np.asarray(c, dtype=float)[:, None] for c in (ir, tr_s, isd, tsd_s, ii))
+    y = MULTIPLES / ir  # I / Ir
+    long_time = tr_s * (6 / y) ** 2
+    t_min = np.where(y >= LONG_TIME_PICKUP[0], LONG_TIME_TOLERANCE * long_time, np.inf)
+    t_max = np.where(y >= LONG_TIME_PICKUP[1], long_time, np.inf)
+    with np.errstate(invalid='ignore'):
+        t_min = np.where(y >= isd * (1 - PICKUP_TOLERANCE), np.minimum(t_min, tsd_s), t_min)
+        t_max = np.where(y >= isd * (1 + PICKUP_TOLERANCE), np.minimum(t_max, tsd_s + SHORT_TIME_BAND_S), t_max)
+        t_min = np.where(MULTIPLES >= ii * (1 - PICKUP_TOLERANCE), np.minimum(t_min, MCCB_INSTANTANEOUS_S[0]), t_min)
+        t_max = np.where(MULTIPLES >= ii * (1 + PICKUP_TOLERANCE), np.minimum(t_max, MCCB_INSTANTANEOUS_S[1]),
+                         t_max)
+    return t_min, np.maximum(t_max, t_min)
+
+
+def custom(curve):
+    """Sampled (t_min, t_max) of manufacturer points; inf below the first point."""
+    multiples = np.asarray(curve['multiples'], dtype=float)
+    bands = [np.asarray(curve[key], dtype=float) for key in ('t_min_s', 't_max_s')]
+    if (multiples.ndim != 1 or len(multiples) < 2 or np.any(np.diff(multiples) <= 0) or multiples[0] <= 0
+            or any(band.shape != multiples.shape or np.any(band <= 0) for band in bands)):
+        raise ValueError("Custom curves need increasing multiples > 0 and one time > 0 per multiple")
+    sampled = [np.where(MULTIPLES >= multiples[0],
+                        np.exp(np.interp(np.log(MULTIPLES), np.log(multiples), np.log(band))), np.inf)
+               for band in bands]
+    return sampled[0], np.maximum(sampled[1], sampled[0])
+
+
+def _at(band, row, current_a, rating_a):
+    """Interpolate the sampled ``band`` of device ``row`` at absolute currents (log-log)."""
+    position = np.log(current_a / rating_a[:, None]) / _STEP
+    below = position < 0
+    position = np.clip(position, 0, SAMPLES - 1)
+    lo = np.minimum(position.astype(int), SAMPLES - 2)
+    w = position - lo
+    logs = np.log(np.clip(band[row], FLOOR_S, NEVER_S))
+    value = np.exp(np.take_along_axis(logs, lo, axis=1) * (1 - w) + np.take_along_axis(logs, lo + 1, axis=1) * w)
+    return np.where(below | (value >= NEVER_S * 0.999), np.inf, value)
+
+
+# ─── Switchboards ────────────────────────────────────────────────────
+def build(devices):
+    """Ids, ratings and sampled (t_min, t_max) of every device (see the module docstring)."""
+    if not devices:
+        raise ValueError("No devices")
+    if len(devices) > MAX_DEVICES:
+        raise ValueError(f"At most {MAX_DEVICES} devices per request")
+    ids = [str(device.get('id', i)) for i, device in enumerate(devices)]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Duplicate device ids")
+    kinds = np.array([device.get('type', 'MCB') for device in devices])
+    if not np.isin(kinds, TYPES).all():
+        raise ValueError(f"Device type must be one of {', '.join(TYPES)}")
+    rating_a = np.array([float(device.get('rating_a', 16)) for device in devices])
+    if not np.all(np.isfinite(rating_a) & (rating_a > 0)):
+        raise ValueError("Device ratings must be finite numbers > 0")
+
+    t_min = np.empty((len(devices), SAMPLES))
+    t_max = np.empty((len(devices), SAMPLES))
+    rows = np.flatnonzero(kinds == 'MCB')
+    if len(rows):
+        characteristic = [devices[i].get('characteristic', 'C') for i in rows]
+        if not set(characteristic) <= set(MAGNETIC_LOW):
+            raise ValueError(f"MCB characteristic must be one of {', '.join(MAGNETIC_LOW)}")
+        t_min[rows], t_max[rows] = mcb(rating_a[rows], characteristic)
+    rows = np.flatnonzero(kinds == 'MCCB')
+    if len(rows):
+        def setting(key, default):
+            return np.array([np.nan if devices[i].get(key, default) is None else float(devices[i].get(key, default))
+                             for i in rows])
+        ir, tr_s, isd, tsd_s, ii = (setting('ir', 1), setting('tr_s', 5), setting('isd', 10), setting('tsd_s', 0.1),
+                                    setting('ii', 15))
+        if not np.all((ir >= 0.4) & (ir <= 1) & (tr_s > 0)):
+            raise ValueError("MCCB ir must be in 0.4…1 and tr_s > 0")
+        if not np.all((np.isnan(isd) | (isd > 1)) & (np.isnan(ii) | (ii > 1)) & (np.isnan(tsd_s) | (tsd_s >= 0))):
+            raise ValueError("MCCB isd and ii must be > 1 and tsd_s >= 0")
+        t_min[rows], t_max[rows] = mccb(ir, tr_s, isd, np.nan_to_num(tsd_s), ii)
+    for i in np.flatnonzero(kinds == 'custom'):
+        if 'curve' not in devices[i]:
+            raise ValueError(f"Custom device '{ids[i]}' has no curve")
+        t_min[i], t_max[i] = custom(devices[i]['curve'])
+    return ids, rating_a, t_min, t_max
+
+
+def selectivity(upstream, downstream, ik_a, rating_a, t_min, t_max):
+    """Selectivity limit (A) of each (upstream, downstream) pair: the largest current checked, from
+    the downstream rating up to ``ik_a``, below which the pair is selective (inf if total)."""
+    if len(upstream) > CHUNK_PAIRS:
+        return np.concatenate([selectivity(upstream[i:i + CHUNK_PAIRS], downstream[i:i + CHUNK_PAIRS],
+                                           ik_a[i:i + CHUNK_PAIRS], rating_a, t_min, t_max)
+                               for i in range(0, len(upstream), CHUNK_PAIRS)])
+    # SAMPLES currents from the downstream rating up to ik_a (without one: the end of either sampled band)
+    low = rating_a[downstream]
+    high = np.where(np.isfinite(ik_a), ik_a, np.maximum(low, rating_a[upstream]) * MULTIPLES[-1])
+    current = low[:, None] * np.exp(np.log(np.maximum(high / low, 1))[:, None] * np.linspace(0, 1, SAMPLES))
+    upstream_min = _at(t_min, upstream, current, rating_a[upstream])
+    downstream_max = _at(t_max, downstream, current, low)
+    ok = (upstream_min > downstream_max) | np.isinf(upstream_min) | (current > ik_a[:, None])
+    failed = ~ok.all(axis=1)
+    first = ok.argmin(axis=1)
+    limit = np.where(first > 0, current[np.arange(len(first)), np.maximum(first - 1, 0)], 0.0)
+    return np.where(failed, limit, np.inf)
+
+
+def check(data):
+    """Selectivity of every device with the one upstream of it (see the module docstring)."""
+    devices = data.get('devices', [])
+    ids, rating_a, t_min, t_max = build(devices)
+    index = {device_id: i for i, device_id in enumerate(ids)}
+    own = [ids[i] for i, device in enumerate(devices)
+           if device.get('upstream') is not None and str(device['upstream']) == ids[i]]
+    if own:
+        raise ValueError(f"Device '{own[0]}' names itself as upstream")
+    pairs = [(index[str(device['upstream'])], i) for i, device in enumerate(devices)
+             if device.get('upstream') is not None and str(device['upstream']) in index]
+    unknown = [str(device['upstream']) for device in devices
+               if device.get('upstream') is not None and str(device['upstream']) not in index]
+    if unknown:
+        raise ValueError(f"Unknown upstream device '{unknown[0]}'")
+    upstream = np.array([u for u, _ in pairs], dtype=int)
+    downstream = np.array([d for _, d in pairs], dtype=int)
+    # A device without ik_ka is checked over its whole sampled range
+    given = np.array([devices[d].get('ik_ka') is not None for d in downstream], dtype=bool)
+    ik_ka = np.full(len(downstream), np.inf)
+    ik_ka[given] = [float(devices[d]['ik_ka']) for d in downstream[given]]
+    if not np.all(np.isfinite(ik_ka[given]) & (ik_ka[given] > 0)):
+        raise ValueError("ik_ka must be a finite number > 0, or null for no limit")
+    limit = selectivity(upstream, downstream, ik_ka * 1000, rating_a, t_min, t_max) / 1000
+    kind = np.select([np.isinf(limit), limit > 0], ['total', 'partial'], 'none')
+
+    result = {
+        "pairs": [{"upstream": ids[u], "downstream": ids[d], "selectivity": str(k),
+                   "limit_ka": None if np.isinf(lim) else round(float(lim), 3),
+                   "ik_ka": None if np.isinf(ik) else float(ik)}
+                  for u, d, k, lim, ik in zip(upstream, downstream, kind, limit, ik_ka)],
+        "summary": {"devices": len(ids), "pairs": len(pairs),
+                    **{k: int((kind == k).sum()) for k in ('total', 'partial', 'none')}},
+    }
+    if data.get('include_curves'):
+        def times(band):
+            return [None if np.isinf(t) else round(float(t), 4) for t in band]
+        result["curves"] = [{"id": device_id, "current_a": np.round(rating * MULTIPLES, 2).tolist(),
+                             "t_min_s": times(low), "t_max_s": times(high)}
+                            for device_id, rating, low, high in zip(ids, rating_a, t_min, t_max)]
+    return result
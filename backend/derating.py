@@ -0,0 +1,189 @@
+"""IEC 60364-5-52 correction factors for the current capacity of cables.
+
+The derated capacity of a circuit is
+
+    Iz = Iz_catalog × k_method × k_temperature × k_grouping × k_soil
+
+where Iz_catalog is the catalog capacity of the section in open air
+(reference method C) or in conduit (reference method B1), and
+
+* k_method scales it to another reference method (Tables B.52.4,
+  B.52.10 and B.52.12, PVC, three loaded copper conductors; the ratio is
+  interpolated on the log of the section and held constant outside
+  1.5-240 mm²),
+* k_temperature corrects for an ambient air temperature other than 30 °C
+  (Table B.52.14) or, for methods D1/D2, a ground temperature other than
+  20 °C (Table B.52.15), by insulation (PVC 70 °C, XLPE/EPR 90 °C),
+* k_grouping derates circuits laid together (Tables B.52.17 to B.52.19),
+* k_soil corrects buried cables for a soil thermal resistivity other
+  than 2.5 K·m/W (Table B.52.16).
+
+Every table is interpolated at import onto a fixed grid (1 °C, one circuit,
+0.1 K·m/W) and stored as a NumPy array, so the factors of any number of
+circuits are a handful of index lookups. Inputs between grid points take
+the next, more severe, point. Conditions the tables do not cover (a PVC
+cable above 60 °C in air, more than 20 bunched circuits, soil above
+3 K·m/W...) have no factor (NaN); temperatures below 10 °C and soils below
+0.5 K·m/W are treated as 10 °C and 0.5 K·m/W.
+"""
+import numpy as np
+
+METHODS = ('A1', 'A2', 'B1', 'B2', 'C', 'D1', 'D2', 'E', 'F')
+# 'auto' follows the mounting input: C in open air, B1 in conduit
+AUTO_METHOD = {'open': 'C', 'conduit': 'B1'}
+# Catalog column each method is scaled from (see catalogs.MOUNTINGS)
+CONDUIT_METHODS = ('A1', 'A2', 'B1', 'B2')
+BURIED_METHODS = ('D1', 'D2')
+INSULATIONS = ('PVC', 'XLPE')
+
+# Capacity (A) by reference method, PVC insulation, three loaded Cu conductors
+SECTIONS = (1.5, 2.5, 4, 6, 10, 16, 25, 35, 50, 70, 95, 120, 150, 185, 240)
+METHOD_CAPACITY = {
+    'A1': (13.5, 18, 24, 31, 42, 56, 73, 89, 108, 136, 164, 188, 216, 245, 286),
+    'A2': (13, 17.5, 23, 29, 39, 52, 68, 83, 99, 125, 150, 172, 196, 223, 261),
+    'B1': (15.5, 21, 28, 36, 50, 68, 89, 110, 134, 171, 207, 239, 275, 314, 369),
+    'B2': (15, 20, 27, 34, 46, 62, 80, 99, 118, 149, 179, 206, 236, 268, 313),
+    'C': (17.5, 24, 32, 41, 57, 76, 96, 119, 144, 184, 223, 259, 299, 341, 403),
+    'D1': (18, 24, 30, 38, 50, 64, 82, 98, 116, 143, 169, 192, 217, 243, 280),
+    'D2': (19, 24, 33, 41, 54, 70, 92, 110, 130, 162, 193, 220, 246, 278, 320),
+    'E': (18.5, 25, 34, 43, 60, 80, 101, 126, 153, 196, 238, 276, 319, 364, 430),
+    # single-core cables in trefoil, not tabulated below 25 mm²
+    'F': (None, None, None, None, None, None, 110, 137, 167, 216, 264, 308, 356, 409, 485),
+}
+
+# Temperature (°C) -> factor, in air (reference 30 °C) and in ground (reference 20 °C)
+TEMPERATURES = (10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80)
+AIR_TEMPERATURE = {
+    'PVC': (1.22, 1.17, 1.12, 1.06, 1.00, 0.94, 0.87, 0.79, 0.71, 0.61, 0.50, None, None, None, None),
+    'XLPE': (1.15, 1.12, 1.08, 1.04, 1.00, 0.96, 0.91, 0.87, 0.82, 0.76, 0.71, 0.65, 0.58, 0.50, 0.41),
+}
+GROUND_TEMPERATURE = {
+    'PVC': (1.10, 1.05, 1.00, 0.95, 0.89, 0.84, 0.77, 0.71, 0.63, 0.55, 0.45, None, None, None, None),
+    'XLPE': (1.07, 1.04, 1.00, 0.96, 0.93, 0.89, 0.85, 0.80, 0.76, 0.71, 0.65, 0.60, 0.53, 0.46, 0.38),
+}
+
+# Soil thermal resistivity (K·m/W) -> factor, cables in buried ducts (D1) or direct in ground (D2)
+SOIL_RESISTIVITIES = (0.5, 0.7, 1.0, 1.5, 2.0, 2.5, 3.0)
+SOIL = {
+    'D1': (1.28, 1.20, 1.18, 1.10, 1.05, 1.00, 0.96),
+    'D2': (1.88, 1.62, 1.50, 1.28, 1.12, 1.00, 0.90),
+}
+SOIL_STEP = 0.1
+
+# Number of circuits -> factor, by arrangement
+MAX_CIRCUITS = 20
+GROUPING = {
+    # B.52.17: bunched in air, on a surface, embedded or enclosed
+    'bunched': ((1, 2, 3, 4, 5, 6, 7, 8, 9, 12, 16, 20),
+                (1.00, 0.80, 0.70, 0.65, 0.60, 0.57, 0.54, 0.52, 0.50, 0.45, 0.41, 0.38)),
+    # B.52.17: single layer on a wall, floor or unperforated tray
+    'single_layer': ((1, 2, 3, 4, 5, 6, 7, 8, 9), (1.00, 0.85, 0.79, 0.75, 0.73, 0.72, 0.72, 0.71, 0.70)),
+    # B.52.17: single layer fixed directly under a wooden ceiling
+    'under_ceiling': ((1, 2, 3, 4, 5, 6, 7, 8, 9), (0.95, 0.81, 0.72, 0.68, 0.66, 0.64, 0.63, 0.62, 0.61)),
+    # B.52.17: single layer on a perforated horizontal or vertical tray
+    'perforated_tray': ((1, 2, 3, 4, 5, 6, 7, 8, 9), (1.00, 0.88, 0.82, 0.77, 0.75, 0.73, 0.73, 0.72, 0.72)),
+    # B.52.17: single layer on a ladder support or cleats
+    'ladder': ((1, 2, 3, 4, 5, 6, 7, 8, 9), (1.00, 0.87, 0.82, 0.80, 0.80, 0.79, 0.79, 0.78, 0.78)),
+    # B.52.18: direct in ground, cables touching / 0.25 m apart
+    'buried': ((1, 2, 3, 4, 5, 6), (1.00, 0.75, 0.65, 0.60, 0.55, 0.50)),
+    'buried_spaced': ((1, 2, 3, 4, 5, 6), (1.00, 0.90, 0.80, 0.75, 0.70, 0.70)),
+    # B.52.19: in buried ducts, ducts touching / 0.25 m apart
+    'ducts': ((1, 2, 3, 4, 5, 6), (1.00, 0.85, 0.75, 0.70, 0.65, 0.60)),
+    'ducts_spaced': ((1, 2, 3, 4, 5, 6), (1.00, 0.90, 0.85, 0.80, 0.80, 0.80)),
+}
+ARRANGEMENTS = tuple(GROUPING)
+# "No further reduction factor for more than nine circuits"
+NO_FURTHER_REDUCTION = ('single_layer', 'under_ceiling', 'perforated_tray', 'ladder')
+
+
+def _values(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _interp(grid, points, values):
+    """Piecewise-linear table on ``grid``, NaN outside its (non-null) points."""
+    values = _values(values)
+    known = ~np.isnan(values)
+    points = np.asarray(points, dtype=float)[known]
+    return np.interp(grid, points, values[known], left=np.nan, right=np.nan)
+
+
+# ─── Lookup tensors ──────────────────────────────────────────────────
+# k_method[method, section]: ratio to the catalog column the method is scaled from
+_LOG_SECTIONS = np.log(SECTIONS)
+METHOD_RATIO = np.array([_values(METHOD_CAPACITY[m])
+                         / _values(METHOD_CAPACITY[AUTO_METHOD['conduit' if m in CONDUIT_METHODS else 'open']])
+                         for m in METHODS])
+METHOD_CONDUIT = np.array([m in CONDUIT_METHODS for m in METHODS], dtype=int)
+METHOD_BURIED = np.array([m in BURIED_METHODS for m in METHODS], dtype=int)
+
+# k_temperature[insulation, buried, °C - TEMPERATURES[0]], last entry: above the table
+_DEGREES = np.arange(TEMPERATURES[0], TEMPERATURES[-1] + 1)
+TEMPERATURE = np.array([[np.append(_interp(_DEGREES, TEMPERATURES, table[insulation]), np.nan)
+                         for table in (AIR_TEMPERATURE, GROUND_TEMPERATURE)] for insulation in INSULATIONS])
+
+
+def _grouping_factor():
+    """k_grouping[arrangement, circuits], index 0 invalid, last: more than MAX_CIRCUITS."""
+    factor = np.full((len(ARRANGEMENTS), MAX_CIRCUITS + 2), np.nan)
+    circuits = np.arange(1, MAX_CIRCUITS + 2)
+    for i, name in enumerate(ARRANGEMENTS):
+        counts, factors = GROUPING[name]
+        beyond = factors[-1] if name in NO_FURTHER_REDUCTION else np.nan
+        # smallest tabulated count >= n
+        factor[i, 1:] = np.append(factors, beyond)[np.searchsorted(counts, circuits)]
+    return factor
+
+
+GROUPING_FACTOR = _grouping_factor()
+
+# k_soil[method, (ρ - 0.5) / SOIL_STEP], 1 for cables in air, last entry: above the table
+_SOIL_GRID = np.round(np.arange(SOIL_RESISTIVITIES[0], SOIL_RESISTIVITIES[-1] + SOIL_STEP / 2, SOIL_STEP), 6)
+SOIL_FACTOR = np.array([np.append(_interp(_SOIL_GRID, SOIL_RESISTIVITIES, SOIL[m]), np.nan) if m in SOIL
+                        else np.ones(len(_SOIL_GRID) + 1) for m in METHODS])
+
+
+# ─── Lookups ─────────────────────────────────────────────────────────
+def _index(names, column):
+    """Position of each value of ``column`` in ``names`` (all values must be listed)."""
+    names = np.asarray(names)
+    order = np.argsort(names)
+    return order[np.minimum(np.searchsorted(names[order], column), len(names) - 1)]
+
+
+def _grid_index(values, start, step, size):
+    """Grid index of the next point >= value, clamped below, ``size`` above the grid."""
+    position = np.ceil(np.round((np.asarray(values, dtype=float) - start) / step, 6))
+    position = np.nan_to_num(position, nan=size, posinf=size, neginf=0)
+    return np.clip(position, 0, size).astype(int)
+
+
+def conditions(mounting, reference_method='auto', insulation='PVC', ambient_c=30, ground_c=20, circuits=1,
+               arrangement='bunched', soil_thermal_resistivity=2.5):
+    """Method index, catalog mounting index (0 open, 1 conduit) and the
+    section-independent factor k_temperature × k_grouping × k_soil per row.
+    """
+    reference_method = np.asarray(reference_method, dtype=str)
+    conduit = np.asarray(mounting, dtype=str) == 'conduit'
+    auto = np.where(conduit, METHODS.index(AUTO_METHOD['conduit']), METHODS.index(AUTO_METHOD['open']))
+    method = np.where(reference_method == 'auto', auto, _index(METHODS, reference_method))
+
+    buried = METHOD_BURIED[method]
+    temperature = np.where(buried, ground_c, ambient_c)
+    k_temperature = TEMPERATURE[_index(INSULATIONS, np.asarray(insulation, dtype=str)), buried,
+                                _grid_index(temperature, TEMPERATURES[0], 1, len(_DEGREES))]
+    circuits = np.clip(np.asarray(circuits), 0, MAX_CIRCUITS + 1)
+    k_grouping = GROUPING_FACTOR[_index(ARRANGEMENTS, np.asarray(arrangement, dtype=str)), circuits]
+    k_soil = SOIL_FACTOR[method, _grid_index(soil_thermal_resistivity, SOIL_RESISTIVITIES[0], SOIL_STEP,
+                                             len(_SOIL_GRID))]
+    return method, METHOD_CONDUIT[method], k_temperature * k_grouping * k_soil
+
+
+def method_factor(method, cable_mm2):
+    """k_method of each (method index, section), interpolated on log(section)."""
+    log_mm2 = np.log(np.asarray(cable_mm2, dtype=float))
+    hi = np.clip(np.searchsorted(_LOG_SECTIONS, log_mm2, side='right'), 1, len(SECTIONS) - 1)
+    lo = hi - 1
+    t = np.clip((log_mm2 - _LOG_SECTIONS[lo]) / (_LOG_SECTIONS[hi] - _LOG_SECTIONS[lo]), 0, 1)
+    a_lo = METHOD_RATIO[method, lo]
+    return a_lo + (METHOD_RATIO[method, hi] - a_lo) * t
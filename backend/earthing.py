@@ -0,0 +1,445 @@
+"""Earthing system resistance from a self and mutual resistance matrix.
+
+An earthing system is any set of bonded vertical rods and horizontal
+conductors, in uniform or two-layer soil:
+
+    {"soil": {"resistivity": 300, "lower_resistivity": 60, "upper_thickness": 2},
+     "rods": [{"x": 0, "y": 0, "length": 3, "diameter": 0.016, "depth": 0}],
+     "conductors": [{"x1": 0, "y1": 0, "x2": 40, "y2": 0, "depth": 0.5, "diameter": 0.01}],
+     "grid": {"length": 40, "width": 30, "spacing": 5, "depth": 0.5, "rods": "perimeter", "rod_length": 3},
+     "fault_current_a": 10000, "segment_m": 3}
+
+``grid`` adds a rectangular mesh of conductors, with rods at none of its
+crossings, its corners, its perimeter or all of them. Without
+``lower_resistivity`` the soil is uniform; depths are below the surface.
+
+Every electrode is cut into segments of at most ``segment_m`` that each
+leak a uniform current (average-potential method). R[i, j] is the mean
+potential of segment i per ampere leaking from segment j: the line-source
+integral over j (and its images) at Gauss points along i, with the
+thin-wire kernel √(r² + a²) so that a segment's potential on itself is
+its surface potential. Images are those of the soil surface and, in
+two-layer soil, the series of the layer boundary with reflection
+coefficient K = (ρ2 - ρ1) / (ρ2 + ρ1), cut once |K|^n < IMAGE_TOLERANCE;
+rods are split at the boundary. With all electrodes bonded, R·I = 1 V
+gives the leakage currents and the system resistance is 1 / ΣI.
+
+``design`` searches the rod count and spacing of a line, ring or grid of
+rods (optionally bonded by bare conductors) for a target resistance, and
+``rod_line`` gives the resistance of 1…n rods in a line for whole columns
+of inputs at once (the /calculate-grounding kernel).
+"""
+import math
+
+import numpy as np
+
+SEGMENT_M = 3.0
+MAX_SEGMENTS = 3000
+GAUSS_POINTS = 6
+IMAGE_TOLERANCE = 1e-3
+MAX_IMAGES = 100
+CHUNK_CELLS = 2_000_000  # segment pairs × Gauss points per array operation
+NEAR_LENGTHS = 4  # pairs closer than this many segment lengths are integrated exactly
+TABLE_POINTS = 256
+MAX_DEPTH_PAIRS = 64
+GRID_RODS = ('none', 'corners', 'perimeter', 'all')
+ARRANGEMENTS = ('line', 'ring', 'grid')
+MAX_DESIGN_RODS = 400
+MAX_SPACINGS = 8
+
+_NODES, _WEIGHTS = np.polynomial.legendre.leggauss(GAUSS_POINTS)
+_NODES = (_NODES + 1) / 2
+_WEIGHTS = _WEIGHTS / 2
+
+
+def _number(data, key, default):
+    """``data[key]`` (or ``default``) as a finite float."""
+    try:
+        value = float(data.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+
+def _line(p, a, b, length, radius):
+    """∫ ds / r over the segment a–b seen from p, with the thin-wire kernel r = √(d² + radius²)."""
+    ra = np.sqrt(((p - a) ** 2).sum(axis=-1) + radius ** 2)
+    rb = np.sqrt(((p - b) ** 2).sum(axis=-1) + radius ** 2)
+    return np.log((ra + rb + length) / (ra + rb - length))
+
+
+# ─── Soil ────────────────────────────────────────────────────────────
+def parse_soil(soil):
+    """(ρ1, ρ2, H) of the upper layer, the lower layer and the upper layer thickness.
+
+    Uniform soil has ρ2 = ρ1 and H = inf.
+    """
+    rho1 = _number(soil, 'resistivity', 100)
+    rho2 = _number(soil, 'lower_resistivity', rho1)
+    thickness = _number(soil, 'upper_thickness', 1) if rho2 != rho1 and 'upper_thickness' in soil else math.inf
+    if rho1 <= 0 or rho2 <= 0:
+        raise ValueError("Soil resistivities must be > 0")
+    if thickness <= 0:
+        raise ValueError("upper_thickness must be > 0")
+    return rho1, rho2, thickness
+
+
+def _images(rho1, rho2, thickness):
+    """{(observer layer, source layer): [(weight, sign, shift, near), ...]}.
+
+    A source segment at depths z is seen through images at sign·z + shift,
+    weighted relative to ρ1. ``near`` images are integrated at every Gauss
+    point of the observer, the others at its midpoint.
+    """
+    surface = [(1.0, 1, 0.0, True), (1.0, -1, 0.0, True)]
+    if math.isinf(thickness):
+        return {(0, 0): surface}
+    k = (rho2 - rho1) / (rho2 + rho1)
+    count = MAX_IMAGES if abs(k) > 1 - 1e-9 else int(min(MAX_IMAGES, max(1, math.ceil(
+        math.log(IMAGE_TOLERANCE) / math.log(abs(k))) if k else 1)))
+    shifts = [(n, 2 * n * thickness, k ** n) for n in range(count + 1)]
+    lower = (1 + k) / (1 - k)  # ρ2 / ρ1
+    return {
+        (0, 0): surface + [(w, sign, side * shift, n == 1)
+                           for n, shift, w in shifts[1:] for sign in (1, -1) for side in (1, -1)],
+        (1, 0): [((1 + k) * w, sign, -shift, n <= 1) for n, shift, w in shifts for sign in (1, -1)],
+        (0, 1): [((1 + k) * w, sign, sign * shift, n <= 1) for n, shift, w in shifts for sign in (1, -1)],
+        (1, 1): [(lower, 1, 0.0, True), (-lower * k, -1, 2 * thickness, True)]
+                + [(lower * (1 - k * k) * w, -1, -shift, n <= 1) for n, shift, w in shifts],
+    }
+
+
+# ─── Electrodes ──────────────────────────────────────────────────────
+def _grid(grid):
+    """Conductors and rods of a rectangular mesh (see the module docstring)."""
+    length, width = _number(grid, 'length', 0), _number(grid, 'width', 0)
+    spacing = _number(grid, 'spacing', 5)
+    if length <= 0 or width <= 0 or spacing <= 0:
+        raise ValueError("Grid length, width and spacing must be > 0")
+    xs = np.linspace(0, length, max(1, round(length / spacing)) + 1)
+    ys = np.linspace(0, width, max(1, round(width / spacing)) + 1)
+    if len(xs) * len(ys) > MAX_SEGMENTS:
+        raise ValueError(f"Grid has more than {MAX_SEGMENTS} crossings")
+    conductor = {"depth": grid.get('depth', 0.5), "diameter": grid.get('diameter', 0.01)}
+    conductors = ([{"x1": x, "y1": 0, "x2": x, "y2": width, **conductor} for x in xs]
+                  + [{"x1": 0, "y1": y, "x2": length, "y2": y, **conductor} for y in ys])
+    placement = grid.get('rods', 'none')
+    if placement not in GRID_RODS:
+        raise ValueError(f"Grid rods must be one of {', '.join(GRID_RODS)}")
+    x, y = np.meshgrid(xs, ys)
+    edge = (x == 0) | (x == length) | (y == 0) | (y == width)
+    corner = ((x == 0) | (x == length)) & ((y == 0) | (y == width))
+    where = {'none': np.zeros_like(edge), 'corners': corner, 'perimeter': edge, 'all': np.ones_like(edge)}[placement]
+    rod = {"length": grid.get('rod_length', 3), "diameter": grid.get('rod_diameter', 0.016),
+           "depth": grid.get('depth', 0.5)}
+    rods = [{"x": float(px), "y": float(py), **rod} for px, py in zip(x[where], y[where])]
+    return rods, conductors
+
+
+def electrodes(data):
+    """Rods and conductors of a request as (kind, start, end, diameter) rows."""
+    rods = list(data.get('rods', []))
+    conductors = list(data.get('conductors', []))
+    if data.get('grid'):
+        grid_rods, grid_conductors = _grid(data['grid'])
+        rods += grid_rods
+        conductors += grid_conductors
+    rows = []
+    for rod in rods:
+        x, y, top = _number(rod, 'x', 0), _number(rod, 'y', 0), _number(rod, 'depth', 0)
+        length = _number(rod, 'length', 3)
+        if length <= 0 or top < 0:
+            raise ValueError("Rod lengths must be > 0 and depths >= 0")
+        rows.append(('rod', (x, y, top), (x, y, top + length), _number(rod, 'diameter', 0.016)))
+    for conductor in conductors:
+        depth = _number(conductor, 'depth', 0.5)
+        start = (_number(conductor, 'x1', 0), _number(conductor, 'y1', 0), depth)
+        end = (_number(conductor, 'x2', 0), _number(conductor, 'y2', 0), depth)
+        if start == end or depth < 0:
+            raise ValueError("Conductors must have two distinct ends and a depth >= 0")
+        rows.append(('conductor', start, end, _number(conductor, 'diameter', 0.01)))
+    if not rows:
+        raise ValueError("The earthing system has no rods or conductors")
+    if any(diameter <= 0 for *_, diameter in rows):
+        raise ValueError("Electrode diameters must be > 0")
+    return rows
+
+
+def segments(rows, segment_m=SEGMENT_M, thickness=math.inf):
+    """(start, end, length, radius, layer, electrode) arrays of the segments of every electrode."""
+    starts, ends, electrode = [], [], []
+    for i, (_, start, end, _) in enumerate(rows):
+        start, end = np.array(start), np.array(end)
+        cuts = np.linspace(0, 1, max(1, math.ceil(np.linalg.norm(end - start) / segment_m)) + 1)
+        if start[2] < thickness < end[2]:  # rods crossing the layer boundary are cut at it
+            cuts = np.union1d(cuts, (thickness - start[2]) / (end[2] - start[2]))
+        points = start + cuts[:, None] * (end - start)
+        starts.append(points[:-1])
+        ends.append(points[1:])
+        electrode += [i] * (len(cuts) - 1)
+    start, end = np.vstack(starts), np.vstack(ends)
+    if len(start) > MAX_SEGMENTS:
+        raise ValueError(f"The earthing system has more than {MAX_SEGMENTS} segments; increase segment_m")
+    radius = np.array([rows[i][3] / 2 for i in electrode])
+    layer = ((start[:, 2] + end[:, 2]) / 2 > thickness).astype(int)
+    return start, end, np.linalg.norm(end - start, axis=1), radius, layer, np.array(electrode)
+
+
+# ─── Solver ──────────────────────────────────────────────────────────
+def _far(distance, zi, zj, images):
+    """Σ weight / r over the images of point sources at depths zj seen from depths zi."""
+    with np.errstate(divide='ignore'):  # coincident midpoints are near pairs, integrated instead
+        return sum(weight / np.sqrt(distance ** 2 + (zi - sign * zj - shift) ** 2)
+                   for weight, sign, shift, _ in images)
+
+
+def _far_pair(distance, zi, zj, images):
+    """_far for one depth pair: a function of the horizontal distance only, tabulated on a log scale."""
+    if distance.size < 4 * TABLE_POINTS:
+        return _far(distance, zi, zj, images)
+    low, high = max(distance.min(), 1e-3), max(distance.max(), 2e-3)
+    nodes = np.geomspace(low, high, TABLE_POINTS)
+    return np.interp(np.log(np.maximum(distance, low)), np.log(nodes), _far(nodes, zi, zj, images))
+
+
+def resistance_matrix(start, end, length, radius, layer, soil):
+    """Symmetric matrix of self and mutual resistances (Ω) between segments.
+
+    Pairs further apart than NEAR_LENGTHS segment lengths are point
+    sources at their midpoints; nearer ones are integrated exactly.
+    """
+    rho1, rho2, thickness = soil
+    images = _images(rho1, rho2, thickness)
+    middle = (start + end) / 2
+    depth = middle[:, 2]
+    distance = np.hypot(middle[:, None, 0] - middle[None, :, 0], middle[:, None, 1] - middle[None, :, 1])
+    near = distance < NEAR_LENGTHS * np.maximum.outer(length, length)
+    matrix = np.zeros((len(length), len(length)))
+    for (observer, source), terms in images.items():
+        rows, cols = np.flatnonzero(layer == observer), np.flatnonzero(layer == source)
+        if not len(rows) or not len(cols):
+            continue
+        row_depths, row_group = np.unique(depth[rows], return_inverse=True)
+        col_depths, col_group = np.unique(depth[cols], return_inverse=True)
+        if len(row_depths) * len(col_depths) > MAX_DEPTH_PAIRS:  # scattered depths: no tables
+            matrix[np.ix_(rows, cols)] = _far(distance[np.ix_(rows, cols)], depth[rows][:, None], depth[cols], terms)
+            continue
+        for i, zi in enumerate(row_depths):
+            for j, zj in enumerate(col_depths):
+                r, c = rows[row_group.ravel() == i], cols[col_group.ravel() == j]
+                matrix[np.ix_(r, c)] = _far_pair(distance[np.ix_(r, c)], zi, zj, terms)
+    matrix *= rho1 / (4 * np.pi)
+
+    # Near pairs: line integral over the source (and its surface image) at Gauss points of the observer
+    i, j = np.nonzero(near)
+    points = start[i][:, None] + _NODES[:, None] * (end[i] - start[i])[:, None]
+    exact = np.zeros(len(i))
+    far = np.zeros(len(i))
+    chunk = max(1, CHUNK_CELLS // GAUSS_POINTS)
+    for (observer, source), terms in images.items():
+        pairs = np.flatnonzero((layer[i] == observer) & (layer[j] == source))
+        deep = [term for term in terms if not term[3]]
+        far[pairs] = _far(distance[i[pairs], j[pairs]], depth[i[pairs]], depth[j[pairs]], deep)
+        for k in range(0, len(pairs), chunk):
+            p = pairs[k:k + chunk]
+            for weight, sign, shift, _ in (term for term in terms if term[3]):
+                a = start[j[p]] * [1, 1, sign] + [0, 0, shift]
+                b = end[j[p]] * [1, 1, sign] + [0, 0, shift]
+                exact[p] += weight * _line(points[p], a[:, None], b[:, None], length[j[p]][:, None],
+                                           radius[j[p]][:, None]) @ _WEIGHTS
+    matrix[i, j] = rho1 / (4 * np.pi) * (exact / length[j] + far)
+    return (matrix + matrix.T) / 2
+
+
+def _solve(rows, soil, segment_m):
+    start, end, length, radius, layer, electrode = segments(rows, segment_m, soil[2])
+    current = np.linalg.solve(resistance_matrix(start, end, length, radius, layer, soil), np.ones(len(length)))
+    return 1 / current.sum(), current / current.sum(), electrode, len(length)
+
+
+def solve(data):
+    """Resistance and leakage currents of an earthing system (see the module docstring)."""
+    soil = parse_soil(data.get('soil', {}))
+    segment_m = _number(data, 'segment_m', SEGMENT_M)
+    if segment_m <= 0:
+        raise ValueError("segment_m must be > 0")
+    fault_a = data.get('fault_current_a')
+    if fault_a is not None:
+        fault_a = _number(data, 'fault_current_a', 0)
+    rows = electrodes(data)
+    resistance, share, electrode, count = _solve(rows, soil, segment_m)
+    share = np.bincount(electrode, weights=share, minlength=len(rows))
+    lengths = np.array([np.linalg.norm(np.subtract(end, start)) for _, start, end, _ in rows])
+    kinds = np.array([kind for kind, *_ in rows])
+    return {
+        "resistance_ohm": round(float(resistance), 4),
+        "gpr_v": round(float(fault_a) * resistance, 1) if fault_a is not None else None,
+        "soil": {"resistivity": soil[0], "lower_resistivity": soil[1],
+                 "upper_thickness": None if math.isinf(soil[2]) else soil[2]},
+        "electrodes": [{"type": str(kind), "length_m": round(float(length), 3),
+                        "leakage_pct": round(float(s) * 100, 3),
+                        "current_a": round(float(fault_a) * float(s), 2) if fault_a is not None else None}
+                       for kind, length, s in zip(kinds, lengths, share)],
+        "summary": {
+            "rods": int((kinds == 'rod').sum()),
+            "rod_m": round(float(lengths[kinds == 'rod'].sum()), 2),
+            "conductor_m": round(float(lengths[kinds == 'conductor'].sum()), 2),
+            "segments": count,
+        },
+    }
+
+
+# ─── Design search ───────────────────────────────────────────────────
+def _layout(arrangement, count, spacing, rod, bond):
+    """Rods (and bonding conductors) of ``count`` rods ``spacing`` apart."""
+    if arrangement == 'line':
+        xy = np.column_stack([np.arange(count) * spacing, np.zeros(count)])
+        pairs = [(i, i + 1) for i in range(count - 1)]
+    elif arrangement == 'ring':
+        angle = 2 * np.pi * np.arange(count) / count
+        r = spacing / (2 * math.sin(math.pi / count)) if count > 1 else 0.0
+        xy = np.column_stack([r * np.cos(angle), r * np.sin(angle)])
+        pairs = [(i, (i + 1) % count) for i in range(count)] if count > 2 else [(0, 1)] * (count == 2)
+    else:
+        cols = math.ceil(math.sqrt(count))
+        index = np.arange(count)
+        xy = np.column_stack([index % cols, index // cols]) * spacing
+        pairs = [(i, i + 1) for i in range(count - 1) if (i + 1) % cols] + [(i, i + cols) for i in range(count - cols)]
+    data = {"rods": [{"x": x, "y": y, **rod} for x, y in xy.tolist()]}
+    if bond is not None:
+        data["conductors"] = [{"x1": xy[i, 0], "y1": xy[i, 1], "x2": xy[j, 0], "y2": xy[j, 1], **bond}
+                              for i, j in pairs]
+    return data
+
+
+def design(params):
+    """Fewest rods, and then the smallest spacing, meeting a target resistance.
+
+    {"soil": {...}, "target_resistance": 10, "arrangement": "line" | "ring" | "grid",
+     "rod_length": 3, "rod_diameter": 0.016, "spacings": [3, 6, 9], "max_rods": 64,
+     "bonded": true, "burial_depth": 0.5, "conductor_diameter": 0.01}
+
+    The resistance falls with every rod added, so each spacing doubles the
+    rod count until the target is met and then bisects. Repeated spacings
+    are searched once, and at most MAX_SPACINGS distinct ones per request.
+    """
+    soil = parse_soil(params.get('soil', {}))
+    target = _number(params, 'target_resistance', 10)
+    arrangement = params.get('arrangement', 'line')
+    rod_length = _number(params, 'rod_length', 3)
+    rod = {"length": rod_length, "diameter": _number(params, 'rod_diameter', 0.016), "depth": 0}
+    spacings = params.get('spacings', [rod_length * f for f in (1, 1.5, 2, 3, 4)])
+    if not isinstance(spacings, list) or not spacings:
+        raise ValueError("spacings must be a non-empty list")
+    try:
+        spacings = sorted(set(float(spacing) for spacing in spacings))
+    except (TypeError, ValueError):
+        raise ValueError("spacings must be numbers") from None
+    if not all(math.isfinite(spacing) for spacing in spacings):
+        raise ValueError("spacings must be finite numbers")
+    max_rods = int(params.get('max_rods', 64))
+    segment_m = _number(params, 'segment_m', SEGMENT_M)
+    bond = ({"depth": _number(params, 'burial_depth', 0.5), "diameter": _number(params, 'conductor_diameter', 0.01)}
+            if params.get('bonded', False) else None)
+    if arrangement not in ARRANGEMENTS:
+        raise ValueError(f"arrangement must be one of {', '.join(ARRANGEMENTS)}")
+    if target <= 0 or rod_length <= 0 or segment_m <= 0 or spacings[0] <= 0:
+        raise ValueError("target_resistance, rod_length, segment_m and spacings must be > 0")
+    if len(spacings) > MAX_SPACINGS:
+        raise ValueError(f"At most {MAX_SPACINGS} different spacings per design")
+    if not 1 <= max_rods <= MAX_DESIGN_RODS:
+        raise ValueError(f"max_rods must be between 1 and {MAX_DESIGN_RODS}")
+
+    solved = {}
+
+    def resistance(count, spacing):
+        if (count, spacing) not in solved:
+            rows = electrodes(_layout(arrangement, count, spacing, rod, bond))
+            solved[count, spacing] = _solve(rows, soil, segment_m)[0]
+        return solved[count, spacing]
+
+    candidates = []
+    for spacing in spacings:
+        # Double the rod count until the target is met, then bisect: resistance(low) > target >= resistance(high)
+        low, high = 0, 1
+        while high < max_rods and resistance(high, spacing) > target:
+            low, high = high, min(2 * high, max_rods)
+        if resistance(high, spacing) > target:
+            candidates.append({"spacing_m": spacing, "rods": None,
+                               "resistance_ohm": round(float(resistance(high, spacing)), 4)})
+            continue
+        while high - low > 1:
+            middle = (low + high) // 2
+            if resistance(middle, spacing) <= target:
+                high = middle
+            else:
+                low = middle
+        candidates.append({"spacing_m": spacing, "rods": high,
+                           "resistance_ohm": round(float(resistance(high, spacing)), 4)})
+
+    feasible = [c for c in candidates if c['rods'] is not None]
+    best = min(feasible, key=lambda c: (c['rods'], c['spacing_m'])) if feasible else None
+    if best is not None:
+        best = {**best, **solve({"soil": params.get('soil', {}), "segment_m": segment_m,
+                                 **_layout(arrangement, best['rods'], best['spacing_m'], rod, bond)})['summary']}
+    return {
+        "target_ohm": target,
+        "arrangement": arrangement,
+        "meets_target": best is not None,
+        "best": best,
+        "candidates": candidates,
+        "solves": len(solved),
+    }
+
+
+# ─── Rods in a line (calculator kernel) ──────────────────────────────
+def rod_line(resistivity, length, diameter, spacing, count):
+    """Resistance of 1…``count`` rods driven from the surface in a line, as (rows × count).
+
+    The resistance matrix of equally spaced identical rods is symmetric
+    Toeplitz, so the Levinson recursion solves every rod count in one
+    O(count²) pass per row.
+    """
+    resistivity, length, diameter, spacing = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(c, dtype=float)) for c in (resistivity, length, diameter, spacing)))
+    chunk = max(1, CHUNK_CELLS // (count * GAUSS_POINTS))
+    if len(length) > chunk:
+        return np.vstack([rod_line(resistivity[i:i + chunk], length[i:i + chunk], diameter[i:i + chunk],
+                                   spacing[i:i + chunk], count) for i in range(0, len(length), chunk)])
+    # Mean potential along rod 0 per ampere from rod k, whose surface image makes it one segment -L…L
+    d2 = (spacing[:, None] * np.arange(count)) ** 2 + (diameter[:, None] / 2) ** 2
+    z = (length[:, None] * _NODES)[:, None, :]
+    half = length[:, None, None]
+    ra = np.sqrt(d2[:, :, None] + (z + half) ** 2)
+    rb = np.sqrt(d2[:, :, None] + (z - half) ** 2)
+    f = np.log((ra + rb + 2 * half) / (ra + rb - 2 * half)) @ _WEIGHTS
+    column = resistivity[:, None] / (4 * np.pi * length[:, None]) * f
+    return column[:, :1] / _levinson_sums(column / column[:, :1])
+
+
+def _levinson_sums(t):
+    """Σx of the solutions of T_n x = 1 for n = 1…N, T_n the leading blocks of the unit-diagonal
+    symmetric Toeplitz matrices with first columns ``t`` (one per row)."""
+    r = np.ascontiguousarray(t.T[1:])  # orders along axis 0: every step works on whole rows
+    size, rows = t.shape[1], t.shape[0]
+    x = np.zeros((size, rows))
+    y = np.zeros((size, rows))
+    sums = np.ones((size, rows))
+    x[0] = 1
+    beta = np.ones(rows)
+    alpha = -r[0] if size > 1 else None
+    if size > 1:
+        y[0] = alpha
+    for k in range(1, size):
+        beta = (1 - alpha ** 2) * beta
+        mu = (1 - np.einsum('ij,ij->j', r[:k], x[k - 1::-1])) / beta
+        x[:k] += mu * y[k - 1::-1]
+        x[k] = mu
+        sums[k] = sums[k - 1] + mu * (1 + y[:k].sum(axis=0))
+        if k < size - 1:
+            alpha = (-r[k] - np.einsum('ij,ij->j', r[:k], y[k - 1::-1])) / beta
+            y[:k] += alpha * y[k - 1::-1]
+            y[k] = alpha
+    return sums.T
@@ -0,0 +1,172 @@
+"""Point-by-point illuminance on the work plane.
+
+The lumen method in ``kernels.lighting`` only gives an average level. This
+module computes the direct illuminance at every point of a work-plane grid
+from every luminaire (inverse-square and cosine law)::
+
+    E = I(γ) · cos γ / d²  =  I(γ) · h / d³
+
+where h is the luminaire height above the work plane and d the distance to
+the point. Luminaires are either the rows × cols layout suggested by the
+lighting calculator or an explicit position list, and their intensity is
+either a Lambertian downlight or a rotationally symmetric table in cd/klm:
+
+    {"gamma_deg": [0, 10, 20, ..., 90], "cd_per_klm": [318, 313, 299, ..., 0]}
+
+Inter-reflections from walls and ceiling are not included, so the results
+are the (conservative) direct component, multiplied by the maintenance
+factor.
+"""
+import math
+
+import numpy as np
+
+import kernels
+
+MAX_GRID_POINTS = 2_000_000
+MAX_LUMINAIRES = 5000
+# Luminaire × point pairs per request (about a second of compute)
+MAX_PAIRS = 200_000_000
+# Luminaire × point pairs evaluated per step (bounds the temporary arrays)
+CHUNK_PAIRS = 1 << 22
+# Resolution of intensity tables after resampling in cos² γ
+TABLE_SAMPLES = 1 << 16
+
+
+def grid_spacing(length, width):
+    """Maximum grid spacing of EN 12464-1: p = 0.2 · 5^log10(d)."""
+    return 0.2 * 5 ** math.log10(max(length, width))
+
+
+def layout_positions(room_length, room_width, rows, cols):
+    """Centres of a rows × cols layout (rows along the length, cols along the width)."""
+    x = (np.arange(rows) + 0.5) * room_length / rows
+    y = (np.arange(cols) + 0.5) * room_width / cols
+    return np.repeat(x, cols), np.tile(y, rows)
+
+
+def _intensity_table(table, luminaire_lm):
+    """I(γ) · cos γ in cd per luminaire, sampled uniformly in u = cos² γ.
+
+    Returns None for the default Lambertian downlight. Sampling in u lets the
+    kernel look values up without sqrt or arccos (u = h² / d²).
+    """
+    if table is None:
+        return None
+
+    gamma = np.asarray(table.get('gamma_deg', []), dtype=float)
+    cd = np.asarray(table.get('cd_per_klm', []), dtype=float)
+    if gamma.ndim != 1 or gamma.shape != cd.shape or len(gamma) < 2:
+        raise ValueError("Intensity table needs matching gamma_deg and cd_per_klm lists (at least 2 values)")
+    if gamma[0] < 0 or gamma[-1] > 180 or np.any(np.diff(gamma) <= 0):
+        raise ValueError("gamma_deg must increase within 0-180°")
+    if not np.all(np.isfinite(cd)) or np.any(cd < 0):
+        raise ValueError("cd_per_klm must be finite and non-negative")
+
+    cos_gamma = np.sqrt(np.linspace(0.0, 1.0, TABLE_SAMPLES))
+    intensity = np.interp(np.degrees(np.arccos(cos_gamma)), gamma, cd, right=0.0) * (luminaire_lm / 1000.0)
+    return (intensity * cos_gamma).astype(np.float32)
+
+
+def _luminaires(data, inputs):
+    """x, y, z arrays of the custom luminaire list, or of the suggested layout."""
+    custom = data.get('luminaires')
+    if custom is not None:
+        x = np.array([float(lum['x']) for lum in custom])
+        y = np.array([float(lum['y']) for lum in custom])
+        z = np.array([float(lum.get('z', inputs['room_height'])) for lum in custom])
+        return x, y, z, None
+
+    layout = kernels.run('lighting', inputs)
+    rows, cols = layout['layout_rows'], layout['layout_cols']
+    x, y = layout_positions(inputs['room_length'], inputs['room_width'], rows, cols)
+    return x, y, np.full(len(x), inputs['room_height']), layout
+
+
+def illuminance_grid(data):
+    """Illuminance statistics (and optionally the grid) for one room.
+
+    ``data`` holds the /calculate-lighting fields plus optional
+    ``luminaires`` ([{x, y, z}] in metres, z defaulting to the room
+    height), ``intensity`` (table as above), ``grid_spacing`` (m, default
+    EN 12464-1), ``border_m`` (excluded strip along the walls) and
+    ``include_grid``.
+    """
+    inputs = kernels.parse_inputs('lighting', data)
+    length, width, work_plane = inputs['room_length'], inputs['room_width'], inputs['work_plane']
+    if not (length > 0 and width > 0):
+        raise ValueError("Room length and width must be > 0")
+
+    x, y, z, layout = _luminaires(data, inputs)
+    if len(x) == 0:
+        raise ValueError("No luminaires to evaluate")
+    if len(x) > MAX_LUMINAIRES:
+        raise ValueError(f"At most {MAX_LUMINAIRES} luminaires are supported")
+    h = z - work_plane
+    if not np.all(np.isfinite(x) & np.isfinite(y) & (h > 0)):
+        raise ValueError("Luminaires must be above the work plane")
+
+    border = float(data.get('border_m', 0))
+    spacing = float(data.get('grid_spacing') or grid_spacing(length, width))
+    if not (spacing > 0 and 0 <= border < min(length, width) / 2):
+        raise ValueError("grid_spacing must be > 0 and border_m smaller than half the room")
+
+    # Points at the centres of grid cells over the task area
+    nx = math.ceil((length - 2 * border) / spacing)
+    ny = math.ceil((width - 2 * border) / spacing)
+    if nx * ny > MAX_GRID_POINTS:
+        raise ValueError(f"Grid of {nx} × {ny} points exceeds {MAX_GRID_POINTS}; increase grid_spacing")
+    if nx * ny * len(x) > MAX_PAIRS:
+        raise ValueError(f"{nx * ny} points × {len(x)} luminaires exceeds {MAX_PAIRS} pairs; "
+                         "increase grid_spacing")
+    px = border + (np.arange(nx) + 0.5) * (length - 2 * border) / nx
+    py = border + (np.arange(ny) + 0.5) * (width - 2 * border) / ny
+
+    table = _intensity_table(data.get('intensity'), inputs['luminaire_lm'])
+    lambertian = (inputs['luminaire_lm'] / math.pi) * h ** 2
+
+    # E[i, j] = Σ_k I(γ) · cos γ / d² over luminaire chunks, where
+    # d² = (px_i − x_k)² + (py_j − y_k)² + h_k² is built from two small outer
+    # differences. Pair arrays are float32 (lux needs no more), sums float64.
+    lux = np.zeros((nx, ny))
+    step = max(1, CHUNK_PAIRS // (nx * ny))
+    for start in range(0, len(x), step):
+        k = slice(start, start + step)
+        dx2 = ((px[None, :] - x[k, None]) ** 2).astype(np.float32)
+        dy2 = ((py[None, :] - y[k, None]) ** 2 + h[k, None] ** 2).astype(np.float32)
+        d2 = dx2[:, :, None] + dy2[:, None, :]
+        if table is None:
+            # Lambertian: I0 · cos² γ / d² = I0 · h² / d⁴
+            contribution = np.square(d2)
+            np.divide(lambertian[k, None, None].astype(np.float32), contribution, out=contribution)
+        else:
+            u = np.divide((h[k, None, None] ** 2).astype(np.float32), d2)
+            u *= TABLE_SAMPLES - 1
+            contribution = table[u.astype(np.int32)]
+            contribution /= d2
+        lux += contribution.sum(axis=0)
+    lux *= inputs['maintenance_factor']
+
+    e_min, e_avg, e_max = float(lux.min()), float(lux.mean()), float(lux.max())
+    results = {
+        "num_luminaires": len(x),
+        "grid_nx": nx,
+        "grid_ny": ny,
+        "grid_points": nx * ny,
+        "grid_spacing_m": round(spacing, 3),
+        "e_min_lux": round(e_min, 1),
+        "e_avg_lux": round(e_avg, 1),
+        "e_max_lux": round(e_max, 1),
+        "uniformity_u0": round(e_min / e_avg, 3) if e_avg > 0 else None,
+        "uniformity_ud": round(e_min / e_max, 3) if e_max > 0 else None,
+        "target_lux": inputs['target_lux'],
+        "meets_target": e_avg >= inputs['target_lux'],
+    }
+    if layout is not None:
+        results['layout_rows'] = layout['layout_rows']
+        results['layout_cols'] = layout['layout_cols']
+
+    response = {"results": results, "luminaires": {"x": x.round(3).tolist(), "y": y.round(3).tolist()}}
+    if data.get('include_grid'):
+        response['grid'] = {"x": px.round(3).tolist(), "y": py.round(3).tolist(), "lux": lux.round(1).tolist()}
+    return response
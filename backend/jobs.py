@@ -0,0 +1,113 @@
+"""Background jobs (report rendering) in a bounded process pool.
+
+Jobs run in REPORT_WORKERS separate processes, so rendering never holds up
+the request threads serving /calculate-*. At most MAX_PENDING jobs may be
+queued or running; the newest MAX_FINISHED finished jobs are kept for
+download. Like projects, the job table lives in the memory of the worker
+process that accepted the job.
+
+Long numeric runs (Monte Carlo) are split with ``run_parallel`` over a
+second pool of COMPUTE_WORKERS processes, so they cannot starve reports.
+"""
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+COMPUTE_WORKERS = int(os.environ.get('COMPUTE_WORKERS', os.cpu_count() or 1))
+MAX_PENDING = 32
+MAX_FINISHED = 256
+MAX_WAIT_S = 30
+
+
+class QueueFull(Exception):
+    pass
+
+
+class NotFinished(Exception):
+    pass
+
+
+_executor = None
+_compute_executor = None
+_jobs = OrderedDict()  # job_id -> Future
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        # spawn: never fork a process that may already be running threads
+        _executor = ProcessPoolExecutor(REPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _compute_pool():
+    global _compute_executor
+    if _compute_executor is None:
+        _compute_executor = ProcessPoolExecutor(COMPUTE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _compute_executor
+
+
+def run_parallel(fn, arg_tuples):
+    """``[fn(*args) for args in arg_tuples]``, spread over the compute pool."""
+    global _compute_executor
+    try:
+        futures = [_compute_pool().submit(fn, *args) for args in arg_tuples]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        _compute_executor = None
+        raise
+
+
+def submit(fn, *args):
+    """Queue ``fn(*args)`` in the pool and return the new job id."""
+    with _lock:
+        if sum(not future.done() for future in _jobs.values()) >= MAX_PENDING:
+            raise QueueFull(f"Too many pending jobs (max {MAX_PENDING}), retry later")
+        job_id = uuid.uuid4().hex
+        try:
+            _jobs[job_id] = _pool().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): start a fresh pool
+            global _executor
+            _executor = None
+            _jobs[job_id] = _pool().submit(fn, *args)
+
+        finished = [job for job, future in _jobs.items() if future.done()]
+        for job in finished[:len(finished) - MAX_FINISHED]:
+            del _jobs[job]
+    return job_id
+
+
+def _future(job_id):
+    with _lock:
+        return _jobs[job_id]
+
+
+def status(job_id, wait_s=0):
+    """State of a job (queued, running, done or failed) and error detail.
+
+    Waits up to ``wait_s`` seconds (capped at MAX_WAIT_S) for it to finish.
+    Raises KeyError for unknown or expired jobs.
+    """
+    future = _future(job_id)
+    if wait_s > 0:
+        wait([future], timeout=min(wait_s, MAX_WAIT_S))
+    if not future.done():
+        return ('running' if future.running() else 'queued'), None
+    if future.exception() is not None:
+        return 'failed', str(future.exception())
+    return 'done', None
+
+
+def result(job_id):
+    """Return value of a finished job; NotFinished while it is still pending."""
+    future = _future(job_id)
+    if not future.done():
+        raise NotFinished("Job has not finished yet")
+    return future.result()
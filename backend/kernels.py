@@ -0,0 +1,853 @@
+"""Vectorised calculation kernels behind the /calculate-* endpoints.
+
+Every kernel takes its inputs as columns (scalars, lists or NumPy arrays that
+broadcast against each other) and returns a dict of result columns, so one
+circuit and a 50k-row cable schedule go through exactly the same formulas.
+The Flask views only parse the request body and format the first row.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+import batteries
+import catalogs
+import derating
+import earthing
+import schemas
+from schemas import Choice
+
+SQRT3 = 1.732
+
+# Resistivity at 70°C (ohm*mm²/m): Copper = 0.0225, Aluminum = 0.036
+RESISTIVITY_CU = 0.0225
+RESISTIVITY_AL = 0.036
+
+# Standard sizes and cable capacities live in catalogs.py
+
+# Instantaneous trip multipliers (upper bound – breaker MUST trip)
+TRIP_MULTIPLIERS = {'B': 5, 'C': 10, 'D': 20}
+
+# Allowed values of the enumerated inputs
+PHASES = Choice('1F_230V', '3F_400V')
+CABLE_TYPES = Choice('Cu', 'Al')
+MOUNTINGS = Choice('open', 'conduit')
+CHARACTERISTICS = Choice(*TRIP_MULTIPLIERS)
+
+
+def _f(column):
+    return np.asarray(column, dtype=float)
+
+
+def _s(column):
+    return np.asarray(column, dtype=str)
+
+
+def _result(**columns):
+    """Broadcast all result columns to one common 1-D shape."""
+    arrays = np.broadcast_arrays(*(np.atleast_1d(c) for c in columns.values()))
+    return dict(zip(columns, arrays))
+
+
+# ─── 1. UPS Sizing ───────────────────────────────────────────────────
+def ups(it_load_kw, runtime_min, redundancy_level, power_factor, growth_margin, safety_margin):
+    power_factor = _f(power_factor)
+    redundancy_level = _s(redundancy_level)
+    growth = _f(growth_margin) / 100
+    safety = _f(safety_margin) / 100
+
+    apparent_power_kva = _f(it_load_kw) / power_factor
+    design_load = apparent_power_kva * (1 + growth) * (1 + safety)
+
+    n_plus_1 = redundancy_level == "N+1"
+    ups_rating = np.where(n_plus_1, design_load / 2, design_load)
+    configuration = np.where(redundancy_level == "2N", "Dual Path (A+B)",
+                             np.where(n_plus_1, "Parallel Redundant", "Single Path"))
+
+    # Battery sizing (simplified): fixed 480 V DC bus, 92% efficiency
+    efficiency = 0.92
+    dc_bus = 480
+    runtime_hr = _f(runtime_min) / 60
+    required_ah = (design_load * 1000 * runtime_hr) / (dc_bus * efficiency)
+
+    return _result(
+        configuration=configuration,
+        ups_unit_min_kw=ups_rating,
+        ups_unit_min_kva=ups_rating / power_factor,
+        total_battery_ah=required_ah,
+        heat_dissipation_btu=design_load * 3412,
+        power_factor=power_factor,
+        growth_margin_pct=growth * 100,
+        safety_margin_pct=safety * 100,
+    )
+
+
+# ─── 2. Cable / Power ────────────────────────────────────────────────
+def cable_ampacity(cable_type, mounting, cable_mm2, catalog=catalogs.DEFAULT, **installation):
+    """Derated current capacity and its correction factor (see derating.py).
+
+    The capacity is NaN for sections the catalog cannot rate and for
+    installation conditions the IEC tables do not cover.
+    """
+    cable_mm2 = _f(cable_mm2)
+    material = (_s(cable_type) != 'Cu').astype(int)
+    method, conduit, k = derating.conditions(mounting, **installation)
+    factor = derating.method_factor(method, cable_mm2) * k
+    capacity = catalogs.by_catalog(catalog, lambda c, *columns: c.cables.capacity(*columns),
+                                   material, conduit, cable_mm2)
+    return capacity * factor, factor
+
+
+def standard_size(catalog, table, values):
+    """Smallest size of ``table`` >= value in each row's catalog (the largest if none is)."""
+    return catalogs.by_catalog(catalog, lambda c, column: getattr(c, table).at_least(column), values)
+
+
+def _line(phases, cable_type, load_kw, power_factor):
+    """Voltage, current, resistivity and drop factor k for each circuit."""
+    single_phase = _s(phases) == '1F_230V'
+    voltage = np.where(single_phase, 230, 400)
+    # I = P / (V * pf) for single phase, I = P / (sqrt(3) * V * pf) for three phase
+    current_a = (_f(load_kw) * 1000) / (voltage * np.where(single_phase, 1, SQRT3) * _f(power_factor))
+    resistivity = np.where(_s(cable_type) == 'Cu', RESISTIVITY_CU, RESISTIVITY_AL)
+    # k = 2 for single-phase, k = √3 for three-phase
+    k = np.where(single_phase, 2, SQRT3)
+    return voltage, current_a, resistivity, k
+
+
+def voltage_drop_pct(k, length_m, current_a, resistance_per_m, voltage):
+    """Voltage drop in % of ``voltage``, k = 2 single-phase, √3 three-phase."""
+    voltage_drop_v = k * length_m * current_a * resistance_per_m
+    return (voltage_drop_v / voltage) * 100
+
+
+def power(load_kw, phases, cable_mm2, cable_type, length_m, mounting, power_factor, catalog=catalogs.DEFAULT,
+          transformer_kva=630, transformer_uk_pct=4, **installation):
+    cable_mm2 = _f(cable_mm2)
+    length_m = _f(length_m)
+    voltage, current_a, resistivity, k = _line(phases, cable_type, load_kw, power_factor)
+
+    resistance_per_m = resistivity / cable_mm2
+    drop_pct = voltage_drop_pct(k, length_m, current_a, resistance_per_m, voltage)
+
+    max_current, correction_factor = cable_ampacity(cable_type, mounting, cable_mm2, catalog, **installation)
+    circuit_breaker = standard_size(catalog, 'breakers', current_a)
+
+    # Short circuit current estimation (simplified, see shortcircuit.py for IEC 60909)
+    isc_transformer = (_f(transformer_kva) * 1000) / (
+        np.where(_s(phases) == '3F_400V', SQRT3, 1) * voltage * (_f(transformer_uk_pct) / 100))
+
+    # Cable impedance limits short circuit
+    cable_impedance = resistance_per_m * length_m
+    short_circuit_ka = np.fmin(isc_transformer, voltage / (cable_impedance * SQRT3)) / 1000
+
+    return _result(
+        current_a=current_a,
+        voltage_drop_pct=drop_pct,
+        short_circuit_ka=short_circuit_ka,
+        cable_max_a=max_current,
+        correction_factor=correction_factor,
+        circuit_breaker_a=circuit_breaker,
+        cable_ok=current_a <= max_current,
+        conditions_rated=np.isfinite(correction_factor),
+        cable_rated=np.isfinite(max_current),
+    )
+
+
+# ─── 3. Transformer Sizing ───────────────────────────────────────────
+def transformer_demand(kw, pf, demand_factor):
+    """Demand kW and kVA of each load in a load list."""
+    demand_kw = _f(kw) * _f(demand_factor)
+    return demand_kw, demand_kw / _f(pf)
+
+
+def transformer(total_kw, total_kva, growth_pct, catalog=catalogs.DEFAULT):
+    design_kva = _f(total_kva) * (1 + _f(growth_pct) / 100)
+    selected_kva = standard_size(catalog, 'transformers', design_kva)
+    loading_pct = (design_kva / selected_kva) * 100
+
+    # Losses estimate (no-load + load losses)
+    no_load_loss_w = selected_kva * 1.8  # ~0.18% typical
+    load_loss_w = selected_kva * 8.5 * (loading_pct / 100) ** 2  # ~0.85% at full load
+
+    return _result(
+        total_demand_kw=_f(total_kw),
+        total_demand_kva=_f(total_kva),
+        design_kva=design_kva,
+        selected_kva=selected_kva,
+        loading_pct=loading_pct,
+        no_load_loss_w=no_load_loss_w,
+        load_loss_w=load_loss_w,
+        total_losses_w=no_load_loss_w + load_loss_w,
+    )
+
+
+def _transformer_totals(data):
+    """Reduce a request's ``loads`` list to total demand kW / kVA."""
+    if 'loads' not in data:
+        return data
+    loads = data['loads']  # list of {name, kw, pf, demand_factor}
+    if not isinstance(loads, list) or not all(isinstance(load, dict) for load in loads):
+        raise schemas.ValidationError({"loads": "expected a list of JSON objects"})
+    demand_kw, demand_kva = transformer_demand(
+        [float(load.get('kw', 0)) for load in loads],
+        [float(load.get('pf', 0.9)) for load in loads],
+        [float(load.get('demand_factor', 1.0)) for load in loads],
+    )
+    return dict(data, total_kw=demand_kw.sum(), total_kva=demand_kva.sum())
+
+
+# ─── 4. Generator Sizing ─────────────────────────────────────────────
+def generator(total_load_kw, motor_starting_kw, power_factor, altitude_m, temperature_c, redundancy,
+              catalog=catalogs.DEFAULT):
+    total_load_kw = _f(total_load_kw)
+    power_factor = _f(power_factor)
+    altitude_m = _f(altitude_m)
+    temperature_c = _f(temperature_c)
+
+    # Altitude derating: 3.5% per 500m above 1000m
+    alt_derating = np.where(altitude_m > 1000, 1 - ((altitude_m - 1000) / 500) * 0.035, 1.0)
+    # Temperature derating: 2% per 5°C above 40°C
+    temp_derating = np.where(temperature_c > 40, 1 - ((temperature_c - 40) / 5) * 0.02, 1.0)
+    derating_factor = alt_derating * temp_derating
+
+    # Motor starting adds ~3x the motor kW for starting
+    peak_kw = total_load_kw + _f(motor_starting_kw) * 2.5
+    continuous_kva = total_load_kw / power_factor
+    peak_kva = peak_kw / power_factor
+    required_kva = peak_kva / derating_factor
+
+    # N+1: each unit carries half load + 1 spare
+    n_plus_1 = _s(redundancy) == 'N+1'
+    unit_kva = np.where(n_plus_1, required_kva / 2, required_kva)
+    selected_kva = standard_size(catalog, 'generators', unit_kva)
+    total_units = np.where(n_plus_1, 3, 1)
+    total_system_kva = selected_kva * total_units
+
+    # Fuel consumption estimate (liters/hr at 75% load) ~0.27 L/kWh
+    fuel_consumption = selected_kva * power_factor * 0.75 * 0.27
+
+    return _result(
+        continuous_kva=continuous_kva,
+        peak_kva=peak_kva,
+        derating_factor=derating_factor,
+        required_kva=required_kva,
+        selected_kva=selected_kva,
+        total_units=total_units,
+        total_system_kva=total_system_kva,
+        fuel_lph=fuel_consumption,
+        loading_pct=(continuous_kva / total_system_kva) * 100,
+    )
+
+
+# ─── 5. Power Factor Correction ──────────────────────────────────────
+def pfc(load_kw, current_pf, target_pf, voltage, catalog=catalogs.DEFAULT):
+    load_kw = _f(load_kw)
+    current_pf = _f(current_pf)
+    target_pf = _f(target_pf)
+    voltage = _f(voltage)
+
+    # Reactive power to compensate
+    q_before = load_kw * np.tan(np.arccos(current_pf))
+    q_after = load_kw * np.tan(np.arccos(target_pf))
+    q_required = q_before - q_after
+
+    kva_before = load_kw / current_pf
+    kva_after = load_kw / target_pf
+
+    current_before = np.where(voltage > 0, (kva_before * 1000) / (SQRT3 * voltage), 0.0)
+    current_after = np.where(voltage > 0, (kva_after * 1000) / (SQRT3 * voltage), 0.0)
+
+    selected_kvar = standard_size(catalog, 'capacitors', q_required)
+
+    # Annual savings estimate (assuming 0.12 EUR/kVArh penalty, 4000h/yr)
+    annual_savings = q_required * 0.12 * 4000 / 1000
+
+    return _result(
+        q_before_kvar=q_before,
+        q_after_kvar=q_after,
+        q_required_kvar=q_required,
+        selected_kvar=selected_kvar,
+        kva_before=kva_before,
+        kva_after=kva_after,
+        current_before_a=current_before,
+        current_after_a=current_after,
+        current_reduction_pct=np.where(current_before > 0, (1 - current_after / current_before) * 100, 0.0),
+        annual_savings_eur=annual_savings,
+    )
+
+
+# ─── 6. Lighting Calculator ──────────────────────────────────────────
+def lighting(room_length, room_width, room_height, work_plane, target_lux, luminaire_lm, luminaire_w,
+             maintenance_factor, room_reflectance):
+    room_length = _f(room_length)
+    room_width = _f(room_width)
+    luminaire_lm = _f(luminaire_lm)
+    maintenance_factor = _f(maintenance_factor)
+    room_reflectance = _s(room_reflectance)
+
+    area = room_length * room_width
+    mounting_height = _f(room_height) - _f(work_plane)
+
+    # Room Index (RI)
+    ri = (room_length * room_width) / (mounting_height * (room_length + room_width))
+
+    # Utilization Factor based on RI and reflectance
+    base_uf = np.select([room_reflectance == 'high', room_reflectance == 'low'], [0.55, 0.35], 0.45)
+    uf = base_uf * np.select([ri < 1, ri < 2, ri < 3], [0.7, 0.85, 0.95], 1.0)
+
+    # Number of luminaires: N = (E × A) / (F × UF × MF)
+    total_lm_required = (_f(target_lux) * area) / (uf * maintenance_factor)
+    num_luminaires = np.ceil(total_lm_required / luminaire_lm)
+
+    actual_lux = (num_luminaires * luminaire_lm * uf * maintenance_factor) / area
+    total_power = num_luminaires * _f(luminaire_w)
+
+    # Suggested layout (rows × columns)
+    ratio = room_length / room_width
+    cols = np.ceil(np.sqrt(num_luminaires / ratio))
+    rows = np.where(cols > 0, np.ceil(num_luminaires / cols), 1)
+
+    return _result(
+        area_m2=area,
+        room_index=ri,
+        utilization_factor=uf,
+        num_luminaires=num_luminaires,
+        actual_lux=actual_lux,
+        total_power_w=total_power,
+        power_density_wm2=total_power / area,
+        layout_rows=rows,
+        layout_cols=cols,
+        total_lm_required=total_lm_required,
+    )
+
+
+# ─── 7. Grounding Resistance ─────────────────────────────────────────
+MAX_RODS = 50
+
+
+def grounding(soil_resistivity, rod_length, rod_diameter, target_resistance, num_rods, rod_spacing):
+    """Rods driven from the surface in a line, solved as a mutual-resistance matrix (see earthing.py)."""
+    soil_resistivity, rod_length, rod_diameter, target_resistance, num_rods, rod_spacing = np.broadcast_arrays(
+        *(np.atleast_1d(_f(c)) for c in (soil_resistivity, rod_length, rod_diameter, target_resistance, num_rods,
+                                          rod_spacing)))
+    num_rods = np.maximum(num_rods, 1).astype(int)
+    valid = ((soil_resistivity > 0) & (rod_length > 0) & (rod_diameter > 0) & (num_rods <= MAX_RODS)
+             & ((num_rods == 1) | (rod_spacing > rod_diameter)))
+    num_rods = np.minimum(num_rods, MAX_RODS)
+
+    # Resistance of 1..MAX_RODS rods at once; MAX_RODS + 1 rods needed means the target cannot be met
+    line = earthing.rod_line(np.where(valid, soil_resistivity, 1), np.where(valid, rod_length, 1),
+                             np.where(valid, rod_diameter, 0.01), np.where(valid, rod_spacing, 1), MAX_RODS)
+    line[~valid] = np.nan
+    single_rod_r = line[:, 0]
+    total_resistance = np.take_along_axis(line, num_rods[:, None] - 1, axis=1)[:, 0]
+    meets = line[:, :MAX_RODS] <= target_resistance[:, None]
+    rods_needed = np.where(meets.any(axis=-1), meets.argmax(axis=-1) + 1, MAX_RODS + 1)
+
+    return _result(
+        single_rod_ohm=single_rod_r,
+        total_resistance_ohm=total_resistance,
+        target_ohm=target_resistance,
+        meets_target=total_resistance <= target_resistance,
+        rods_needed=rods_needed,
+        coupling_factor=single_rod_r / (num_rods * total_resistance),
+        soil_resistivity=soil_resistivity,
+        valid=valid,
+    )
+
+
+# ─── 8. Electricity Cost Calculator ──────────────────────────────────
+CO2_KG_PER_KWH = 0.4  # European average
+
+
+def cost(load_kw, hours_per_day, days_per_month, price_kwh, demand_charge, power_factor, efficiency):
+    load_kw = _f(load_kw)
+    efficiency = _f(efficiency) / 100
+
+    actual_consumption_kw = np.where(efficiency > 0, load_kw / efficiency, load_kw)
+
+    # Monthly calculations
+    daily_kwh = actual_consumption_kw * _f(hours_per_day)
+    monthly_kwh = daily_kwh * _f(days_per_month)
+
+    # Costs
+    monthly_energy_cost = monthly_kwh * _f(price_kwh)
+    monthly_demand_cost = actual_consumption_kw * _f(demand_charge)
+    monthly_total = monthly_energy_cost + monthly_demand_cost
+
+    return _result(
+        daily_kwh=daily_kwh,
+        monthly_kwh=monthly_kwh,
+        yearly_kwh=monthly_kwh * 12,
+        monthly_energy_eur=monthly_energy_cost,
+        monthly_demand_eur=monthly_demand_cost,
+        monthly_total_eur=monthly_total,
+        yearly_total_eur=monthly_total * 12,
+        apparent_power_kva=actual_consumption_kw / _f(power_factor),
+        co2_yearly_t=(monthly_kwh * CO2_KG_PER_KWH * 12) / 1000,
+    )
+
+
+# ─── 9. Motor Starting Calculator ────────────────────────────────────
+STARTING_METHODS = {
+    # method: (starting torque % of full LRC torque, display name)
+    'DOL': (100, "Direct On-Line (DOL)"),
+    'Star-Delta': (33, "Star-Delta (Y-Δ)"),
+    'Soft-Starter': (42, "Soft Starter"),
+    'VFD': (150, "Variable Frequency Drive"),
+}
+
+
+def motor(motor_kw, voltage, efficiency, power_factor, starting_method, poles, catalog=catalogs.DEFAULT):
+    starting_method = _s(starting_method)
+    efficiency = _f(efficiency) / 100
+
+    # Full load current
+    fla = (_f(motor_kw) * 1000) / (SQRT3 * _f(voltage) * efficiency * _f(power_factor))
+
+    # Locked Rotor Current (typically 6-8x FLA)
+    lrc_multiplier = 7  # typical
+    lrc = fla * lrc_multiplier
+
+    # Starting current based on method, unknown methods start DOL
+    methods = ['Star-Delta', 'Soft-Starter', 'VFD']
+    conditions = [starting_method == m for m in methods]
+    starting_current = np.select(conditions, [lrc / 3, lrc * 0.4, fla * 1.5], lrc)  # soft starter at 65% voltage
+    starting_torque_pct = np.select(conditions, [STARTING_METHODS[m][0] for m in methods],
+                                    STARTING_METHODS['DOL'][0])
+    method_name = np.select(conditions, [STARTING_METHODS[m][1] for m in methods], STARTING_METHODS['DOL'][1])
+
+    # Synchronous speed, approximate full-load RPM (3-5% slip)
+    frequency = 50  # Hz
+    sync_rpm = (120 * frequency) / _f(poles)
+    full_load_rpm = sync_rpm * 0.97
+
+    # Cable sizing (approximate, 125% of FLA on Cu open-air capacities)
+    cable_mm2 = catalogs.by_catalog(catalog, lambda c, current: c.cables.smallest_section(0, 0, current), fla * 1.25)
+
+    # Circuit breaker (motor-rated) and contactor
+    circuit_breaker = standard_size(catalog, 'motor_breakers', fla * 1.25)
+    contactor = standard_size(catalog, 'contactors', fla)
+
+    return _result(
+        fla=fla,
+        lrc=lrc,
+        starting_current=starting_current,
+        starting_method=method_name,
+        starting_torque_pct=starting_torque_pct,
+        sync_rpm=sync_rpm,
+        full_load_rpm=full_load_rpm,
+        cable_mm2=cable_mm2,
+        circuit_breaker_a=circuit_breaker,
+        contactor_a=contactor,
+        overload_min=fla * 0.9,
+        overload_max=fla * 1.1,
+    )
+
+
+# ─── Delta U – Maximum Cable Length ───────────────────────────────────
+def delta_u(load_kw, phases, cable_mm2, cable_type, power_factor, max_voltage_drop_pct):
+    cable_mm2 = _f(cable_mm2)
+    voltage, current_a, resistivity, k = _line(phases, cable_type, load_kw, power_factor)
+
+    # Allowed voltage drop in volts
+    delta_u_v = (_f(max_voltage_drop_pct) / 100) * voltage
+
+    # Max cable length:  L = ΔU·S / (k·I·ρ), undefined for I <= 0
+    max_length_m = np.where(current_a > 0, (delta_u_v * cable_mm2) / (k * current_a * resistivity), np.nan)
+
+    return _result(
+        max_length_m=max_length_m,
+        current_ok=current_a > 0,
+        current_a=current_a,
+        voltage_drop_v=delta_u_v,
+        cable_mm2=cable_mm2,
+        cable_type=_s(cable_type),
+        phases=_s(phases),
+    )
+
+
+# ─── Min Ika – Maximum Cable Length by Short Circuit ─────────────────
+# Phase voltage (for short circuit loop we always use 230V phase-to-neutral)
+U0 = 230
+
+
+def trip_multiplier(characteristic):
+    """Instantaneous trip multiplier of a B/C/D curve, C for unknown curves."""
+    characteristic = _s(characteristic)
+    return np.select([characteristic == c for c in TRIP_MULTIPLIERS], list(TRIP_MULTIPLIERS.values()),
+                     TRIP_MULTIPLIERS['C'])
+
+
+def ika_max_length(cable_mm2, resistivity, ika_min):
+    """Longest loop that still lets ``ika_min`` flow on a fault."""
+    # Ika = 0.95 × U0 / (2 × ρ × L / S)  =>  L_max = 0.95 × U0 × S / (2 × ρ × Ika)
+    return (0.95 * U0 * cable_mm2) / (2 * resistivity * ika_min)
+
+
+def min_ika(breaker_a, characteristic, cable_mm2, cable_type, phases):
+    breaker_a = _f(breaker_a)
+    cable_mm2 = _f(cable_mm2)
+    multiplier = trip_multiplier(characteristic)
+
+    # Minimum short-circuit current required for guaranteed instant trip
+    ika_min = multiplier * breaker_a
+
+    resistivity = np.where(_s(cable_type) == 'Cu', RESISTIVITY_CU, RESISTIVITY_AL)
+
+    return _result(
+        max_length_m=ika_max_length(cable_mm2, resistivity, ika_min),
+        ika_min_a=ika_min,
+        ika_min_ka=ika_min / 1000,
+        breaker_a=breaker_a,
+        characteristic=_s(characteristic),
+        multiplier=multiplier,
+        cable_mm2=cable_mm2,
+        cable_type=_s(cable_type),
+    )
+
+
+# ─── Cable Sizing – smallest section meeting every constraint ────────
+CONDUCTORS = np.array(['Cu', 'Al'])
+
+
+def size_cable(load_kw, phases, length_m, mounting, power_factor, max_voltage_drop_pct, characteristic,
+               breaker_a, cable_type, catalog=catalogs.DEFAULT, **installation):
+    """Smallest catalog section per row, searched over every section and both materials.
+
+    A section qualifies when Ib <= In <= Iz (load current, breaker, cable
+    ampacity), its voltage drop is within ``max_voltage_drop_pct`` and the
+    run is short enough for the breaker to trip instantly on a fault
+    (the min Ika length). ``breaker_a`` <= 0 picks the breaker from the load
+    current as /calculate-power does; ``cable_type`` 'Cu' or 'Al' restricts
+    the search to one material. Ampacities are derated for the
+    installation conditions (see derating.py).
+    """
+    voltage, current_a, _, k = _line(phases, 'Cu', load_kw, power_factor)
+    breaker_a = _f(breaker_a)
+    breaker_a = np.where(breaker_a > 0, breaker_a, standard_size(catalog, 'breakers', current_a))
+    ika_min = trip_multiplier(characteristic) * breaker_a
+    method, conduit, correction = derating.conditions(mounting, **installation)
+    cable_type = _s(cable_type)
+
+    columns = [np.atleast_1d(c) for c in np.broadcast_arrays(
+        voltage, current_a, k, breaker_a, ika_min, _f(length_m), _f(max_voltage_drop_pct), method, conduit,
+        correction, cable_type != 'Al', cable_type != 'Cu')]
+    found, material, cable_mm2, cable_max_a, factor, drop_pct, max_length, cu_mm2, al_mm2 = catalogs.by_catalog(
+        catalog, _smallest_sections, *columns)
+
+    return _result(
+        conditions_rated=np.isfinite(correction),
+        found=found,
+        current_a=columns[1],
+        circuit_breaker_a=columns[3],
+        cable_type=CONDUCTORS[material],
+        cable_mm2=cable_mm2,
+        cable_max_a=cable_max_a,
+        correction_factor=factor,
+        voltage_drop_pct=drop_pct,
+        max_length_m=max_length,
+        cu_mm2=cu_mm2,
+        al_mm2=al_mm2,
+    )
+
+
+def _smallest_sections(catalog, voltage, current_a, k, breaker_a, ika_min, length_m, max_drop, method, conduit,
+                       correction, cu_allowed, al_allowed):
+    """``size_cable`` over the sections of one catalog (1-D row columns)."""
+    sections = catalog.cables.sections
+    allowed = np.stack([cu_allowed, al_allowed], axis=-1)
+
+    # Every (row, material, section) candidate at once
+    row = (slice(None), None, None)
+    resistivity = np.array([RESISTIVITY_CU, RESISTIVITY_AL])[:, None]
+    factor = (derating.method_factor(method[:, None], sections) * correction[:, None])[:, None, :]
+    capacity = np.moveaxis(catalog.cables.ampacity[:, conduit, :], 1, 0) * factor
+    drop_pct = voltage_drop_pct(k[row], length_m[row], current_a[row], resistivity / sections, voltage[row])
+    max_length = ika_max_length(sections, resistivity, ika_min[row])
+    ok = ((current_a <= breaker_a)[row] & (breaker_a[row] <= capacity) & (drop_pct <= max_drop[row])
+          & (length_m[row] <= max_length) & allowed[..., None])
+
+    first = ok.argmax(axis=-1)
+    found = ok.any(axis=-1)
+    smallest = np.where(found, sections[first], np.nan)
+
+    # Cu wins whenever it qualifies: it is never the larger section
+    material = np.where(found[:, 0], 0, 1)
+    rows = np.arange(len(material))
+    best = (rows, material, first[rows, material])
+    return (found.any(axis=-1), material, sections[best[2]], capacity[best], factor[rows, 0, best[2]],
+            drop_pct[best], max_length[best], smallest[:, 0], smallest[:, 1])
+
+
+# ─── Registry ────────────────────────────────────────────────────────
+# fields:  (name, type, default) as read from a JSON request body; type is
+#          float, int or a schemas.Choice of allowed strings
+# outputs: (name, digits) – digits rounds floats, 'int' truncates,
+#          None passes the value through unchanged (NaN becomes null)
+# checks:  (column, message) – boolean result columns a row must satisfy
+Calculator = namedtuple('Calculator', 'kernel fields outputs prepare checks', defaults=(None, ()))
+# Size tables to pick from (see catalogs.py)
+CATALOG_FIELD = ('catalog', Choice(*catalogs.CATALOGS), catalogs.DEFAULT)
+# Cable installation conditions (see derating.py); the defaults need no correction
+INSTALLATION_FIELDS = (
+    ('reference_method', Choice('auto', *derating.METHODS), 'auto'),
+    ('insulation', Choice(*derating.INSULATIONS), 'PVC'), ('ambient_c', float, 30), ('ground_c', float, 20),
+    ('circuits', int, 1), ('arrangement', Choice(*derating.ARRANGEMENTS), 'bunched'),
+    ('soil_thermal_resistivity', float, 2.5),
+)
+CONDITIONS_CHECK = ('conditions_rated', "IEC 60364-5-52 has no correction factor for these installation conditions")
+
+CALCULATORS = {
+    'ups': Calculator(
+        ups,
+        (('it_load_kw', float, 0), ('runtime_min', int, 0), ('redundancy_level', Choice('2N', 'N+1', 'N'), '2N'),
+         ('power_factor', float, 0.9), ('growth_margin', int, 20), ('safety_margin', int, 10)),
+        (('configuration', None), ('ups_unit_min_kw', 2), ('ups_unit_min_kva', 2), ('total_battery_ah', 2),
+         ('heat_dissipation_btu', 0), ('power_factor', None), ('growth_margin_pct', 'int'),
+         ('safety_margin_pct', 'int')),
+    ),
+    'power': Calculator(
+        power,
+        (('load_kw', float, 0), ('phases', PHASES, '3F_400V'), ('cable_mm2', float, 2.5),
+         ('cable_type', CABLE_TYPES, 'Cu'), ('length_m', float, 10), ('mounting', MOUNTINGS, 'open'),
+         ('power_factor', float, 0.9), ('transformer_kva', float, 630), ('transformer_uk_pct', float, 4),
+         CATALOG_FIELD, *INSTALLATION_FIELDS),
+        (('current_a', 2), ('voltage_drop_pct', 2), ('short_circuit_ka', 2), ('cable_max_a', 1),
+         ('correction_factor', 3), ('circuit_breaker_a', None), ('cable_ok', None)),
+        checks=(CONDITIONS_CHECK,
+                ('cable_rated', "The cable catalog has no current capacity for this cable_mm2 and cable_type")),
+    ),
+    'transformer': Calculator(
+        transformer,
+        (('total_kw', float, 0), ('total_kva', float, 0), ('growth_pct', float, 20), CATALOG_FIELD),
+        (('total_demand_kw', 2), ('total_demand_kva', 2), ('design_kva', 2), ('selected_kva', None),
+         ('loading_pct', 1), ('no_load_loss_w', 0), ('load_loss_w', 0), ('total_losses_w', 0)),
+        _transformer_totals,
+    ),
+    'generator': Calculator(
+        generator,
+        (('total_load_kw', float, 0), ('motor_starting_kw', float, 0), ('power_factor', float, 0.8),
+         ('altitude_m', float, 0), ('temperature_c', float, 40), ('redundancy', Choice('N', 'N+1'), 'N'),
+         CATALOG_FIELD),
+        (('continuous_kva', 2), ('peak_kva', 2), ('derating_factor', 3), ('required_kva', 2),
+         ('selected_kva', None), ('total_units', None), ('total_system_kva', None), ('fuel_lph', 1),
+         ('loading_pct', 1)),
+    ),
+    'pfc': Calculator(
+        pfc,
+        (('load_kw', float, 0), ('current_pf', float, 0.75), ('target_pf', float, 0.95), ('voltage', float, 400),
+         CATALOG_FIELD),
+        (('q_before_kvar', 2), ('q_after_kvar', 2), ('q_required_kvar', 2), ('selected_kvar', None),
+         ('kva_before', 2), ('kva_after', 2), ('current_before_a', 2), ('current_after_a', 2),
+         ('current_reduction_pct', 1), ('annual_savings_eur', 0)),
+    ),
+    'lighting': Calculator(
+        lighting,
+        (('room_length', float, 10), ('room_width', float, 8), ('room_height', float, 3),
+         ('work_plane', float, 0.85), ('target_lux', float, 500), ('luminaire_lm', float, 3600),
+         ('luminaire_w', float, 36), ('maintenance_factor', float, 0.8),
+         ('room_reflectance', Choice('high', 'medium', 'low'), 'medium')),
+        (('area_m2', 2), ('room_index', 2), ('utilization_factor', 3), ('num_luminaires', 'int'),
+         ('actual_lux', 0), ('total_power_w', None), ('power_density_wm2', 2), ('layout_rows', 'int'),
+         ('layout_cols', 'int'), ('total_lm_required', 0)),
+    ),
+    'grounding': Calculator(
+        grounding,
+        (('soil_resistivity', float, 100), ('rod_length', float, 3), ('rod_diameter', float, 0.016),
+         ('target_resistance', float, 10), ('num_rods', int, 1), ('rod_spacing', float, 3)),
+        (('single_rod_ohm', 2), ('total_resistance_ohm', 2), ('target_ohm', None), ('meets_target', None),
+         ('rods_needed', None), ('coupling_factor', 3), ('soil_resistivity', None)),
+        checks=(('valid', "Soil resistivity, rod length and diameter must be > 0, at most "
+                          f"{MAX_RODS} rods, and rods spaced wider than their diameter"),),
+    ),
+    'cost': Calculator(
+        cost,
+        (('load_kw', float, 0), ('hours_per_day', float, 8), ('days_per_month', float, 22),
+         ('price_kwh', float, 0.22), ('demand_charge', float, 0), ('power_factor', float, 0.9),
+         ('efficiency', float, 100)),
+        (('daily_kwh', 2), ('monthly_kwh', 2), ('yearly_kwh', 2), ('monthly_energy_eur', 2),
+         ('monthly_demand_eur', 2), ('monthly_total_eur', 2), ('yearly_total_eur', 2),
+         ('apparent_power_kva', 2), ('co2_yearly_t', 2)),
+    ),
+    'motor': Calculator(
+        motor,
+        (('motor_kw', float, 0), ('voltage', float, 400), ('efficiency', float, 90), ('power_factor', float, 0.85),
+         ('starting_method', Choice(*STARTING_METHODS), 'DOL'), ('poles', int, 4), CATALOG_FIELD),
+        (('fla', 2), ('lrc', 2), ('starting_current', 2), ('starting_method', None),
+         ('starting_torque_pct', None), ('sync_rpm', 'int'), ('full_load_rpm', 'int'), ('cable_mm2', None),
+         ('circuit_breaker_a', None), ('contactor_a', None), ('overload_min', 1), ('overload_max', 1)),
+    ),
+    'delta_u': Calculator(
+        delta_u,
+        (('load_kw', float, 0), ('phases', PHASES, '3F_400V'), ('cable_mm2', float, 2.5),
+         ('cable_type', CABLE_TYPES, 'Cu'), ('power_factor', float, 0.9), ('max_voltage_drop_pct', float, 4.0)),
+        (('max_length_m', 1), ('current_a', 2), ('voltage_drop_v', 2), ('cable_mm2', None),
+         ('cable_type', None), ('phases', None)),
+        checks=(('current_ok', "Current must be > 0"),),
+    ),
+    'size_cable': Calculator(
+        size_cable,
+        (('load_kw', float, 0), ('phases', PHASES, '3F_400V'), ('length_m', float, 10), ('mounting', MOUNTINGS, 'open'),
+         ('power_factor', float, 0.9), ('max_voltage_drop_pct', float, 4.0), ('characteristic', CHARACTERISTICS, 'C'),
+         ('breaker_a', float, 0), ('cable_type', Choice('any', *CABLE_TYPES.values), 'any'),
+         CATALOG_FIELD, *INSTALLATION_FIELDS),
+        (('cable_mm2', None), ('cable_type', None), ('current_a', 2), ('circuit_breaker_a', None),
+         ('cable_max_a', 1), ('correction_factor', 3), ('voltage_drop_pct', 2), ('max_length_m', 1),
+         ('cu_mm2', None), ('al_mm2', None)),
+        checks=(CONDITIONS_CHECK,
+                ('found', "No standard cable section satisfies ampacity, voltage drop and short circuit")),
+    ),
+    'min_ika': Calculator(
+        min_ika,
+        (('breaker_a', float, 16), ('characteristic', CHARACTERISTICS, 'C'), ('cable_mm2', float, 2.5),
+         ('cable_type', CABLE_TYPES, 'Cu'), ('phases', PHASES, '1F_230V')),
+        (('max_length_m', 1), ('ika_min_a', 1), ('ika_min_ka', 2), ('breaker_a', None),
+         ('characteristic', None), ('multiplier', None), ('cable_mm2', None), ('cable_type', None)),
+    ),
+    'battery': Calculator(
+        batteries.discharge,
+        (('load_kw', float, 0), ('runtime_min', float, 10), ('chemistry', Choice(*batteries.CHEMISTRIES), 'vrla'),
+         ('block_v', float, 12), ('block_ah', float, 100), ('rated_hours', float, 10), ('peukert', float, 0),
+         ('block_mohm', float, 0), ('eod_v_per_cell', float, 0), ('temperature_c', float, 25),
+         ('end_of_life_pct', float, 80), ('dc_bus_v', float, 480), ('inverter_efficiency', float, 92)),
+        (('strings', None), ('blocks_per_string', 'int'), ('total_blocks', 'int'), ('runtime_min', 1),
+         ('required_runtime_min', 1), ('capacity_factor', 3), ('installed_kwh', 2), ('string_voltage_v', 1),
+         ('end_voltage_v', 1)),
+        checks=(('valid', "Load, runtime and battery values must be > 0 and chemistry 'vrla' or 'li-ion'"),
+                ('found', f"No configuration of up to {batteries.MAX_STRINGS} parallel strings reaches the runtime")),
+    ),
+}
+
+
+# Compiled once; see schemas.py
+SCHEMAS = {name: schemas.Schema(calc.fields) for name, calc in CALCULATORS.items()}
+
+
+def _prepare(name, data):
+    prepare = CALCULATORS[name].prepare
+    if prepare is None:
+        return data
+    if not isinstance(data, dict):
+        raise schemas.ValidationError({"body": "expected a JSON object"})
+    return prepare(data)
+
+
+def parse_inputs(name, data):
+    """Coerce one JSON request body into the scalar inputs of a calculator.
+
+    Raises ``schemas.ValidationError`` listing every field that is invalid.
+    """
+    return SCHEMAS[name].parse(_prepare(name, data))
+
+
+def evaluate(name, columns, **options):
+    """Run a calculator's kernel over input columns ({field: column}).
+
+    ``options`` are passed to the kernel as they are (e.g. the shared load
+    profile of the battery kernel).
+    """
+    with np.errstate(all='ignore'):
+        return CALCULATORS[name].kernel(**columns, **options)
+
+
+def format_row(name, results, i=0):
+    """Plain-Python, rounded results of row ``i`` of a kernel's output."""
+    calc = CALCULATORS[name]
+    for column, message in calc.checks:
+        if not results[column][i]:
+            raise ValueError(message)
+    row = {}
+    for key, digits in calc.outputs:
+        value = results[key][i].item()
+        if isinstance(value, float) and math.isnan(value) and digits is None:
+            value = None
+        elif digits == 'int':
+            value = int(value)
+        elif digits is not None:
+            if not math.isfinite(value):
+                raise ValueError(f"{key} is not a finite number")
+            value = round(value, digits)
+        row[key] = value
+    return row
+
+
+def format_columns(name, results):
+    """Rounded result columns of every row, e.g. for charting a sweep.
+
+    Rows failing a check, and non-finite values, come out as None.
+    Returns the columns, the per-row validity and {check message: rows}.
+    """
+    calc = CALCULATORS[name]
+    valid = np.ones(len(next(iter(results.values()))), dtype=bool)
+    errors = {}
+    for column, message in calc.checks:
+        failed = valid & ~results[column].astype(bool)
+        if failed.any():
+            errors[message] = int(failed.sum())
+        valid &= ~failed
+
+    columns = {}
+    for key, digits in calc.outputs:
+        values = results[key]
+        ok = valid
+        if values.dtype.kind == 'f':
+            ok = valid & np.isfinite(values)
+            if digits == 'int':
+                values = np.trunc(values)
+            elif digits is not None:
+                values = np.round(values, digits)
+        convert = int if digits == 'int' else (lambda value: value)
+        columns[key] = [convert(value) if keep else None for value, keep in zip(values.tolist(), ok.tolist())]
+    return columns, valid, errors
+
+
+def to_columns(rows):
+    """Turn a list of parsed input dicts into {field: list} columns."""
+    return {field: [row[field] for row in rows] for field in rows[0]}
+
+
+def run_many(name, rows, decode=None, **options):
+    """Evaluate many request bodies through one kernel call.
+
+    Yields an (inputs, results, error) triple per row, in order; rows that
+    fail decoding, validation or a check get ``error`` instead of
+    ``results`` (see ``schemas.error_body``). Rows are validated column by
+    column, and invalid ones never reach the kernel.
+    """
+    decoded = []  # per row: None, or the exception that stopped it
+    bodies = []
+    for row in rows:
+        try:
+            body = _prepare(name, decode(row) if decode else row)
+            if not isinstance(body, dict):
+                raise schemas.ValidationError({"body": "expected a JSON object"})
+            bodies.append(body)
+            decoded.append(None)
+        except Exception as e:
+            decoded.append(e)
+    columns, invalid = SCHEMAS[name].parse_columns(bodies)
+    results = evaluate(name, columns, **options) if len(bodies) > len(invalid) else None
+    inputs = zip(*(column.tolist() for column in columns.values()))
+
+    body = i = 0
+    for error in decoded:
+        if error is None:
+            if body in invalid:
+                error = schemas.ValidationError(invalid[body])
+            body += 1
+        if error is not None:
+            yield None, None, schemas.error_body(error)
+            continue
+        row_inputs = dict(zip(columns, next(inputs)))
+        try:
+            yield row_inputs, format_row(name, results, i), None
+        except Exception as e:
+            yield row_inputs, None, schemas.error_body(e)
+        i += 1
+
+
+def run(name, data):
+    """Evaluate a single JSON request body and return its formatted results."""
+    return format_row(name, evaluate(name, to_columns([parse_inputs(name, data)])))
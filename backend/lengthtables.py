@@ -0,0 +1,149 @@
+"""Maximum cable length tables over every breaker, curve, section, conductor and supply.
+
+The table electricians otherwise build one /calculate-delta-u and
+/calculate-min-ika call at a time comes out of a single pass of both
+kernels over the whole grid:
+
+    {"catalog": "standard", "breakers": [6, 10, 16], "characteristics": ["B", "C", "D"],
+     "sections": [1.5, 2.5, 4], "cable_types": ["Cu", "Al"], "phases": ["1F_230V", "3F_400V"],
+     "power_factor": 0.9, "max_voltage_drop_pct": 4.0, "load_pct": 100}
+
+Every field is optional; breakers and sections default to the standard
+sizes of the catalog, the lists to every value the kernels know. Each row
+holds the longest cable whose fault current at its far end still trips
+the breaker instantly (min_ika) and the longest one whose voltage drop at
+``load_pct`` of the breaker rating stays within ``max_voltage_drop_pct``
+(delta_u); ``max_length_m`` is the shorter of the two and ``limited_by``
+names it. The same parameters always give the same table, so responses
+are cached and validated like any calculator's (see cache.py).
+"""
+import csv
+import io
+import math
+
+import numpy as np
+
+import catalogs
+import kernels
+
+MAX_ROWS = 200_000
+FORMATS = {'json': 'application/json', 'csv': 'text/csv', 'pdf': 'application/pdf'}
+COLUMNS = ('breaker_a', 'characteristic', 'cable_mm2', 'cable_type', 'phases', 'ika_min_a', 'current_a',
+           'short_circuit_length_m', 'voltage_drop_length_m', 'max_length_m', 'limited_by')
+
+
+def _sizes(data, field, default):
+    values = data.get(field)
+    if values is None:
+        return sorted(set(float(value) for value in default))
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"{field} must be a non-empty list")
+    try:
+        values = [float(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be numbers") from None
+    if not all(math.isfinite(value) and value > 0 for value in values):
+        raise ValueError(f"{field} must be > 0")
+    return sorted(set(values))
+
+
+def _choices(data, field, choice):
+    values = data.get(field)
+    if values is None:
+        return list(choice.values)
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"{field} must be a non-empty list")
+    unknown = [value for value in values if value not in choice.values]
+    if unknown:
+        raise ValueError(f"{field}: expected values from {', '.join(choice.values)}, got {unknown[0]!r}")
+    return [value for value in choice.values if value in values]
+
+
+def _positive(data, field, default):
+    try:
+        value = float(data.get(field, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number") from None
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{field} must be > 0")
+    return value
+
+
+def parse(data):
+    """Validated table parameters of a request body, with the defaults filled in.
+
+    The result is canonical (sorted sizes, lists in kernel order), so
+    equivalent requests share a cache key.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    catalog = str(data.get('catalog', catalogs.DEFAULT))
+    if catalog not in catalogs.CATALOGS:
+        raise ValueError(f"Unknown catalog: {catalog}")
+    params = {
+        "catalog": catalog,
+        "breakers": _sizes(data, 'breakers', catalogs.CATALOGS[catalog].breakers.values),
+        "characteristics": _choices(data, 'characteristics', kernels.CHARACTERISTICS),
+        "sections": _sizes(data, 'sections', catalogs.CATALOGS[catalog].cables.sections),
+        "cable_types": _choices(data, 'cable_types', kernels.CABLE_TYPES),
+        "phases": _choices(data, 'phases', kernels.PHASES),
+        "power_factor": _positive(data, 'power_factor', 0.9),
+        "max_voltage_drop_pct": _positive(data, 'max_voltage_drop_pct', 4.0),
+        "load_pct": _positive(data, 'load_pct', 100),
+    }
+    if params['power_factor'] > 1:
+        raise ValueError("power_factor must be <= 1")
+    rows = math.prod(len(params[axis]) for axis in ('breakers', 'characteristics', 'sections', 'cable_types',
+                                                     'phases'))
+    if rows > MAX_ROWS:
+        raise ValueError(f"Table of {rows} rows exceeds the limit of {MAX_ROWS}")
+    return params
+
+
+def table(params):
+    """Result columns of every grid row, breaker-major (see the module docstring)."""
+    grid = np.meshgrid(np.array(params['breakers']), np.array(params['characteristics']),
+                       np.array(params['sections']), np.array(params['cable_types']),
+                       np.array(params['phases']), indexing='ij')
+    breaker_a, characteristic, cable_mm2, cable_type, phases = (axis.ravel() for axis in grid)
+
+    # The load drawing load_pct of the breaker rating, as delta_u expects it
+    single_phase = phases == '1F_230V'
+    current_a = breaker_a * params['load_pct'] / 100
+    load_kw = current_a * np.where(single_phase, 230, 400 * kernels.SQRT3) * params['power_factor'] / 1000
+
+    short_circuit = kernels.evaluate('min_ika', dict(breaker_a=breaker_a, characteristic=characteristic,
+                                                     cable_mm2=cable_mm2, cable_type=cable_type, phases=phases))
+    voltage_drop = kernels.evaluate('delta_u', dict(load_kw=load_kw, phases=phases, cable_mm2=cable_mm2,
+                                                    cable_type=cable_type, power_factor=params['power_factor'],
+                                                    max_voltage_drop_pct=params['max_voltage_drop_pct']))
+    short_circuit_m = short_circuit['max_length_m']
+    voltage_drop_m = voltage_drop['max_length_m']
+    return {
+        "breaker_a": breaker_a,
+        "characteristic": characteristic,
+        "cable_mm2": cable_mm2,
+        "cable_type": cable_type,
+        "phases": phases,
+        "ika_min_a": short_circuit['ika_min_a'],
+        "current_a": np.round(voltage_drop['current_a'], 2),
+        "short_circuit_length_m": np.round(short_circuit_m, 1),
+        "voltage_drop_length_m": np.round(voltage_drop_m, 1),
+        "max_length_m": np.round(np.minimum(short_circuit_m, voltage_drop_m), 1),
+        "limited_by": np.where(short_circuit_m <= voltage_drop_m, 'short_circuit', 'voltage_drop'),
+    }
+
+
+def rows(columns):
+    """The table as one plain-Python dict per row."""
+    values = [columns[column].tolist() for column in COLUMNS]
+    return [dict(zip(COLUMNS, row)) for row in zip(*values)]
+
+
+def to_csv(columns):
+    """The table as CSV text with a header row."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    writer.writerows(zip(*(columns[column].tolist() for column in COLUMNS)))
+    return out.getvalue()
@@ -0,0 +1,244 @@
+"""Request counters and latency histograms in Prometheus text format.
+
+Every request is counted by route, method and status, and its duration is
+observed in a histogram. Handlers time their own phases (parse, compute,
+serialize, pdf) with ``phase``, and report the exceptions they turn into
+400 responses with ``error``, so a failing calculator shows up as
+``http_request_errors_total{exception="ZeroDivisionError"}`` instead of
+hiding among bad inputs.
+
+Each process keeps its series in memory and writes them to
+``METRICS_DIR/<parent pid>/<pid>.json`` from a background thread every
+FLUSH_INTERVAL_S it has changed. All
+gunicorn workers share the master as parent, so ``/metrics`` in any worker
+sums the files of every live worker. The files of processes that have
+exited are removed on collection, so a recycled worker's counts drop out
+of the sum (a counter reset to Prometheus) rather than being added to a
+later server that happens to share the parent pid. Other workers' series
+may lag by up to FLUSH_INTERVAL_S. An empty METRICS_DIR reports this
+process only.
+"""
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'electrical-api-metrics'))
+FLUSH_INTERVAL_S = 1.0
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HELP = {
+    'http_requests_total': ('counter', "Requests handled, by route, method and status."),
+    'http_request_errors_total': ('counter', "Exceptions handlers turned into error responses, by route and type."),
+    'http_request_duration_seconds': ('histogram', "Time from request start to response, by route."),
+    'http_request_phase_seconds': ('histogram', "Time spent in each phase of a request, by route."),
+}
+
+
+class Registry:
+    """Counters and histograms of one process."""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._dirty = False
+        self._flusher = None
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(BUCKETS)] += 1
+            series[-1] += seconds
+            self._dirty = True
+
+    def _path(self):
+        return os.path.join(self.directory, str(os.getppid()), f"{os.getpid()}.json")
+
+    def start_flusher(self):
+        """Write this process's series every FLUSH_INTERVAL_S from a daemon thread."""
+        if not self.directory or self._flusher is not None:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL_S)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """Write this process's series for the other workers."""
+        if not self.directory:
+            return
+        with self._lock:
+            self._dirty = False
+            snapshot = {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, series] for (name, labels), series in self.histograms.items()],
+            }
+        path = self._path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError:
+            pass  # metrics must never fail a request; /metrics then lags behind
+
+    def collect(self):
+        """(counters, histograms) summed over every process of this server."""
+        if not self.directory:
+            with self._lock:
+                return dict(self.counters), {key: list(series) for key, series in self.histograms.items()}
+        self.flush()
+        counters, histograms = {}, {}
+        group = os.path.dirname(self._path())
+        for filename in os.listdir(group) if os.path.isdir(group) else ():
+            if not filename.endswith('.json'):
+                continue
+            pid = filename[:-len('.json')]
+            if pid.isdigit() and not _alive(int(pid)):
+                _remove(os.path.join(group, filename))
+                continue
+            try:
+                with open(os.path.join(group, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # a worker is replacing its file right now
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, series in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(series))
+                histograms[key] = [a + b for a, b in zip(total, series)]
+        return counters, histograms
+
+    def render(self):
+        """All series in the Prometheus text exposition format."""
+        counters, histograms = self.collect()
+        lines = []
+        for metric, (kind, text) in HELP.items():
+            lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f"{metric}{_labels(labels)} {value:g}")
+            for (name, labels), series in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), series):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(labels)} {series[-1]:.6f}")
+                lines.append(f"{metric}_count{_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _alive(pid):
+    """Whether a process with this pid is running (possibly under another user)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # another worker removed it first
+
+
+def _remove_stale_groups(directory):
+    """Drop the files of servers (parent processes) that are no longer running."""
+    try:
+        groups = os.listdir(directory)
+    except OSError:
+        return
+    for group in groups:
+        if group.isdigit() and not _alive(int(group)):
+            shutil.rmtree(os.path.join(directory, group), ignore_errors=True)
+
+
+registry = Registry()
+if METRICS_DIR:
+    _remove_stale_groups(METRICS_DIR)
+# A forked child starts from zero rather than re-reporting its parent's counts
+os.register_at_fork(after_in_child=registry.reset)
+atexit.register(registry.flush)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@contextmanager
+def phase(name):
+    """Time a phase (parse, compute, serialize, pdf) of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('http_request_phase_seconds', {"route": _route(), "phase": name},
+                         time.perf_counter() - start)
+
+
+def error(exception):
+    """Count an exception the current handler answers with an error response."""
+    registry.inc('http_request_errors_total', {"route": _route(), "exception": type(exception).__name__})
+
+
+def init_app(app):
+    """Count and time every request of ``app``."""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route = _route()
+            registry.inc('http_requests_total',
+                         {"route": route, "method": request.method, "status": str(response.status_code)})
+            registry.observe('http_request_duration_seconds', {"route": route}, time.perf_counter() - start)
+            registry.start_flusher()
+        return response
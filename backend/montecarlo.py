@@ -0,0 +1,231 @@
+"""Monte Carlo uncertainty analysis over any calculator.
+
+Any input may be given as a distribution instead of a value, including the
+fields of the transformer ``loads`` list:
+
+    {"calculator": "grounding",
+     "inputs": {"soil_resistivity": {"dist": "lognormal", "median": 150, "sigma": 0.5},
+                "target_resistance": 10, "num_rods": 4},
+     "samples": 200000, "seed": 7}
+
+Distributions: normal (mean, std), lognormal (median, sigma of ln x),
+uniform (low, high), triangular (low, mode, high) and choice (values,
+optional p); any of them may be clipped with min / max.
+
+Samples are drawn with NumPy generators seeded from one SeedSequence, in
+fixed-size chunks (smaller for the kernels that cost more per sample), so
+a seed gives the same answer whether the chunks run in this process or
+across the compute pool (see jobs.run_parallel). Every chunk goes through
+the calculator's kernel in one call.
+"""
+import math
+
+import numpy as np
+
+import jobs
+import kernels
+import schemas
+
+MAX_SAMPLES = 2_000_000
+# Kernels that simulate rather than evaluate a formula take fewer samples
+MAX_SAMPLES_BY_CALCULATOR = {'battery': 20_000, 'grounding': 50_000}
+CHUNK_SAMPLES = 100_000
+# About 0.25 s (grounding, ~25 µs a sample) to 1 s (battery, ~400 µs a sample) of kernel time per chunk
+CHUNK_SAMPLES_BY_CALCULATOR = {'battery': 2_500, 'grounding': 10_000}
+# Runs of at least this many samples (two or more chunks) are spread over the compute pool
+PARALLEL_SAMPLES = 400_000
+PARALLEL_SAMPLES_BY_CALCULATOR = {'battery': 5_000, 'grounding': 20_000}
+DEFAULT_PERCENTILES = (5, 50, 95, 99)
+
+# Standard-size output whose exceedance probability is reported
+SIZE_OUTPUTS = {
+    'power': 'circuit_breaker_a',
+    'transformer': 'selected_kva',
+    'generator': 'selected_kva',
+    'pfc': 'selected_kvar',
+    'grounding': 'rods_needed',
+    'motor': 'circuit_breaker_a',
+    'size_cable': 'cable_mm2',
+    'battery': 'strings',
+}
+# Output values that stand for "no size meets the requirement" rather than a size
+NOT_MET = {
+    'grounding': {'rods_needed': kernels.MAX_RODS + 1},
+}
+
+
+def _is_distribution(value):
+    return isinstance(value, dict) and 'dist' in value
+
+
+def nominal(spec):
+    """Representative value of a distribution (used for the point estimate)."""
+    if not _is_distribution(spec):
+        return spec
+    kind = spec['dist']
+    if kind == 'normal':
+        value = float(spec['mean'])
+    elif kind == 'lognormal':
+        value = float(spec['median'])
+    elif kind == 'uniform':
+        value = (float(spec['low']) + float(spec['high'])) / 2
+    elif kind == 'triangular':
+        value = float(spec['mode'])
+    elif kind == 'choice':
+        value = spec['values'][0]
+    else:
+        raise ValueError(f"Unknown distribution '{kind}'")
+    return value
+
+
+def sample(spec, rng, n):
+    """``n`` draws of a distribution spec (plain values are returned as they are)."""
+    if not _is_distribution(spec):
+        return spec
+    kind = spec['dist']
+    if kind == 'normal':
+        values = rng.normal(float(spec['mean']), float(spec['std']), n)
+    elif kind == 'lognormal':
+        values = rng.lognormal(math.log(float(spec['median'])), float(spec['sigma']), n)
+    elif kind == 'uniform':
+        values = rng.uniform(float(spec['low']), float(spec['high']), n)
+    elif kind == 'triangular':
+        values = rng.triangular(float(spec['low']), float(spec['mode']), float(spec['high']), n)
+    elif kind == 'choice':
+        values = rng.choice(np.asarray(spec['values']), n, p=spec.get('p'))
+    else:
+        raise ValueError(f"Unknown distribution '{kind}'")
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return values
+
+
+def _point_inputs(inputs):
+    """Request body with every distribution replaced by its nominal value."""
+    point = {field: nominal(value) for field, value in inputs.items()}
+    if isinstance(inputs.get('loads'), list):
+        point['loads'] = [{key: nominal(value) for key, value in load.items()} for load in inputs['loads']]
+    return point
+
+
+def _sample_columns(name, inputs, rng, n):
+    """Input columns of ``n`` samples."""
+    calc = kernels.CALCULATORS[name]
+    columns = kernels.parse_inputs(name, _point_inputs(inputs))
+    for field, cast, _ in calc.fields:
+        if _is_distribution(inputs.get(field)):
+            values = sample(inputs[field], rng, n)
+            if isinstance(cast, schemas.Choice) and cast.invalid(values).any():
+                raise schemas.ValidationError({field: f"expected values among {', '.join(cast.values)}"})
+            columns[field] = np.round(values).astype(int) if cast is int else values
+
+    if name == 'transformer' and isinstance(inputs.get('loads'), list):
+        # Demand factors etc. vary per load: sample each load, then sum the demands
+        total_kw = total_kva = 0.0
+        for load in inputs['loads']:
+            demand_kw, demand_kva = kernels.transformer_demand(
+                sample(load.get('kw', 0), rng, n), sample(load.get('pf', 0.9), rng, n),
+                sample(load.get('demand_factor', 1.0), rng, n))
+            total_kw = total_kw + demand_kw
+            total_kva = total_kva + demand_kva
+        columns['total_kw'], columns['total_kva'] = total_kw, total_kva
+    return columns
+
+
+def simulate_chunk(name, inputs, n, seed):
+    """Valid-row mask and result columns of one chunk of ``n`` samples."""
+    rng = np.random.default_rng(seed)
+    results = kernels.evaluate(name, _sample_columns(name, inputs, rng, n))
+    results = {key: np.broadcast_to(column, (n,)) for key, column in results.items()}
+    valid = np.ones(n, dtype=bool)
+    for column, _ in kernels.CALCULATORS[name].checks:
+        valid &= results[column].astype(bool)
+    return valid, {key: results[key] for key, _ in kernels.CALCULATORS[name].outputs
+                   if results[key].dtype.kind in 'fiub'}
+
+
+def monte_carlo(name, inputs, samples=100_000, seed=None, percentiles=DEFAULT_PERCENTILES, selected=None):
+    """Percentiles of every numeric output and exceedance of the selected standard size.
+
+    The selected size is ``selected`` if given, otherwise the size the
+    calculator picks for the nominal inputs.
+    """
+    samples = int(samples)
+    limit = MAX_SAMPLES_BY_CALCULATOR.get(name, MAX_SAMPLES)
+    if not 0 < samples <= limit:
+        raise ValueError(f"samples must be between 1 and {limit}")
+    percentiles = [float(p) for p in percentiles]
+    if not all(0 <= p <= 100 for p in percentiles):
+        raise ValueError("percentiles must be within 0-100")
+
+    try:
+        point = kernels.run(name, _point_inputs(inputs))
+    except ValueError:
+        point = None  # the nominal case fails a check; samples may still succeed
+    per_chunk = CHUNK_SAMPLES_BY_CALCULATOR.get(name, CHUNK_SAMPLES)
+    sizes = [per_chunk] * (samples // per_chunk) + ([samples % per_chunk] if samples % per_chunk else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(name, inputs, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if samples >= PARALLEL_SAMPLES_BY_CALCULATOR.get(name, PARALLEL_SAMPLES) and jobs.COMPUTE_WORKERS > 1:
+        chunks = jobs.run_parallel(simulate_chunk, args)
+    else:
+        chunks = [simulate_chunk(*arg) for arg in args]
+
+    valid = np.concatenate([chunk[0] for chunk in chunks])
+    columns = {key: np.concatenate([chunk[1][key] for chunk in chunks])[valid] for key in chunks[0][1]}
+    digits = dict(kernels.CALCULATORS[name].outputs)
+    not_met = {key: columns[key] == value for key, value in NOT_MET.get(name, {}).items() if key in columns}
+
+    outputs = {}
+    for key, values in columns.items():
+        if values.dtype.kind == 'b':
+            outputs[key] = {"probability": round(float(values.mean()), 4) if len(values) else None}
+            continue
+        unmet = {}
+        if key in not_met:
+            unmet = {"not_met_probability": round(float(not_met[key].mean()), 4) if len(values) else None}
+            values = values[~not_met[key]]
+        values = values[np.isfinite(values)]
+        if not len(values):
+            if unmet:
+                outputs[key] = unmet
+            continue
+        ndigits = digits[key] if isinstance(digits[key], int) else 4
+        stats = {f"p{p:g}": round(float(v), ndigits) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+        stats.update(mean=round(float(values.mean()), ndigits), std=round(float(values.std()), ndigits),
+                     min=round(float(values.min()), ndigits), max=round(float(values.max()), ndigits), **unmet)
+        outputs[key] = stats
+
+    response = {
+        "calculator": name,
+        "samples": samples,
+        "valid_fraction": round(float(valid.mean()), 4),
+        "nominal": point,
+        "outputs": outputs,
+    }
+    size_key = SIZE_OUTPUTS.get(name)
+    if size_key is not None and size_key in columns:
+        sizes = columns[size_key]
+        sizes = sizes[np.isfinite(sizes)]
+        # Samples no size meets exceed any selected size but have no size of their own
+        sentinel = NOT_MET.get(name, {}).get(size_key)
+        unmet = sizes == sentinel if sentinel is not None else np.zeros(len(sizes), dtype=bool)
+        total = max(len(sizes), 1)
+        reference = float(selected) if selected is not None else point[size_key] if point else None
+        if reference is not None and reference == sentinel:
+            reference = None  # the nominal inputs meet no size either
+        chosen, counts = np.unique(sizes[~unmet], return_counts=True)
+        cdf = np.cumsum(counts) / total
+        response['size'] = {
+            "output": size_key,
+            "selected": reference,
+            "probability_exceeded": (round(float(((sizes > reference) | unmet).mean()), 4)
+                                     if len(sizes) and reference is not None else None),
+            "distribution": {f"{size:g}": round(float(c / total), 4) for size, c in zip(chosen, counts)},
+            **({"not_met_probability": round(float(unmet.mean()), 4) if len(sizes) else None}
+               if sentinel is not None else {}),
+            **{f"size_p{p:g}": float(chosen[i]) if i < len(chosen) else None
+               for p, i in zip(percentiles, np.searchsorted(cdf, np.array(percentiles) / 100 - 1e-12))
+               if len(chosen)},
+        }
+    return response
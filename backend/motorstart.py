@@ -0,0 +1,289 @@
+"""Time-domain simulation of a sequence of motor starts on a generator or transformer.
+
+    {"source": {"type": "generator", "kva": 500},
+     "base_load_kw": 120, "base_pf": 0.9, "interval_s": 5, "max_dip_pct": 15,
+     "motors": [{"id": "P1", "motor_kw": 55, "starting_method": "DOL"},
+                {"id": "P2", "motor_kw": 30, "starting_method": "Star-Delta", "load_torque_pct": 30}]}
+
+One motor starts every ``interval_s``. Each motor draws the starting
+current /calculate-motor gives for its ``starting_method`` as a constant
+impedance until it has run up, then its running current. Run-up takes
+RUN_UP_S of the method at rated voltage and slows down with the
+accelerating torque, V² × starting torque - load torque (in % of the
+locked-rotor torque); a motor whose torque never exceeds the load stalls.
+
+The bus voltage is E / |1 + Z_source × Y_load| per unit of the source
+rating. A transformer (``uk_pct``, R/X ``rx``) behind a grid of ``sk_mva``
+has E = 1; a generator has its transient reactance ``xd_transient`` and an
+AVR that raises E (up to ``e_max``) at a rate of (1 - V) / ``avr_time_s``,
+which gives the voltage recovery.
+
+Every start ordering (all of them up to 7 motors, otherwise MAX_ORDERINGS
+sampled ones plus largest- and smallest-first) is simulated at once as
+one array axis, in chunks spread over the compute pool for large
+searches. The best ordering has the smallest dip, then the shortest
+sequence. Without a generator ``kva`` the smallest generator of the
+catalog whose best ordering stays within ``max_dip_pct`` is selected by
+bisection over the standard sizes; after one full search the bisection
+only re-simulates the SIZING_ORDERINGS best orderings, which can only
+make the selected size larger, never too small. The selected size is
+then searched in full.
+"""
+import itertools
+import math
+import warnings
+
+import numpy as np
+
+import catalogs
+import jobs
+import kernels
+
+DT_S = 0.05
+SETTLE_S = 10.0
+MAX_MOTORS = 50
+MAX_ORDERINGS = 5040
+CHUNK_ORDERINGS = 1000
+PARALLEL_ORDERINGS = 4000
+# Orderings kept from the first full search while bisecting generator sizes
+SIZING_ORDERINGS = 64
+PROFILE_STEP_S = 0.1
+
+# Run-up time at rated voltage and power factor while starting, by starting method
+RUN_UP_S = {'DOL': 3.0, 'Star-Delta': 6.0, 'Soft-Starter': 8.0, 'VFD': 10.0}
+STARTING_PF = {'DOL': 0.3, 'Star-Delta': 0.3, 'Soft-Starter': 0.3, 'VFD': 0.9}
+
+
+def _admittance(kva, pf, base_kva):
+    """Per-unit admittance (at rated voltage) of a load of ``kva`` at ``pf``."""
+    pf = np.clip(pf, 0, 1)
+    return kva / base_kva * (pf - 1j * np.sqrt(1 - pf ** 2))
+
+
+def _motors(motors):
+    """Per-motor starting and running kVA, power factors and run-up parameters."""
+    if not motors:
+        raise ValueError("No motors to start")
+    if len(motors) > MAX_MOTORS:
+        raise ValueError(f"At most {MAX_MOTORS} motors are supported, got {len(motors)}")
+    rows = [kernels.parse_inputs('motor', motor) for motor in motors]
+    columns = kernels.to_columns(rows)
+    result = kernels.evaluate('motor', columns)
+    method = np.array(columns['starting_method'])
+    voltage = np.array(columns['voltage'], dtype=float)
+    if not np.all(np.isfinite(result['fla'])) or np.any(result['fla'] <= 0):
+        raise ValueError("Every motor needs motor_kw, voltage, efficiency and power_factor > 0")
+    load_torque = np.array([float(motor.get('load_torque_pct', 25)) for motor in motors]) / 100
+    return {
+        "id": [str(motor.get('id', i + 1)) for i, motor in enumerate(motors)],
+        "method": method,
+        "start_kva": kernels.SQRT3 * voltage * result['starting_current'] / 1000,
+        "start_pf": np.array([STARTING_PF[m] for m in method]),
+        "run_kva": kernels.SQRT3 * voltage * result['fla'] / 1000,
+        "run_pf": np.array(columns['power_factor'], dtype=float),
+        "torque": result['starting_torque_pct'] / 100,
+        "load_torque": load_torque,
+        "run_up_s": np.array([RUN_UP_S[m] for m in method]),
+    }
+
+
+def _source(source, kva=None):
+    """Source rating (kVA), per-unit impedance and AVR parameters."""
+    kind = source.get('type', 'generator')
+    if kind not in ('generator', 'transformer'):
+        raise ValueError("source type must be 'generator' or 'transformer'")
+    kva = float(kva if kva is not None else source.get('kva', 0))
+    if kva <= 0:
+        raise ValueError("The source needs kva > 0")
+    if kind == 'generator':
+        z = 1j * float(source.get('xd_transient', 0.25))
+        avr = (float(source.get('avr_time_s', 0.5)), float(source.get('e_max', 1.8)))
+        if avr[0] <= 0:
+            raise ValueError("avr_time_s must be > 0")
+    else:
+        uk = float(source.get('uk_pct', 6)) / 100
+        rx = float(source.get('rx', 0.2))
+        x = uk / math.sqrt(1 + rx ** 2)
+        grid = kva / (float(source.get('sk_mva', 500)) * 1000)
+        z = complex(rx * x, x + grid)
+        avr = None
+    return kva, z, avr
+
+
+def simulate(order, start_s, motors, y_base, z, avr, horizon_s, threshold, profile=False):
+    """Run the start sequences of ``order`` (orderings × motors) side by side.
+
+    Returns per ordering and position in the sequence the lowest voltage
+    and the recovery time after that start, the run-up end of each motor
+    (NaN if it stalled) and, with ``profile``, the voltage of every step.
+    """
+    p, m = order.shape
+    rows = np.arange(p)[:, None]
+    starts = np.empty((p, m))
+    starts[rows, order] = start_s  # start time of each motor in each ordering
+    y_start = _admittance(motors['start_kva'], motors['start_pf'], 1)
+    y_run = _admittance(motors['run_kva'], motors['run_pf'], 1)
+    margin = motors['torque'] - motors['load_torque']
+    rate = DT_S / (motors['run_up_s'] * np.where(margin > 0, margin, 1))
+
+    progress = np.zeros((p, m))
+    finished = np.full((p, m), np.nan)
+    e = np.ones(p)
+    min_v = np.full((p, m), np.inf)
+    last_low = np.full((p, m), -np.inf)
+    steps = int(round(horizon_s / DT_S)) + 1
+    voltages = np.full((p, steps), np.nan) if profile else None
+    for n in range(steps):
+        t = n * DT_S
+        started = starts <= t + 1e-9
+        running = progress >= 1
+        starting = started & ~running
+        if t > start_s[-1] and not starting.any() and (avr is None or np.abs(1 - v).max() < 1e-4):
+            if profile:
+                voltages[:, n:] = v[:, None]
+            break  # everything runs and the voltage has settled
+        y = y_base + starting @ y_start + running @ y_run
+        v = e * np.abs(1 / (1 + z * y))
+
+        accelerating = v[:, None] ** 2 * motors['torque'] - motors['load_torque']
+        progress += np.where(starting, np.maximum(accelerating, 0) * rate, 0)
+        finished[starting & (progress >= 1)] = t
+        if avr is not None:
+            e = np.clip(e + DT_S / avr[0] * (1 - v), 0.5, avr[1])
+
+        # Attribute the voltage to the latest start of each ordering
+        position = np.searchsorted(start_s, t + 1e-9, side='right') - 1
+        if position >= 0:
+            min_v[:, position] = np.minimum(min_v[:, position], v)
+            last_low[:, position] = np.where(v < threshold, t, last_low[:, position])
+        if profile:
+            voltages[:, n] = v
+
+    recovery = np.where(np.isfinite(last_low), last_low + DT_S - start_s, 0.0)
+    return min_v, recovery, finished - starts, voltages
+
+
+def orderings(motors, rng):
+    """Start orderings to evaluate: all of them, or a sample with the obvious ones."""
+    m = len(motors['id'])
+    if math.factorial(m) <= MAX_ORDERINGS:
+        return np.array(list(itertools.permutations(range(m))))
+    largest_first = np.argsort(-motors['start_kva'], kind='stable')
+    sampled = np.argsort(rng.random((MAX_ORDERINGS - 2, m)), axis=1)
+    return np.unique(np.vstack([largest_first, largest_first[::-1], sampled]), axis=0)
+
+
+def _score(order, start_s, motors, y_base, z, avr, horizon_s, threshold):
+    """(max dip, sequence end) of each ordering, chunked over the compute pool."""
+    chunks = [order[i:i + CHUNK_ORDERINGS] for i in range(0, len(order), CHUNK_ORDERINGS)]
+    args = [(chunk, start_s, motors, y_base, z, avr, horizon_s, threshold) for chunk in chunks]
+    if len(order) >= PARALLEL_ORDERINGS and jobs.COMPUTE_WORKERS > 1:
+        results = jobs.run_parallel(simulate, args)
+    else:
+        results = [simulate(*arg) for arg in args]
+    min_v = np.concatenate([r[0] for r in results])
+    run_up = np.concatenate([r[2] for r in results])
+    stalled = np.isnan(run_up).any(axis=1)
+    with warnings.catch_warnings():
+        # nanmax warns about orderings in which every motor stalls
+        warnings.simplefilter('ignore', RuntimeWarning)
+        last = np.nanmax(start_s + np.take_along_axis(run_up, order, axis=1), axis=1)
+    end = np.where(stalled, np.inf, last)
+    return 1 - min_v.min(axis=1), end
+
+
+def _best(scores):
+    dip, end = scores
+    # smallest dip (to 0.1 %), then the shortest sequence
+    best = np.lexsort((end, np.round(dip, 3)))[0]
+    return int(best), int(np.argmax(dip))
+
+
+def motor_start(source, motors, base_load_kw=0, base_pf=0.9, interval_s=5, max_dip_pct=15, recovery_pct=95,
+                seed=0, catalog=catalogs.DEFAULT):
+    """Best start ordering, its voltage dips and, if no generator is given, the generator size."""
+    source = source or {}
+    motors = _motors(motors)
+    interval_s = float(interval_s)
+    if interval_s < 0:
+        raise ValueError("interval_s must be >= 0")
+    max_dip = float(max_dip_pct) / 100
+    threshold = float(recovery_pct) / 100
+    m = len(motors['id'])
+    start_s = np.arange(m) * interval_s
+    horizon_s = start_s[-1] + 2 * motors['run_up_s'].max() + SETTLE_S
+    order = orderings(motors, np.random.default_rng(seed))
+    base_kva = float(base_load_kw) / float(base_pf) if base_pf else 0.0
+    running_kva = base_kva + motors['run_kva'].sum()
+
+    def evaluate(kva, order):
+        kva, z, avr = _source(source, kva)
+        y_base = _admittance(base_kva, float(base_pf), kva)
+        scaled = dict(motors, start_kva=motors['start_kva'] / kva, run_kva=motors['run_kva'] / kva)
+        return (kva, z, avr, y_base, scaled), _score(order, start_s, scaled, y_base, z, avr, horizon_s, threshold)
+
+    sizing = None
+    if source.get('type', 'generator') == 'generator' and not source.get('kva'):
+        if catalog not in catalogs.CATALOGS:
+            raise ValueError(f"Unknown catalog '{catalog}'")
+        sizes = catalogs.CATALOGS[catalog].generators.values
+        candidates = sizes[sizes >= running_kva]
+        if not len(candidates):
+            raise ValueError(f"No standard generator carries the running load of {running_kva:.0f} kVA")
+        # Bisection (the dip only shrinks with a larger generator) over the
+        # orderings that did best in a first full search
+        lo, hi = 0, len(candidates) - 1
+        shortlist = order
+        simulated = 0
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _, scores = evaluate(float(candidates[mid]), shortlist)
+            simulated += 1
+            if shortlist is order:
+                shortlist = order[np.lexsort((scores[1], np.round(scores[0], 3)))[:SIZING_ORDERINGS]]
+            lo, hi = (lo, mid) if scores[0].min() <= max_dip else (mid + 1, hi)
+        (kva, z, avr, y_base, scaled), scores = evaluate(float(candidates[lo]), order)
+        sizing = {"selected_kva": float(candidates[lo]), "running_kva": round(float(running_kva), 1),
+                  "candidates_simulated": simulated + 1, "within_limit": bool(scores[0].min() <= max_dip)}
+    else:
+        (kva, z, avr, y_base, scaled), scores = evaluate(None, order)
+
+    best, worst = _best(scores)
+    min_v, recovery, run_up, voltages = simulate(order[best:best + 1], start_s, scaled, y_base, z, avr,
+                                                 horizon_s, threshold, profile=True)
+    sequence = order[best]
+    stride = int(round(PROFILE_STEP_S / DT_S))
+    starts = [
+        {
+            "id": motors['id'][k],
+            "starting_method": str(motors['method'][k]),
+            "start_s": round(float(start_s[i]), 2),
+            "dip_pct": round(float(1 - min_v[0, i]) * 100, 2),
+            "recovery_s": round(float(recovery[0, i]), 2),
+            "run_up_s": None if np.isnan(run_up[0, k]) else round(float(run_up[0, k]), 2),
+            "stalled": bool(np.isnan(run_up[0, k])),
+        }
+        for i, k in enumerate(sequence)
+    ]
+    response = {
+        "source": {"type": source.get('type', 'generator'), "kva": kva},
+        "orderings_evaluated": len(order),
+        "best": {
+            "order": [motors['id'][k] for k in sequence],
+            "max_dip_pct": round(float(scores[0][best]) * 100, 2),
+            "within_limit": bool(scores[0][best] <= max_dip),
+            "sequence_s": None if np.isinf(scores[1][best]) else round(float(scores[1][best]), 2),
+            "starts": starts,
+        },
+        "worst": {
+            "order": [motors['id'][k] for k in order[worst]],
+            "max_dip_pct": round(float(scores[0][worst]) * 100, 2),
+        },
+        "voltage_profile": {
+            "t_s": np.round(np.arange(voltages.shape[1])[::stride] * DT_S, 2).tolist(),
+            "voltage_pct": np.round(voltages[0, ::stride] * 100, 2).tolist(),
+        },
+    }
+    if sizing is not None:
+        response['generator'] = sizing
+    return response
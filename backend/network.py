@@ -0,0 +1,170 @@
+"""Radial distribution network (feeder tree) solver.
+
+A network is a transformer feeding a tree of boards and final circuits.
+Every node carries its own load and the cable of the edge that feeds it
+from its parent (or from the transformer for root nodes):
+
+    {"id": "DB1", "parent": "MSB", "load_kw": 20, "power_factor": 0.9,
+     "phases": "3F_400V", "cable_mm2": 95, "cable_type": "Cu", "length_m": 40}
+
+Nodes are processed level by level (one vectorised step per tree depth),
+so a whole installation is solved in a single O(n) pass.
+"""
+import numpy as np
+
+import kernels
+import schemas
+
+NODE_SCHEMA = schemas.Schema((
+    ('load_kw', float, 0), ('power_factor', float, 0.9), ('phases', kernels.PHASES, '3F_400V'),
+    ('cable_mm2', float, 0), ('cable_type', kernels.CABLE_TYPES, 'Cu'), ('length_m', float, 0),
+))
+
+
+def build_tree(nodes):
+    """Parent index per node and the node indices grouped by depth.
+
+    Raises ValueError for empty networks, duplicate ids, unknown parents
+    and cycles.
+    """
+    if not nodes:
+        raise ValueError("Network has no nodes")
+    ids = [str(node['id']) for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    if len(index) != len(ids):
+        raise ValueError("Duplicate node ids")
+
+    parent = np.full(len(nodes), -1)
+    children = [[] for _ in nodes]
+    order = []
+    for i, node in enumerate(nodes):
+        parent_id = node.get('parent')
+        if parent_id is None:
+            order.append(i)
+            continue
+        if str(parent_id) not in index:
+            raise ValueError(f"Unknown parent '{parent_id}' of node '{ids[i]}'")
+        parent[i] = index[str(parent_id)]
+        children[parent[i]].append(i)
+
+    # Breadth-first from the roots: order is grouped by increasing depth
+    depth = np.zeros(len(nodes), dtype=int)
+    for i in order:
+        for child in children[i]:
+            depth[child] = depth[i] + 1
+            order.append(child)
+    if len(order) != len(nodes):
+        raise ValueError("Network contains a cycle or nodes not connected to the source")
+
+    order = np.array(order, dtype=int)
+    boundaries = np.flatnonzero(np.diff(depth[order])) + 1
+    return ids, parent, np.split(order, boundaries)
+
+
+def parse_nodes(nodes):
+    """Typed node columns; raises ``schemas.ValidationError`` naming every bad node field.
+
+    Cable length and section may be 0 (a busbar connection); the power
+    factor must be in (0, 1].
+    """
+    if not isinstance(nodes, list) or not all(isinstance(node, dict) for node in nodes):
+        raise schemas.ValidationError({"nodes": "expected a list of JSON objects"})
+    columns, invalid = NODE_SCHEMA.parse_columns(nodes)
+    errors = {f"nodes[{i}].{field}": message for i, fields in invalid.items() for field, message in fields.items()}
+    if not errors:
+        power_factor = columns['power_factor']
+        checks = (
+            ('load_kw', ~np.isfinite(columns['load_kw']), "must be a finite number"),
+            ('power_factor', ~((power_factor > 0) & (power_factor <= 1)), "must be in (0, 1]"),
+            ('cable_mm2', ~(columns['cable_mm2'] >= 0) | np.isinf(columns['cable_mm2']), "must be >= 0"),
+            ('length_m', ~(columns['length_m'] >= 0) | np.isinf(columns['length_m']), "must be >= 0"),
+        )
+        for field, bad, message in checks:
+            errors.update({f"nodes[{i}].{field}": message for i in np.flatnonzero(bad).tolist()})
+    if errors:
+        raise schemas.ValidationError(errors)
+    return columns
+
+
+def solve_radial(nodes, source=None, max_voltage_drop_pct=4.0):
+    """Branch currents, cumulative voltage drop and fault levels of every node."""
+    source = source or {}
+    transformer_kva = float(source.get('transformer_kva', 630))
+    impedance_pct = float(source.get('impedance_pct', 4))
+    voltage_ll = float(source.get('voltage', 400))
+
+    if not (transformer_kva > 0 and impedance_pct > 0 and voltage_ll > 0):
+        raise ValueError("transformer_kva, impedance_pct and voltage must be > 0")
+
+    columns = parse_nodes(nodes)
+    ids, parent, levels = build_tree(nodes)
+    load_kw = columns['load_kw']
+    power_factor = columns['power_factor']
+    cable_mm2 = columns['cable_mm2']
+    length_m = columns['length_m']
+    cable_type = columns['cable_type']
+    single_phase = columns['phases'] == '1F_230V'
+
+    # Downstream active / reactive power of every edge, deepest level first
+    with np.errstate(all='ignore'):
+        kw = load_kw.copy()
+        kvar = load_kw * np.tan(np.arccos(power_factor))
+    for level in reversed(levels[1:]):
+        np.add.at(kw, parent[level], kw[level])
+        np.add.at(kvar, parent[level], kvar[level])
+    kva = np.hypot(kw, kvar)
+
+    voltage = np.where(single_phase, 230, voltage_ll)
+    current_a = (kva * 1000) / (voltage * np.where(single_phase, 1, kernels.SQRT3))
+
+    # Length 0 / section 0 edges are busbar connections without resistance
+    resistivity = np.where(cable_type == 'Cu', kernels.RESISTIVITY_CU, kernels.RESISTIVITY_AL)
+    has_cable = (length_m > 0) & (cable_mm2 > 0)
+    resistance = np.where(has_cable, resistivity * length_m / np.where(has_cable, cable_mm2, 1), 0.0)
+    k = np.where(single_phase, 2, kernels.SQRT3)
+    drop_pct = kernels.voltage_drop_pct(k, 1, current_a, resistance, voltage)
+
+    # Accumulate drop and conductor resistance from the source, shallowest level first
+    cumulative_pct = drop_pct.copy()
+    cumulative_r = resistance.copy()
+    for level in levels[1:]:
+        cumulative_pct[level] += cumulative_pct[parent[level]]
+        cumulative_r[level] += cumulative_r[parent[level]]
+
+    # Transformer short-circuit impedance (treated as reactive) plus cable resistance
+    z_transformer = (voltage_ll ** 2 / (transformer_kva * 1000)) * (impedance_pct / 100)
+    ik3 = voltage_ll / (kernels.SQRT3 * np.hypot(z_transformer, cumulative_r))
+    # Phase-to-neutral loop as in /calculate-min-ika: 0.95 × U0 over the go and return conductors
+    ik1 = 0.95 * kernels.U0 / np.hypot(z_transformer, 2 * cumulative_r)
+
+    if not (np.isfinite(cumulative_pct).all() and np.isfinite(ik3).all() and np.isfinite(ik1).all()):
+        raise ValueError("Network results are not finite numbers")
+
+    worst = int(np.argmax(cumulative_pct))
+    roots = levels[0]
+    results = [
+        {
+            "id": ids[i],
+            "downstream_kw": round(float(kw[i]), 2),
+            "downstream_kva": round(float(kva[i]), 2),
+            "current_a": round(float(current_a[i]), 2),
+            "voltage_drop_pct": round(float(drop_pct[i]), 2),
+            "cumulative_drop_pct": round(float(cumulative_pct[i]), 2),
+            "voltage_v": round(float(voltage[i] * (1 - cumulative_pct[i] / 100)), 1),
+            "short_circuit_ka": round(float(ik3[i]) / 1000, 2),
+            "ik1_ka": round(float(ik1[i]) / 1000, 2),
+            "drop_ok": bool(cumulative_pct[i] <= max_voltage_drop_pct),
+        }
+        for i in range(len(nodes))
+    ]
+    return {
+        "nodes": results,
+        "summary": {
+            "total_kw": round(float(kw[roots].sum()), 2),
+            "total_kva": round(float(np.hypot(kw[roots].sum(), kvar[roots].sum())), 2),
+            "source_short_circuit_ka": round(voltage_ll / (kernels.SQRT3 * z_transformer) / 1000, 2),
+            "max_cumulative_drop_pct": results[worst]["cumulative_drop_pct"],
+            "worst_node": ids[worst],
+            "nodes_over_limit": int((cumulative_pct > max_voltage_drop_pct).sum()),
+        },
+    }
@@ -0,0 +1,230 @@
+"""Opt-in profiles of single requests.
+
+Callers holding one of the PROFILE_TOKENS (comma separated) add
+``?profile=1`` (or an ``X-Profile: 1`` header) and
+``Authorization: Bearer <token>`` to any request:
+
+* ``?profile_mode=sample`` (default) samples the request thread's stack
+  every SAMPLE_INTERVAL_S from a helper thread; the request runs at full
+  speed, so timings are realistic but calls shorter than the interval may
+  be missed.
+* ``?profile_mode=trace`` records every Python and C call of the request
+  thread with ``sys.setprofile``; exact, but slower while it runs.
+
+The response carries an ``X-Profile-Id`` header; the profile is stored in
+PROFILE_DIR (shared by all gunicorn workers, newest MAX_PROFILES kept) and
+downloaded with the same token from ``/admin/profiles/<id>`` as collapsed
+stacks for flamegraph.pl / speedscope (``?format=collapsed``) or as a
+speedscope JSON file (``?format=speedscope``).
+
+Without PROFILE_TOKENS no hook is installed, so requests do not pay for
+any of this.
+"""
+import hmac
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import g, request
+
+PROFILE_TOKENS = [token for token in os.environ.get('PROFILE_TOKENS', '').split(',') if token]
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'electrical-api-profiles'))
+MAX_PROFILES = 100
+SAMPLE_INTERVAL_S = 0.001
+
+
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Time-weighted stack samples of one thread, taken from a helper thread."""
+
+    def __init__(self, thread_id, interval_s=SAMPLE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = defaultdict(float)  # "outer;...;inner" -> seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            labels = []
+            while frame is not None:
+                labels.append(_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += now - last
+            last = now
+
+
+class Tracer:
+    """Self time of every call stack of the calling thread (deterministic)."""
+
+    def __init__(self):
+        self.stacks = defaultdict(float)
+        self._frames = []  # [label, start, time spent in children]
+
+    def start(self):
+        sys.setprofile(self._event)
+
+    def stop(self):
+        sys.setprofile(None)
+        return self.stacks
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == 'call':
+            self._frames.append([_label(frame.f_code), now, 0.0])
+        elif event == 'c_call':
+            self._frames.append([f"{getattr(arg, '__qualname__', arg)} (builtin)", now, 0.0])
+        elif self._frames:  # return, c_return, c_exception
+            label, start, children = self._frames[-1]
+            stack = ';'.join(f[0] for f in self._frames)
+            self._frames.pop()
+            self.stacks[stack] += now - start - children
+            if self._frames:
+                self._frames[-1][2] += now - start
+
+
+def authorized():
+    """Whether the caller sent one of the PROFILE_TOKENS."""
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else ''
+    return any(hmac.compare_digest(token, allowed) for allowed in PROFILE_TOKENS)
+
+
+def _path(profile_id):
+    if not profile_id.isalnum():
+        raise KeyError(profile_id)
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+
+def save(route, mode, seconds, stacks):
+    """Store a profile and return its id, dropping the oldest beyond MAX_PROFILES."""
+    profile_id = uuid.uuid4().hex
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile = {"id": profile_id, "route": route, "mode": mode, "created": time.time(),
+               "duration_ms": round(seconds * 1000, 3),
+               "stacks": {stack: round(s * 1e6) for stack, s in stacks.items() if s > 0}}
+    with open(f"{_path(profile_id)}.tmp", 'w') as f:
+        json.dump(profile, f)
+    os.replace(f"{_path(profile_id)}.tmp", _path(profile_id))
+
+    stored = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.json')),
+                    key=lambda entry: entry.stat().st_mtime)
+    for entry in stored[:-MAX_PROFILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    return profile_id
+
+
+def load(profile_id):
+    try:
+        with open(_path(profile_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(profile_id) from None
+
+
+def listing():
+    """Stored profiles without their stacks, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith('.json'):
+            try:
+                profile = load(entry.name[:-5])
+            except (KeyError, ValueError):
+                continue
+            del profile['stacks']
+            profiles.append(profile)
+    return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+
+def collapsed(profile):
+    """Brendan Gregg's collapsed-stack text (weights in microseconds)."""
+    return ''.join(f"{stack} {weight}\n" for stack, weight in sorted(profile['stacks'].items()))
+
+
+def speedscope(profile):
+    """The profile as a speedscope "sampled" file."""
+    frames, index, samples, weights = [], {}, [], []
+    for stack, weight in profile['stacks'].items():
+        sample = []
+        for label in stack.split(';'):
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(index[label])
+        samples.append(sample)
+        weights.append(weight)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": f"{profile['route']} ({profile['mode']})", "unit": "microseconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+        }],
+        "name": profile['id'],
+        "exporter": "electrical-api",
+    }
+
+
+def _requested():
+    return request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+
+
+def init_app(app):
+    """Install the profiling hooks on ``app`` if PROFILE_TOKENS is set."""
+    if not PROFILE_TOKENS:
+        return
+
+    @app.before_request
+    def _start_profile():
+        if not _requested() or not authorized():
+            return
+        mode = request.args.get('profile_mode', request.headers.get('X-Profile-Mode', 'sample'))
+        profiler = Tracer() if mode == 'trace' else Sampler(threading.get_ident())
+        g.profile = (profiler, 'trace' if mode == 'trace' else 'sample', time.perf_counter())
+        profiler.start()
+
+    def _finish():
+        profile = g.pop('profile', None)
+        if profile is None:
+            return None
+        profiler, mode, start = profile
+        stacks = profiler.stop()
+        return save(request.url_rule.rule if request.url_rule else request.path, mode,
+                    time.perf_counter() - start, stacks)
+
+    @app.after_request
+    def _stop_profile(response):
+        profile_id = _finish()
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exception):
+        _finish()  # unhandled exceptions skip after_request
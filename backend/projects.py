@@ -0,0 +1,125 @@
+"""Server-side transformer projects with incremental load totals.
+
+A project keeps its load list together with running totals of demand kW
+and kVA, so adding, updating or deleting one load and re-selecting the
+transformer costs O(1) instead of re-summing the whole list.
+
+Projects live in the memory of the worker process that created them
+(bounded to MAX_PROJECTS, least recently used evicted first), so run a
+single gunicorn worker or sticky sessions when using them.
+"""
+import math
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+import kernels
+import schemas
+
+MAX_PROJECTS = 1000
+
+
+def _growth_pct(value):
+    """growth_pct as /calculate-transformer parses it, and finite and >= 0."""
+    growth_pct = kernels.SCHEMAS['transformer'].parse({'growth_pct': value})['growth_pct']
+    if not (math.isfinite(growth_pct) and growth_pct >= 0):
+        raise schemas.ValidationError({"growth_pct": "must be a finite number >= 0"})
+    return growth_pct
+
+
+class TransformerProject:
+    """Load list of one project with running demand totals."""
+
+    def __init__(self, growth_pct=20):
+        self.growth_pct = _growth_pct(growth_pct)
+        self.loads = {}  # load_id -> (load, demand_kw, demand_kva)
+        self.total_kw = 0.0
+        self.total_kva = 0.0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _demand(load):
+        with np.errstate(all='ignore'):
+            demand_kw, demand_kva = kernels.transformer_demand(
+                float(load.get('kw', 0)), float(load.get('pf', 0.9)), float(load.get('demand_factor', 1.0)))
+        demand_kw, demand_kva = float(demand_kw), float(demand_kva)
+        if not (math.isfinite(demand_kw) and math.isfinite(demand_kva)):
+            raise ValueError("Load kw, pf and demand_factor must give a finite demand")
+        return demand_kw, demand_kva
+
+    def add(self, load):
+        """Add a load, returning its id within the project."""
+        demand_kw, demand_kva = self._demand(load)
+        with self._lock:
+            load_id = str(self._next_id)
+            self._next_id += 1
+            self.loads[load_id] = (dict(load), demand_kw, demand_kva)
+            self.total_kw += demand_kw
+            self.total_kva += demand_kva
+        return load_id
+
+    def update(self, load_id, load):
+        """Change some fields of a load (KeyError for unknown ids)."""
+        with self._lock:
+            old, old_kw, old_kva = self.loads[load_id]
+            merged = dict(old, **load)
+            demand_kw, demand_kva = self._demand(merged)
+            self.loads[load_id] = (merged, demand_kw, demand_kva)
+            self.total_kw += demand_kw - old_kw
+            self.total_kva += demand_kva - old_kva
+
+    def remove(self, load_id):
+        """Delete a load (KeyError for unknown ids)."""
+        with self._lock:
+            _, demand_kw, demand_kva = self.loads.pop(load_id)
+            self.total_kw -= demand_kw
+            self.total_kva -= demand_kva
+            if not self.loads:
+                # Drop accumulated rounding error whenever the list empties
+                self.total_kw = self.total_kva = 0.0
+
+    def set_growth(self, growth_pct):
+        self.growth_pct = _growth_pct(growth_pct)
+
+    def results(self):
+        """Same results as /calculate-transformer for the current load list."""
+        with self._lock:
+            columns = {'total_kw': [self.total_kw], 'total_kva': [self.total_kva], 'growth_pct': [self.growth_pct]}
+        results = kernels.format_row('transformer', kernels.evaluate('transformer', columns))
+        results['num_loads'] = len(self.loads)
+        return results
+
+
+_projects = OrderedDict()
+_lock = threading.Lock()
+
+
+def create(loads=(), growth_pct=20):
+    """Create a project from an initial load list, returning its id."""
+    project = TransformerProject(growth_pct)
+    for load in loads:
+        project.add(load)
+    project_id = uuid.uuid4().hex
+    with _lock:
+        _projects[project_id] = project
+        while len(_projects) > MAX_PROJECTS:
+            _projects.popitem(last=False)
+    return project_id, project
+
+
+def get(project_id):
+    """Look up a project, raising KeyError for unknown or evicted ids."""
+    with _lock:
+        project = _projects[project_id]
+        _projects.move_to_end(project_id)
+    return project
+
+
+def delete(project_id):
+    """Forget a project, raising KeyError for unknown ids."""
+    with _lock:
+        del _projects[project_id]
+
@@ -0,0 +1,158 @@
+"""PDF reports rendered straight into memory.
+
+``ReportPDF`` holds the page setup and text styles shared by every report,
+so each report function only lists its sections; the finished document is
+returned as bytes and never touches the disk.
+"""
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+import kernels
+
+NEXT_LINE = dict(new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+SECTION_TITLES = {
+    'ups': "UPS Sizing",
+    'power': "Cable / Power",
+    'transformer': "Transformer Sizing",
+    'generator': "Generator Sizing",
+    'pfc': "Power Factor Correction",
+    'lighting': "Lighting",
+    'grounding': "Grounding Resistance",
+    'cost': "Electricity Cost",
+    'motor': "Motor Starting",
+    'delta_u': "Delta U - Maximum Cable Length",
+    'min_ika': "Min Ika - Maximum Cable Length by Short Circuit",
+    'size_cable': "Cable Sizing",
+}
+
+
+def _latin1(text):
+    # The core PDF fonts only cover Latin-1 (no Δ, ², –)
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+
+class ReportPDF(FPDF):
+    """Report with a centred title and headed sections."""
+
+    def __init__(self, title):
+        super().__init__()
+        self.add_page()
+        self.set_font("Helvetica", 'B', 16)
+        self.cell(200, 10, txt=_latin1(title), align='C', **NEXT_LINE)
+        self.ln(10)
+
+    def section(self, heading, lines=()):
+        self.set_font("Helvetica", 'B', 12)
+        self.cell(200, 8, txt=_latin1(heading), **NEXT_LINE)
+        self.set_font("Helvetica", size=11)
+        for line in lines:
+            self.cell(200, 7, txt=_latin1(line), **NEXT_LINE)
+
+    def paragraph(self, text):
+        self.multi_cell(0, 7, txt=_latin1(text), **NEXT_LINE)
+
+    def table(self, header, rows):
+        """Grid of equal-width columns across the page, header in bold."""
+        width = self.epw / len(header)
+        self.set_font("Helvetica", 'B', 8)
+        for value in header:
+            self.cell(width, 5, txt=_latin1(value), border=1, align='C')
+        self.ln()
+        self.set_font("Helvetica", size=8)
+        for row in rows:
+            for value in row:
+                self.cell(width, 5, txt=_latin1(value), border=1, align='R')
+            self.ln()
+
+    def render(self):
+        return bytes(self.output())
+
+
+def ups_report(inputs, results):
+    """UPS report for parsed /calculate inputs and their results."""
+    ups_rating = results['ups_unit_min_kw']
+    required_ah = results['total_battery_ah']
+    system_setup = results['configuration']
+
+    pdf = ReportPDF("UPS Calculator Report")
+    pdf.section("Input Parameters", [
+        f"IT Load: {inputs['it_load_kw']} kW",
+        f"Runtime: {inputs['runtime_min']} min",
+        f"Redundancy Level: {inputs['redundancy_level']}",
+        f"Power Factor: {inputs['power_factor']}",
+        f"Growth Margin: {inputs['growth_margin']}%",
+        f"Safety Margin: {inputs['safety_margin']}%",
+    ])
+    pdf.ln(5)
+    pdf.section("Calculation Results", [
+        f"Configuration: {system_setup}",
+        f"UPS Capacity: {ups_rating:.2f} kW / {results['ups_unit_min_kva']:.2f} kVA",
+        f"Battery Capacity: {required_ah:.2f} Ah",
+        f"Heat Dissipation: {results['heat_dissipation_btu']:.0f} BTU/h",
+    ])
+    pdf.ln(5)
+    pdf.section("Engineering Recommendations")
+    pdf.paragraph(
+        f"1. Each UPS system must be at least {ups_rating:.2f} kW capacity.\n"
+        f"2. Battery array must provide at least {required_ah:.2f} Ah capacity.\n"
+        f"3. Recommended topology: {system_setup}."
+    )
+    return pdf.render()
+
+
+def check_sections(sections):
+    """Reject a project report request before it is queued."""
+    if not isinstance(sections, list) or not sections:
+        raise ValueError("sections must be a non-empty list")
+    for section in sections:
+        if section.get('calculator') not in SECTION_TITLES:
+            raise ValueError(f"Unknown calculator: {section.get('calculator')}")
+
+
+def _fields(values):
+    return ", ".join(f"{key} = {value}" for key, value in values.items())
+
+
+def project_report(title, sections):
+    """Report over any number of calculators for a whole project.
+
+    ``sections`` is a list of {"calculator": name, "inputs": body or [bodies]};
+    each calculator's rows go through its kernel in one call. Runs in the
+    report worker processes (see jobs.py).
+    """
+    pdf = ReportPDF(title)
+    for section in sections:
+        name = section['calculator']
+        rows = section.get('inputs', {})
+        rows = rows if isinstance(rows, list) else [rows]
+        for n, (inputs, results, error) in enumerate(kernels.run_many(name, rows), 1):
+            pdf.section(SECTION_TITLES[name] + (f" #{n}" if len(rows) > 1 else ""))
+            if inputs is not None:
+                pdf.paragraph("Inputs: " + _fields(inputs))
+            pdf.paragraph("Results: " + _fields(results) if error is None else f"Error: {error}")
+            pdf.ln(3)
+    return pdf.render()
+
+
+def max_length_report(params, columns):
+    """Grids of breaker ratings × sections per supply, conductor and curve (see lengthtables.py)."""
+    shape = tuple(len(params[axis]) for axis in ('breakers', 'characteristics', 'sections', 'cable_types', 'phases'))
+    lengths = columns['max_length_m'].reshape(shape)
+
+    pdf = ReportPDF("Maximum Cable Length Tables")
+    pdf.paragraph(
+        f"Catalog: {params['catalog']}. Each length is the shorter of the short-circuit limit "
+        f"(instantaneous trip at U0 = {kernels.U0} V) and the voltage drop limit "
+        f"({params['max_voltage_drop_pct']}% at {params['load_pct']}% of the breaker rating, "
+        f"power factor {params['power_factor']}). Lengths in m, sections in mm2."
+    )
+    for p, phases in enumerate(params['phases']):
+        for t, cable_type in enumerate(params['cable_types']):
+            for c, characteristic in enumerate(params['characteristics']):
+                pdf.ln(3)
+                pdf.section(f"{phases}, {cable_type}, curve {characteristic}")
+                pdf.table(["In (A)", *(f"{section:g}" for section in params['sections'])],
+                          [[f"{breaker:g}", *(f"{length:.1f}" for length in lengths[b, c, :, t, p])]
+                           for b, breaker in enumerate(params['breakers'])])
+    return pdf.render()
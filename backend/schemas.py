@@ -0,0 +1,150 @@
+"""Calculator input schemas, compiled once into validators.
+
+A calculator declares its inputs in ``kernels.CALCULATORS`` as
+``(name, type, default)`` fields, where the type is ``float``, ``int``,
+``str`` or a ``Choice`` of allowed strings (``finite`` and ``boolean``
+are stricter casts for parameters no kernel check sees). ``Schema`` turns
+those fields into
+
+* ``parse(body)``: the typed inputs of one JSON body, and
+* ``parse_columns(bodies)``: typed input columns of many bodies at once,
+  converting each field with one NumPy call when every value already has
+  the right type and falling back to value-by-value coercion otherwise.
+
+Instead of stopping at the first bad value, both collect every field that
+fails, as a ``ValidationError`` with ``errors = {field: message}`` for one
+body, or such a dict per failed row for many.
+"""
+import math
+
+import numpy as np
+
+
+def finite(value):
+    """float(value), rejecting NaN and infinities."""
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"expected a finite number, got {value!r}")
+    return value
+
+
+def boolean(value):
+    """A JSON true or false; bool() would read "false" as true."""
+    if not isinstance(value, bool):
+        raise ValueError(f"expected true or false, got {value!r}")
+    return value
+
+
+_NUMERIC = {float: (float, int), int: (int,)}
+_EXPECTED = {float: "a number", int: "an integer", str: "a string", finite: "a finite number",
+             boolean: "true or false"}
+
+
+class ValidationError(ValueError):
+    """Input fields that could not be coerced, as ``errors = {field: message}``."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f"{field}: {message}" for field, message in errors.items()))
+
+
+def error_body(error):
+    """{"detail": message}, plus the field errors of a ``ValidationError``."""
+    if isinstance(error, ValidationError):
+        return {"detail": str(error), "errors": error.errors}
+    return {"detail": str(error)}
+
+
+class Choice:
+    """String field limited to ``values`` (usable as a field type)."""
+
+    def __init__(self, *values):
+        self.values = tuple(values)
+        self._allowed = frozenset(values)
+
+    def __call__(self, value):
+        if not isinstance(value, str) or value not in self._allowed:
+            raise ValueError(f"expected one of {', '.join(self.values)}, got {value!r}")
+        return value
+
+    def __repr__(self):
+        return f"Choice{self.values}"
+
+    def invalid(self, column):
+        """Mask of the values of an array that are not allowed."""
+        return ~np.isin(np.asarray(column), self.values)
+
+
+def _message(cast, value):
+    if isinstance(cast, Choice):
+        return f"expected one of {', '.join(cast.values)}, got {value!r}"
+    return f"expected {_EXPECTED.get(cast, cast.__name__)}, got {value!r}"
+
+
+class Schema:
+    """Validator of one calculator's input fields."""
+
+    def __init__(self, fields):
+        self.fields = tuple((name, cast, default) for name, cast, default in fields)
+        self.names = tuple(name for name, _, _ in self.fields)
+        self._types = [(name, cast, default, _NUMERIC.get(cast)) for name, cast, default in self.fields]
+
+    def parse(self, data):
+        """Typed inputs of one request body (a dict); raises ``ValidationError``."""
+        if not isinstance(data, dict):
+            raise ValidationError({"body": "expected a JSON object"})
+        inputs = {}
+        errors = {}
+        for name, cast, default in self.fields:
+            value = data.get(name, default)
+            try:
+                inputs[name] = cast(value)
+            except (TypeError, ValueError, OverflowError):
+                errors[name] = _message(cast, value)
+        if errors:
+            raise ValidationError(errors)
+        return inputs
+
+    def parse_columns(self, rows):
+        """Typed input columns of the rows (dicts) that validate.
+
+        Returns ({field: array}, {row index: {field: message}}); the columns
+        hold the valid rows only, in order.
+        """
+        errors = {}
+        columns = {}
+        for name, cast, default, numeric in self._types:
+            values = [row.get(name, default) for row in rows]
+            types = set(map(type, values))
+            if numeric is not None and types.issubset(numeric):
+                try:
+                    columns[name] = np.asarray(values, dtype=cast)
+                    continue
+                except OverflowError:
+                    pass  # integers too large for int64: coerce one by one
+            if cast is str and types <= {str}:
+                columns[name] = np.asarray(values, dtype=str)
+                continue
+            if isinstance(cast, Choice) and types <= {str}:
+                column = np.asarray(values, dtype=str)
+                for i in np.flatnonzero(cast.invalid(column)).tolist():
+                    errors.setdefault(i, {})[name] = _message(cast, values[i])
+                columns[name] = column
+                continue
+            converted = []
+            for i, value in enumerate(values):
+                try:
+                    converted.append(cast(value))
+                except (TypeError, ValueError, OverflowError):
+                    errors.setdefault(i, {})[name] = _message(cast, value)
+                    converted.append(default)
+            try:
+                columns[name] = np.asarray(converted, dtype=cast if cast in (float, int) else str)
+            except OverflowError:
+                columns[name] = np.asarray(converted, dtype=float)
+
+        if errors:
+            keep = np.ones(len(rows), dtype=bool)
+            keep[list(errors)] = False
+            columns = {name: column[keep] for name, column in columns.items()}
+        return columns, errors
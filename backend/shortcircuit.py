@@ -0,0 +1,285 @@
+"""IEC 60909 short-circuit currents of a low-voltage network.
+
+The network is a medium-voltage source feeding one or more transformers
+and any radial or meshed arrangement of cables on their low-voltage side,
+described as branches between named buses:
+
+    {"source": {"bus": "grid", "voltage": 400, "sk_mva": 500, "rx": 0.1},
+     "branches": [
+        {"id": "TR1", "from": "grid", "to": "MSB", "type": "transformer", "kva": 630, "uk_pct": 6, "pkr_kw": 6.5},
+        {"id": "F1", "from": "MSB", "to": "DB1", "cable_mm2": 95, "cable_type": "Cu", "length_m": 40,
+         "x_ohm_km": 0.08, "parallel": 1, "breaker_a": 160, "characteristic": "C"}]}
+
+Every impedance is referred to the low-voltage side ``voltage``:
+
+* source: Z_Q = c_max·Un²/S"kQ, with R/X = ``rx``; it carries no zero
+  sequence current (the transformers are Dyn),
+* transformer: Z_T from uk and the load losses (1 % of the rating if
+  ``pkr_kw`` is missing), corrected by K_T = 0.95·c_max / (1 + 0.6·x_T);
+  Z0 = R_T + j0.95·X_T,
+* cable: R from the resistivities of kernels.py (70 °C) brought to 20 °C
+  for the maximum currents and to END_TEMPERATURE_C for the minimum ones,
+  X from ``x_ohm_km``; Z0 = 4·Z for a neutral of the same section.
+
+Per bus it returns Ik3max (c = 1.10, cold cables), the peak current
+ip = κ·√2·Ik3max (κ from R/X, ×1.15 up to 1.8 in meshed networks) and
+Ik1min (c = 0.95, hot cables). Ik1min at the end of a branch with a
+breaker is checked against the instantaneous trip current of its B/C/D
+curve, as /calculate-min-ika does.
+
+The bus impedance matrix is never formed. Its diagonal is the sum of the
+branch impedances along the path from the source in a spanning tree (one
+vectorised step per tree depth); every branch closing a mesh then
+corrects it through an m × m loop matrix (m = number of meshes), so
+large radial or lightly meshed networks solve in O(n·m).
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+import kernels
+
+C_MAX = 1.10
+C_MIN = 0.95
+END_TEMPERATURE_C = 160
+ALPHA = 0.004  # temperature coefficient of resistance, 1/K
+DEFAULT_X_OHM_KM = 0.08
+MAX_MESHES = 500
+
+
+def _number(data, key, default, owner):
+    """``data[key]`` (or ``default``) as a finite float; ``owner`` names the item in errors."""
+    try:
+        value = float(data.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{owner}: {key} must be a number") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{owner}: {key} must be a finite number")
+    return value
+
+
+def _r20(cable_type):
+    """Resistivity at 20 °C from the 70 °C constants of kernels.py."""
+    rho70 = np.where(cable_type == 'Cu', kernels.RESISTIVITY_CU, kernels.RESISTIVITY_AL)
+    return rho70 / (1 + ALPHA * (70 - 20))
+
+
+def build_graph(source_bus, branches):
+    """Bus ids, a BFS spanning tree from the source and the mesh-closing branches.
+
+    Returns (buses, parent bus, tree branch of each bus, levels, chords,
+    end buses of each branch), where levels groups the bus indices by
+    depth and chords lists the indices of the branches left out of the
+    tree.
+    """
+    if not branches:
+        raise ValueError("Network has no branches")
+    buses = {source_bus: 0}
+    ends = []
+    for b in branches:
+        pair = []
+        for end in ('from', 'to'):
+            if b.get(end) is None:
+                raise ValueError(f"Branch '{b.get('id', '?')}' has no '{end}' bus")
+            pair.append(buses.setdefault(str(b[end]), len(buses)))
+        if pair[0] == pair[1]:
+            raise ValueError(f"Branch '{b.get('id', '?')}' connects bus '{b['from']}' to itself")
+        ends.append(pair)
+
+    adjacency = [[] for _ in buses]
+    for k, (a, b) in enumerate(ends):
+        adjacency[a].append((b, k))
+        adjacency[b].append((a, k))
+
+    parent = np.full(len(buses), -1)
+    via = np.full(len(buses), -1)
+    depth = np.full(len(buses), -1)
+    depth[0] = 0
+    order = [0]
+    queue = deque(order)
+    while queue:
+        i = queue.popleft()
+        for j, k in adjacency[i]:
+            if depth[j] < 0:
+                depth[j] = depth[i] + 1
+                parent[j], via[j] = i, k
+                order.append(j)
+                queue.append(j)
+    if len(order) != len(buses):
+        names = list(buses)
+        orphans = [names[i] for i in np.flatnonzero(depth < 0)[:5]]
+        raise ValueError(f"Buses not connected to the source: {', '.join(orphans)}")
+
+    order = np.array(order)
+    levels = np.split(order, np.flatnonzero(np.diff(depth[order])) + 1)
+    chords = sorted(set(range(len(branches))) - set(via[1:].tolist()))
+    return list(buses), parent, via, levels, chords, np.array(ends)
+
+
+def _branch_impedances(branches, voltage):
+    """Positive and zero sequence impedances (max case, min case) of every branch."""
+    n = len(branches)
+    z1max, z1min, z0min = (np.zeros(n, dtype=complex) for _ in range(3))
+    transformer = np.array([b.get('type', 'cable') == 'transformer' for b in branches])
+    for k in np.flatnonzero(transformer):
+        b = branches[k]
+        owner = f"Transformer '{b.get('id', k)}'"
+        kva = _number(b, 'kva', 0, owner)
+        uk = _number(b, 'uk_pct', 6, owner) / 100
+        pkr_kw = _number(b, 'pkr_kw', kva * 0.01, owner)
+        if kva <= 0 or uk <= 0:
+            raise ValueError(f"Transformer '{b.get('id', k)}' needs kva > 0 and uk_pct > 0")
+        z_base = voltage ** 2 / (kva * 1000)
+        r = pkr_kw * 1000 * voltage ** 2 / (kva * 1000) ** 2
+        x = np.sqrt(max((uk * z_base) ** 2 - r ** 2, 0))
+        k_t = 0.95 * C_MAX / (1 + 0.6 * x / z_base)
+        z1max[k] = z1min[k] = k_t * complex(r, x)
+        z0min[k] = k_t * complex(r, 0.95 * x)
+
+    cables = [(f"Cable '{branches[k].get('id', k)}'", branches[k]) for k in np.flatnonzero(~transformer)]
+    if cables:
+        mm2 = np.array([_number(b, 'cable_mm2', 0, owner) for owner, b in cables])
+        length_m = np.array([_number(b, 'length_m', 0, owner) for owner, b in cables])
+        parallel = np.array([_number(b, 'parallel', 1, owner) for owner, b in cables])
+        x_ohm_km = np.array([_number(b, 'x_ohm_km', DEFAULT_X_OHM_KM, owner) for owner, b in cables])
+        cable_type = np.array([str(b.get('cable_type', 'Cu')) for _, b in cables])
+        unknown = kernels.CABLE_TYPES.invalid(cable_type)
+        if unknown.any():
+            owner = cables[int(np.argmax(unknown))][0]
+            raise ValueError(f"{owner}: cable_type must be one of {', '.join(kernels.CABLE_TYPES.values)}")
+        if np.any(length_m < 0) or np.any(parallel < 1) or np.any((length_m > 0) & (mm2 <= 0)):
+            raise ValueError("Cables need length_m >= 0, cable_mm2 > 0 and parallel >= 1")
+        # Length 0 branches are busbar connections without impedance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r20 = np.where(length_m > 0, _r20(cable_type) * length_m / (mm2 * parallel), 0.0)
+        x = x_ohm_km * length_m / 1000 / parallel
+        hot = 1 + ALPHA * (END_TEMPERATURE_C - 20)
+        z1max[~transformer] = r20 + 1j * x
+        z1min[~transformer] = r20 * hot + 1j * x
+        z0min[~transformer] = 4 * z1min[~transformer]
+    return transformer, z1max, z1min, z0min
+
+
+def _driving_point(root, z, parent, via, levels, chords, ends):
+    """Diagonal of the bus impedance matrix: tree path sums plus mesh corrections."""
+    n = len(parent)
+    total = np.empty(n, dtype=complex)
+    total[0] = root
+    for level in levels[1:]:
+        total[level] = total[parent[level]] + z[via[level]]
+    if not chords:
+        return total
+
+    # common[i, k]: impedance shared by the paths source -> i and source -> end bus of chord k
+    def common(targets):
+        on_path = np.zeros((n, len(targets)), dtype=bool)
+        columns = np.arange(len(targets))
+        current = np.asarray(targets)
+        while np.any(current >= 0):
+            alive = current >= 0
+            on_path[current[alive], columns[alive]] = True
+            current = np.where(alive, parent[np.maximum(current, 0)], -1)
+        shared = np.empty((n, len(targets)), dtype=complex)
+        shared[0] = root
+        for level in levels[1:]:
+            shared[level] = np.where(on_path[level], total[level, None], shared[parent[level]])
+        return shared
+
+    p, q = ends[chords].T
+    c = common(p) - common(q)
+    loop = c[p] - c[q] + np.diag(z[chords])
+    try:
+        x = np.linalg.solve(loop, c.T)
+    except np.linalg.LinAlgError:
+        raise ValueError("A mesh of the network has no impedance") from None
+    return total - np.einsum('ik,ki->i', c, x)
+
+
+def solve(source, branches):
+    """Ik3max, peak current and Ik1min of every bus, and the breaker trip checks."""
+    source = source or {}
+    source_bus = str(source.get('bus', 'grid'))
+    voltage = _number(source, 'voltage', 400, "Source")
+    sk_mva = _number(source, 'sk_mva', 500, "Source")
+    rx = _number(source, 'rx', 0.1, "Source")
+    if voltage <= 0 or sk_mva <= 0 or rx < 0:
+        raise ValueError("The source needs voltage > 0, sk_mva > 0 and rx >= 0")
+
+    buses, parent, via, levels, chords, ends = build_graph(source_bus, branches)
+    if len(chords) > MAX_MESHES:
+        raise ValueError(f"At most {MAX_MESHES} meshes are supported, got {len(chords)}")
+    transformer, z1max, z1min, z0min = _branch_impedances(branches, voltage)
+    touches_source = (ends == 0).any(axis=1)
+    if np.any(transformer != touches_source):
+        raise ValueError(f"Transformers must connect bus '{source_bus}' to the low-voltage network, "
+                         "and only transformers may")
+
+    z_q = C_MAX * voltage ** 2 / (sk_mva * 1e6)
+    x_q = z_q / np.sqrt(1 + rx ** 2)
+    root = complex(rx * x_q, x_q)
+    graph = (parent, via, levels, chords, ends)
+    zk_max = _driving_point(root, z1max, *graph)[1:]
+    zk_min = _driving_point(root, z1min, *graph)[1:]
+    zk_zero = _driving_point(0j, z0min, *graph)[1:]
+
+    ik3max = C_MAX * voltage / (kernels.SQRT3 * np.abs(zk_max))
+    ik1min = kernels.SQRT3 * C_MIN * voltage / np.abs(2 * zk_min + zk_zero)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_x = np.where(zk_max.imag > 0, zk_max.real / zk_max.imag, np.inf)
+    kappa = 1.02 + 0.98 * np.exp(-3 * r_x)
+    if chords:
+        kappa = np.minimum(1.15 * kappa, 1.8)
+    ip = kappa * np.sqrt(2) * ik3max
+    if not (np.isfinite(ik3max).all() and np.isfinite(ip).all() and np.isfinite(ik1min).all()):
+        raise ValueError("Short-circuit results are not finite numbers")
+
+    results = [
+        {
+            "bus": buses[i + 1],
+            "ik3max_ka": round(float(ik3max[i]) / 1000, 2),
+            "ip_ka": round(float(ip[i]) / 1000, 2),
+            "ik1min_ka": round(float(ik1min[i]) / 1000, 2),
+            "r_x": round(float(r_x[i]), 3),
+            "kappa": round(float(kappa[i]), 3),
+            "z_mohm": round(float(np.abs(zk_max[i])) * 1000, 2),
+        }
+        for i in range(len(buses) - 1)
+    ]
+
+    protected = [k for k, b in enumerate(branches) if float(b.get('breaker_a', 0) or 0) > 0]
+    breakers = []
+    if protected:
+        breaker_a = np.array([float(branches[k]['breaker_a']) for k in protected])
+        characteristic = np.array([str(branches[k].get('characteristic', 'C')) for k in protected])
+        ika_min = kernels.trip_multiplier(characteristic) * breaker_a
+        # checked at the far end of the branch
+        bus = np.where(ends[protected, 1] == 0, ends[protected, 0], ends[protected, 1])
+        available = ik1min[bus - 1]
+        breakers = [
+            {
+                "branch": str(branches[k].get('id', k)),
+                "bus": buses[bus[j]],
+                "breaker_a": float(breaker_a[j]),
+                "characteristic": str(characteristic[j]),
+                "ika_min_a": round(float(ika_min[j]), 1),
+                "ik1min_a": round(float(available[j]), 1),
+                "trip_ok": bool(available[j] >= ika_min[j]),
+            }
+            for j, k in enumerate(protected)
+        ]
+
+    worst = int(np.argmin(ik1min))
+    return {
+        "buses": results,
+        "breakers": breakers,
+        "summary": {
+            "buses": len(results),
+            "meshes": len(chords),
+            "max_ik3_ka": round(float(ik3max.max()) / 1000, 2),
+            "max_ip_ka": round(float(ip.max()) / 1000, 2),
+            "min_ik1_ka": results[worst]["ik1min_ka"],
+            "weakest_bus": results[worst]["bus"],
+            "breakers_not_tripping": sum(not b["trip_ok"] for b in breakers),
+        },
+    }
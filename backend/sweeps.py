@@ -0,0 +1,102 @@
+"""Parameter sweeps over any calculator.
+
+A sweep fixes some inputs and gives value lists or ranges for others:
+
+    {"calculator": "generator",
+     "inputs": {"total_load_kw": 250},
+     "sweep": {"altitude_m": {"start": 0, "stop": 3000, "num": 31},
+               "temperature_c": [30, 40, 50]}}
+
+The Cartesian product of the swept values becomes one set of input
+columns, so the whole grid goes through the kernel in a single call and
+comes back as columns (row-major, the last axis varying fastest) ready to
+chart. ``sensitivity`` gives, per numeric output and axis, the mean swing
+of the output across that axis with the other axes held fixed.
+"""
+import math
+import os
+import warnings
+
+import numpy as np
+
+import kernels
+import schemas
+
+MAX_POINTS = int(os.environ.get('SWEEP_MAX_POINTS', 100_000))
+# Kernels that simulate rather than evaluate a formula get a smaller grid
+MAX_POINTS_BY_CALCULATOR = {'battery': 2000, 'grounding': 20_000}
+
+
+def axis_values(field, spec, cast, limit=MAX_POINTS):
+    """Values of one swept input: a list, or {start, stop, num | step}."""
+    if isinstance(spec, list):
+        values = spec[:limit + 1]
+    elif isinstance(spec, dict) and 'num' in spec:
+        values = np.linspace(float(spec['start']), float(spec['stop']), min(int(spec['num']), limit + 1)).tolist()
+    elif isinstance(spec, dict) and 'step' in spec:
+        start, stop, step = float(spec['start']), float(spec['stop']), float(spec['step'])
+        if step <= 0 or not math.isfinite((stop - start) / step):
+            raise ValueError(f"{field}: step must be > 0")
+        count = min(int(math.floor((stop - start) / step + 1e-9)) + 1, limit + 1)
+        values = (start + step * np.arange(count)).tolist()
+    else:
+        raise ValueError(f"{field}: give a list of values or {{start, stop, num}} / {{start, stop, step}}")
+    if not values:
+        raise ValueError(f"{field}: no values to sweep")
+    try:
+        return [cast(value) for value in values]
+    except (TypeError, ValueError) as e:
+        raise schemas.ValidationError({field: str(e)}) from None
+
+
+def sweep(name, inputs, axes):
+    """Evaluate calculator ``name`` over the grid of ``axes`` around ``inputs``."""
+    calc = kernels.CALCULATORS[name]
+    casts = {field: cast for field, cast, _ in calc.fields}
+    unknown = [field for field in axes if field not in casts]
+    if not axes or unknown:
+        raise ValueError(f"Sweep at least one input of {name}: {', '.join(casts)}")
+
+    fields = list(axes)
+    values = []
+    size = 1
+    limit = MAX_POINTS_BY_CALCULATOR.get(name, MAX_POINTS)
+    for field in fields:
+        values.append(axis_values(field, axes[field], casts[field], limit))
+        size *= len(values[-1])
+        if size > limit:
+            raise ValueError(f"Sweep grid exceeds {limit} points")
+
+    columns = kernels.parse_inputs(name, inputs or {})
+    grids = np.meshgrid(*(np.asarray(v) for v in values), indexing='ij')
+    columns.update({field: grid.ravel() for field, grid in zip(fields, grids)})
+    results = kernels.evaluate(name, columns)
+    # Scalar-only outputs (e.g. echoed inputs) still need one value per point
+    results = {key: np.broadcast_to(column, (size,)) for key, column in results.items()}
+    formatted, valid, errors = kernels.format_columns(name, results)
+
+    shape = [len(v) for v in values]
+    sensitivity = {}
+    for key, digits in calc.outputs:
+        column = results[key]
+        if column.dtype.kind != 'f' or digits is None:
+            continue
+        grid = np.where(valid & np.isfinite(column), column, np.nan).reshape(shape)
+        with warnings.catch_warnings():
+            # nanmean / nanmax warn about all-NaN slices (every point invalid)
+            warnings.simplefilter('ignore', RuntimeWarning)
+            swings = {field: np.nanmean(np.nanmax(grid, axis=i) - np.nanmin(grid, axis=i))
+                      for i, field in enumerate(fields)}
+        sensitivity[key] = {field: round(float(s), 4) if math.isfinite(s) else None for field, s in swings.items()}
+
+    return {
+        "calculator": name,
+        "points": size,
+        "shape": shape,
+        "axes": dict(zip(fields, values)),
+        "valid": valid.tolist(),
+        "errors": errors,
+        "results": formatted,
+        "sensitivity": sensitivity,
+    }
+
@@ -0,0 +1,168 @@
+"""Energy cost of a metered load profile under a time-of-use tariff.
+
+``/calculate-cost`` prices a flat load; sites are billed on interval data.
+This module takes a year of interval-average kW values (8760 hourly,
+17520 half-hourly or 35040 quarter-hourly points, one day more in leap
+years) starting on 1 January 00:00 local time, and a tariff:
+
+    {"bands": [{"name": "peak", "price_kwh": 0.31, "hours": [8, 20], "days": "weekdays"},
+               {"name": "shoulder", "price_kwh": 0.22, "hours": [6, 22]},
+               {"name": "off-peak", "price_kwh": 0.14}],
+     "demand_charge": 9.5, "fixed_monthly": 25}
+
+Each interval is billed at the first band whose ``hours`` ([start, end),
+may wrap past midnight), ``days`` ("all", "weekdays", "weekends" or
+weekday numbers, Monday = 0) and ``months`` (1-12) all match; a band
+without conditions matches everything. ``demand_charge`` is per kW of the
+monthly peak interval. Every step is one array operation over the whole
+profile, so a year of 15-minute data takes a few milliseconds.
+"""
+import calendar
+import datetime
+
+import numpy as np
+
+import kernels
+
+INTERVALS_MIN = (60, 30, 15)
+DAY_SETS = {
+    'all': range(7),
+    'weekdays': range(5),
+    'weekends': (5, 6),
+}
+
+
+def read_profile(raw, mimetype):
+    """Profile kW values from an uploaded CSV or binary body.
+
+    CSV takes the last column of every line (so both "kw" and
+    "timestamp,kw" files work) and skips a header line; anything else is
+    read as little-endian float32.
+    """
+    if mimetype in ('text/csv', 'text/plain'):
+        lines = raw.decode('utf-8-sig').splitlines()
+        values = [line.replace(';', ',').rsplit(',', 1)[-1] for line in lines if line.strip()]
+        try:
+            float(values[0])
+        except (ValueError, IndexError):
+            values = values[1:]
+        return np.array(values, dtype=float)
+    if len(raw) % 4:
+        raise ValueError("Binary profiles must be little-endian float32 values")
+    return np.frombuffer(raw, dtype='<f4').astype(float)
+
+
+def _calendar(year, points):
+    """Interval length and month / weekday / minute-of-day of every interval."""
+    days = 366 if calendar.isleap(year) else 365
+    for interval in INTERVALS_MIN:
+        if points == days * 1440 // interval:
+            break
+    else:
+        raise ValueError(f"A {year} profile needs {days * 24}, {days * 48} or {days * 96} points, got {points}")
+
+    minute = np.arange(points) * interval
+    day = minute // 1440
+    month_starts = np.cumsum([0] + [calendar.monthrange(year, m)[1] for m in range(1, 12)])
+    month = np.searchsorted(month_starts, day, side='right') - 1
+    weekday = (datetime.date(year, 1, 1).weekday() + day) % 7
+    return interval, month, weekday, minute % 1440
+
+
+def _band_index(bands, month, weekday, minute_of_day):
+    """Index of the first matching band of every interval."""
+    index = np.full(len(month), -1)
+    for i, band in reversed(list(enumerate(bands))):
+        match = np.ones(len(month), dtype=bool)
+        if 'hours' in band:
+            start, end = (float(h) * 60 for h in band['hours'])
+            if start <= end:
+                match &= (minute_of_day >= start) & (minute_of_day < end)
+            else:
+                match &= (minute_of_day >= start) | (minute_of_day < end)
+        days = band.get('days', 'all')
+        if days not in DAY_SETS and not isinstance(days, list):
+            raise ValueError(f"Unknown days '{days}' in tariff band")
+        match &= np.isin(weekday, list(DAY_SETS.get(days, days) if isinstance(days, str) else days))
+        if 'months' in band:
+            match &= np.isin(month + 1, band['months'])
+        index[match] = i
+    if np.any(index < 0):
+        raise ValueError("Tariff bands do not cover every interval; add a band without conditions")
+    return index
+
+
+def profile_cost(profile_kw, params):
+    """Yearly and monthly energy, demand charge and CO2 of a load profile.
+
+    ``params`` holds the tariff (see the module docstring) plus optional
+    ``year`` (2025), ``efficiency`` (%, 100), ``power_factor`` (0.9),
+    ``co2_kg_per_kwh`` and, for single-band tariffs, ``price_kwh`` (0.22).
+    """
+    profile_kw = np.asarray(profile_kw, dtype=float)
+    if profile_kw.ndim != 1 or not np.all(np.isfinite(profile_kw)):
+        raise ValueError("Profile must be a flat list of finite kW values")
+
+    year = int(params.get('year', 2025))
+    efficiency = float(params.get('efficiency', 100)) / 100
+    power_factor = float(params.get('power_factor', 0.9))
+    co2_kg_per_kwh = float(params.get('co2_kg_per_kwh', kernels.CO2_KG_PER_KWH))
+    demand_charge = float(params.get('demand_charge', 0))
+    fixed_monthly = float(params.get('fixed_monthly', 0))
+    bands = params.get('bands') or [{"name": "flat", "price_kwh": params.get('price_kwh', 0.22)}]
+    names = [str(band.get('name', f"band {i + 1}")) for i, band in enumerate(bands)]
+    prices = np.array([float(band['price_kwh']) for band in bands])
+    if not 0 < power_factor <= 1:
+        raise ValueError("power_factor must be in (0, 1]")
+
+    interval, month, weekday, minute_of_day = _calendar(year, len(profile_kw))
+    band = _band_index(bands, month, weekday, minute_of_day)
+
+    # Same convention as /calculate-cost: the meter sees load / efficiency
+    kw = profile_kw / efficiency if efficiency > 0 else profile_kw
+    kwh = kw * (interval / 60)
+
+    band_kwh = np.bincount(month * len(bands) + band, weights=kwh, minlength=12 * len(bands)).reshape(12, -1)
+    monthly_kwh = band_kwh.sum(axis=1)
+    energy_eur = band_kwh @ prices
+    peak_kw = np.maximum.reduceat(kw, np.searchsorted(month, np.arange(12)))
+    demand_eur = peak_kw * demand_charge
+    total_eur = energy_eur + demand_eur + fixed_monthly
+    co2_t = monthly_kwh * co2_kg_per_kwh / 1000
+
+    yearly_kwh = float(monthly_kwh.sum())
+    yearly_peak = float(peak_kw.max())
+    yearly_total = float(total_eur.sum())
+    return {
+        "results": {
+            "points": len(kw),
+            "interval_min": interval,
+            "yearly_kwh": round(yearly_kwh, 2),
+            "yearly_energy_eur": round(float(energy_eur.sum()), 2),
+            "yearly_demand_eur": round(float(demand_eur.sum()), 2),
+            "yearly_fixed_eur": round(fixed_monthly * 12, 2),
+            "yearly_total_eur": round(yearly_total, 2),
+            "average_price_kwh": round(yearly_total / yearly_kwh, 4) if yearly_kwh > 0 else None,
+            "peak_kw": round(yearly_peak, 2),
+            "peak_kva": round(yearly_peak / power_factor, 2),
+            "load_factor": round(yearly_kwh / (yearly_peak * len(kw) * interval / 60), 3) if yearly_peak > 0 else None,
+            "co2_yearly_t": round(float(co2_t.sum()), 2),
+        },
+        "bands": {
+            name: {"kwh": round(float(band_kwh[:, i].sum()), 2), "eur": round(float(band_kwh[:, i].sum() * prices[i]), 2)}
+            for i, name in enumerate(names)
+        },
+        "monthly": [
+            {
+                "month": m + 1,
+                "kwh": round(float(monthly_kwh[m]), 2),
+                "peak_kw": round(float(peak_kw[m]), 2),
+                "energy_eur": round(float(energy_eur[m]), 2),
+                "demand_eur": round(float(demand_eur[m]), 2),
+                "total_eur": round(float(total_eur[m]), 2),
+                "co2_t": round(float(co2_t[m]), 3),
+                "band_kwh": {name: round(float(band_kwh[m, i]), 2) for i, name in enumerate(names)},
+            }
+            for m in range(12)
+        ],
+    }
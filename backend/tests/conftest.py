@@ -0,0 +1,6 @@
+"""Per-feature tests, next to bench.py's golden cases (run ``python -m pytest tests`` from backend/)."""
+import os
+import sys
+
+# The backend modules import each other as top-level modules (import kernels, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
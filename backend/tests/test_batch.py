@@ -0,0 +1,35 @@
+"""Batch endpoints: every row succeeds or fails on its own."""
+import json
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_batch_bad_rows_fail_alone(client):
+    body = b'{"load_kw": 5}\n{"load_kw": "\xff"}\nnot json\n[1]\n{"load_kw": "x"}\n{"load_kw": 7}\n'
+    response = client.post('/batch/delta_u', data=body, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.status_code == 200
+    assert [line['row'] for line in lines] == list(range(6))
+    assert [line['status'] for line in lines] == ['success', 'error', 'error', 'error', 'error', 'success']
+    assert lines[1]['detail'] == "Row is not valid UTF-8"
+    assert 'load_kw' in lines[4]['errors']
+
+
+def test_batch_csv_bad_encoding_fails_alone(client):
+    body = b'load_kw,phases\n5,3F_400V\n\xff,3F_400V\n6,1F_230V\n'
+    response = client.post('/batch/delta_u', data=body, content_type='text/csv')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['status'] for line in lines] == ['success', 'error', 'success']
+
+
+def test_transformer_loads_must_be_objects(client):
+    response = client.post('/calculate-transformer', json={"loads": "x"})
+    assert response.status_code == 400
+    assert 'loads' in response.get_json()['errors']
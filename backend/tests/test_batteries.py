@@ -0,0 +1,21 @@
+"""Battery discharge scenarios: request limits."""
+import pytest
+
+import batteries
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize('scenarios', ["x", [{}] * (batteries.MAX_SCENARIOS + 1)])
+def test_invalid_scenario_lists_are_rejected(client, scenarios):
+    response = client.post('/battery-discharge', json={"scenarios": scenarios})
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_check_scenarios_accepts_the_limit():
+    batteries.check_scenarios([{}] * batteries.MAX_SCENARIOS)
@@ -0,0 +1,65 @@
+"""Capacitor bank optimiser: the pruned search against brute force, and parameter validation."""
+import math
+
+import numpy as np
+import pytest
+
+import capbank
+import catalogs
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def _brute_force_cost(bank, kw, kvar, required, params):
+    """Yearly cost of one bank by simulating every interval directly."""
+    stages = bank[bank > 0]
+    masks = np.arange(2 ** len(stages))
+    levels = ((masks[:, None] >> np.arange(len(stages))) & 1) @ stages
+    order = np.argsort(levels, kind='stable')
+    levels, masks = levels[order], masks[order]
+    thresholds = levels - capbank.RESPONSE * stages.min()
+    chosen = (thresholds[1:, None] <= required).sum(axis=0)
+    switched = masks[chosen]
+    operations = sum(bin(int(x)).count('1') for x in switched[1:] ^ switched[:-1])
+    penalty = capbank._penalty(kvar - levels[chosen], kw, capbank._tan(params['penalty_pf']), 1.0,
+                               params['penalty_eur_kvarh'])
+    capex = (params['capex_eur_per_kvar'] * stages.sum() + params['stage_eur'] * len(stages)) / params[
+        'lifetime_years']
+    return capex + penalty + params['switching_eur'] * operations
+
+
+def test_capacitor_bank_matches_brute_force():
+    rng = np.random.default_rng(1)
+    hours = np.arange(8760)
+    kw = np.clip(60 + 40 * np.sin(hours * 2 * np.pi / 24) + rng.normal(0, 10, 8760), 0, None)
+    params = {"power_factor": 0.78, "target_pf": 0.95, "penalty_pf": 0.93, "penalty_eur_kvarh": 0.05,
+              "max_stages": 3, "capex_eur_per_kvar": 20, "stage_eur": 150, "lifetime_years": 15,
+              "switching_eur": 0.02, "year": 2025}
+    result = capbank.optimize(kw, params)
+
+    kvar = kw * capbank._tan(params['power_factor'])
+    required = np.clip(kvar - kw * capbank._tan(params['target_pf']), 0, None)
+    banks = capbank._banks(catalogs.CATALOGS[catalogs.DEFAULT].capacitors.values, 3, kvar.max())
+    costs = [_brute_force_cost(bank, kw, kvar, required, params) for bank in banks]
+    assert result['search']['banks'] == len(banks)
+    assert result['best']['annual_cost_eur'] == pytest.approx(min(costs), abs=0.01)
+    ranked = sorted(costs)[:capbank.ALTERNATIVES]
+    found = [result['best']['annual_cost_eur']] + [bank['annual_cost_eur'] for bank in result['alternatives']]
+    np.testing.assert_allclose(found, ranked, atol=0.01)
+
+
+@pytest.mark.parametrize('params, field', [
+    ({"avoid_resonance": "false"}, 'avoid_resonance'),
+    ({"lifetime_years": math.nan}, 'lifetime_years'),
+    ({"penalty_eur_kvarh": None}, 'penalty_eur_kvarh'),
+    ({"target_pf": 1.5}, 'target_pf'),
+    ({"catalog": "nope"}, 'catalog'),
+])
+def test_invalid_params_name_the_field(client, params, field):
+    response = client.post('/capacitor-bank', json={"profile_kw": [50.0] * 8760, **params})
+    assert response.status_code == 400
+    assert field in response.get_json()['errors']
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def _pair(downstream, upstream=None, ik_ka=25):
+    upstream = upstream or {"id": "Q0", "type": "MCCB", "rating_a": 1600, "isd": None, "ii": 15}
+    return {"devices": [upstream, {"id": "Q1", "upstream": "Q0", "ik_ka": ik_ka, **downstream}]}
+
+
+@pytest.mark.parametrize('rating_a', [16, 32])
+def test_faults_above_the_sampled_band_are_checked(client, rating_a):
+    # The upstream instantaneous pickup (0.9 × 15 × 1600 A = 21.6 kA) lies beyond 1000 × 16 A
+    board = _pair({"rating_a": rating_a, "characteristic": "C"})
+    pair = client.post('/selectivity', json=board).get_json()['pairs'][0]
+    assert pair['selectivity'] == 'partial'
+    assert pair['limit_ka'] == pytest.approx(21.6, rel=0.02)
+
+
+def test_fault_below_the_upstream_pickup_is_total(client):
+    pair = client.post('/selectivity', json=_pair({"rating_a": 16}, ik_ka=10)).get_json()['pairs'][0]
+    assert pair['selectivity'] == 'total'
+    assert pair['limit_ka'] is None
+
+
+def test_zero_short_time_delay_is_finite(client):
+    upstream = {"id": "Q0", "type": "MCCB", "rating_a": 250, "tsd_s": 0}
+    with np.errstate(all='raise'):
+        response = client.post('/selectivity', json=_pair({"rating_a": 32}, upstream, ik_ka=6))
+    assert response.status_code == 200
+    assert response.get_json()['pairs'][0]['selectivity'] in ('total', 'partial', 'none')
+
+
+@pytest.mark.parametrize('devices', [
+    [{"id": "Q0", "rating_a": 63}, {"id": "Q1", "upstream": "Q0", "ik_ka": -1}],
+    [{"id": "Q0", "upstream": "Q0"}],
+    [{"id": "Q0", "rating_a": "nan"}],
+])
+def test_invalid_boards_are_rejected(client, devices):
+    response = client.post('/selectivity', json={"devices": devices})
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+"""Earthing solver: the Toeplitz fast path, Dwight's formula and input validation."""
+import math
+
+import numpy as np
+import pytest
+
+import earthing
+import kernels
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_levinson_sums_match_dense_solves():
+    rng = np.random.default_rng(0)
+    size = 12
+    # Decaying first columns give positive definite Toeplitz matrices, like rod couplings
+    t = np.hstack([np.ones((3, 1)), rng.uniform(0.05, 0.4, (3, size - 1)) / np.arange(1, size)])
+    sums = earthing._levinson_sums(t)
+    for row in range(3):
+        index = np.abs(np.subtract.outer(np.arange(size), np.arange(size)))
+        matrix = t[row][index]
+        for n in range(1, size + 1):
+            expected = np.linalg.solve(matrix[:n, :n], np.ones(n)).sum()
+            assert sums[row, n - 1] == pytest.approx(expected, rel=1e-10)
+
+
+def test_single_rod_matches_dwight():
+    resistivity, length, diameter = 100.0, 3.0, 0.016
+    dwight = resistivity / (2 * math.pi * length) * (math.log(8 * length / diameter) - 1)
+    line = earthing.rod_line(resistivity, length, diameter, 3.0, 10)
+    assert line[0, 0] == pytest.approx(dwight, rel=0.01)
+    # Every added rod lowers the resistance, by less than a parallel connection would
+    assert np.all(np.diff(line[0]) < 0)
+    assert np.all(line[0, 1:] > line[0, 0] / np.arange(2, 11))
+
+
+@pytest.mark.parametrize('data', [
+    {"soil": {"resistivity": math.nan}, "rods": [{}]},
+    {"soil": {"resistivity": 100, "lower_resistivity": 50, "upper_thickness": math.nan}, "rods": [{}]},
+    {"rods": [{"x": math.inf}]},
+    {"conductors": [{"x2": 10, "diameter": math.nan}]},
+    {"segment_m": math.nan, "rods": [{}]},
+    {"fault_current_a": math.nan, "rods": [{}]},
+])
+def test_non_finite_inputs_are_rejected(data):
+    with pytest.raises(ValueError, match='finite'):
+        earthing.solve(data)
+
+
+def test_two_layer_soil_without_thickness_is_uniform_upper_layer():
+    rods = [{"x": 0}, {"x": 6}]
+    layered = earthing.solve({"soil": {"resistivity": 100, "lower_resistivity": 50}, "rods": rods})
+    uniform = earthing.solve({"soil": {"resistivity": 100}, "rods": rods})
+    assert layered['resistance_ohm'] == uniform['resistance_ohm']
+
+
+def test_design_spacings_are_deduplicated_and_capped():
+    params = {"soil": {"resistivity": 100}, "target_resistance": 10, "spacings": [6, 3, 6, 3.0], "max_rods": 16}
+    assert [row['spacing_m'] for row in earthing.design(params)['candidates']] == [3, 6]
+    with pytest.raises(ValueError, match='spacings'):
+        earthing.design({**params, "spacings": list(range(1, earthing.MAX_SPACINGS + 2))})
+    with pytest.raises(ValueError, match='spacings'):
+        earthing.design({**params, "spacings": [3, math.nan]})
+
+
+@pytest.mark.parametrize('route, body', [
+    ('/calculate-grounding', {"num_rods": kernels.MAX_RODS + 1}),
+    ('/grounding-grid', {"soil": {"resistivity": "NaN"}, "rods": [{}]}),
+    ('/grounding-design', {"spacings": "x"}),
+])
+def test_invalid_requests_are_rejected(client, route, body):
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
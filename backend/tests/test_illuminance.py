@@ -0,0 +1,18 @@
+"""Point-by-point illuminance: work limits."""
+import pytest
+
+import illuminance
+
+
+def test_points_times_luminaires_is_capped():
+    luminaires = [{"x": 1 + i % 50, "y": 1 + i // 50} for i in range(2000)]
+    data = {"room_length": 60, "room_width": 60, "room_height": 3, "grid_spacing": 0.06, "luminaires": luminaires}
+    # 1000 × 1000 points stay under MAX_GRID_POINTS; with 2000 luminaires the pairs do not
+    with pytest.raises(ValueError, match='pairs'):
+        illuminance.illuminance_grid(data)
+
+
+def test_large_grid_with_few_luminaires_is_allowed():
+    data = {"room_length": 60, "room_width": 60, "room_height": 3, "grid_spacing": 0.06,
+            "luminaires": [{"x": 30, "y": 30}]}
+    assert illuminance.illuminance_grid(data)['luminaires']['x'] == [30.0]
@@ -0,0 +1,38 @@
+"""Maximum cable length tables against the single calculators."""
+import pytest
+
+import kernels
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_max_length_table_matches_single_calculators(client):
+    body = {"breakers": [10, 32], "sections": [2.5, 16], "load_pct": 80}
+    rows = client.post('/max-length-table', json=body).get_json()['rows']
+    assert len(rows) == 2 * 3 * 2 * 2 * 2
+    for row in rows[::5]:
+        short_circuit = kernels.run('min_ika', {key: row[key] for key in (
+            'breaker_a', 'characteristic', 'cable_mm2', 'cable_type', 'phases')})
+        assert row['short_circuit_length_m'] == short_circuit['max_length_m']
+        voltage = 230 if row['phases'] == '1F_230V' else 400 * kernels.SQRT3
+        voltage_drop = kernels.run('delta_u', {
+            "load_kw": row['breaker_a'] * 0.8 * voltage * 0.9 / 1000, "phases": row['phases'],
+            "cable_mm2": row['cable_mm2'], "cable_type": row['cable_type']})
+        assert row['voltage_drop_length_m'] == voltage_drop['max_length_m']
+        assert row['max_length_m'] == min(row['short_circuit_length_m'], row['voltage_drop_length_m'])
+
+
+@pytest.mark.parametrize('body', [
+    {"characteristics": ["K"]},
+    {"breakers": []},
+    {"sections": [2.5, float('nan')]},
+    {"power_factor": 1.5},
+])
+def test_invalid_tables_are_rejected(client, body):
+    response = client.post('/max-length-table', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
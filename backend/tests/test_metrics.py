@@ -0,0 +1,23 @@
+"""Metrics registry: summing the per-process files."""
+import json
+import os
+import subprocess
+import sys
+
+import metrics
+
+
+def test_collect_drops_files_of_exited_processes(tmp_path):
+    registry = metrics.Registry(directory=str(tmp_path))
+    registry.inc('http_requests_total', {"route": "/x"})
+    group = os.path.dirname(registry._path())
+    os.makedirs(group)
+    exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+    stale = os.path.join(group, f"{exited.stdout.strip()}.json")
+    with open(stale, 'w') as f:
+        json.dump({"counters": [['http_requests_total', [['route', '/x']], 5]], "histograms": []}, f)
+
+    counters, _ = registry.collect()
+    assert counters == {('http_requests_total', (('route', '/x'),)): 1}
+    assert not os.path.exists(stale)
+    assert os.path.exists(registry._path())
@@ -0,0 +1,46 @@
+"""Monte Carlo runs: not-met sizes and the compute pool split."""
+import pytest
+
+import jobs
+import kernels
+import main
+import montecarlo
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_monte_carlo_keeps_unmet_targets_out_of_statistics(client):
+    response = client.post('/monte-carlo', json={
+        "calculator": "grounding", "samples": 5000, "seed": 1,
+        "inputs": {"soil_resistivity": {"dist": "lognormal", "median": 400, "sigma": 0.6},
+                   "target_resistance": 5, "num_rods": 4}}).get_json()
+    rods = response['outputs']['rods_needed']
+    assert rods['max'] <= kernels.MAX_RODS
+    assert 0 < rods['not_met_probability'] < 1
+    assert response['size']['not_met_probability'] == rods['not_met_probability']
+
+
+GROUNDING = {"soil_resistivity": {"dist": "lognormal", "median": 400, "sigma": 0.6}, "target_resistance": 5,
+             "num_rods": 4}
+
+
+def test_capped_calculators_reach_the_compute_pool(monkeypatch):
+    for name, limit in montecarlo.MAX_SAMPLES_BY_CALCULATOR.items():
+        assert limit >= montecarlo.PARALLEL_SAMPLES_BY_CALCULATOR[name]
+    samples = montecarlo.PARALLEL_SAMPLES_BY_CALCULATOR['grounding']
+    sequential = montecarlo.monte_carlo('grounding', GROUNDING, samples, seed=3)
+
+    calls = []
+
+    def run_parallel(fn, arg_tuples):
+        calls.append(len(arg_tuples))
+        return [fn(*args) for args in arg_tuples]
+
+    monkeypatch.setattr(jobs, 'COMPUTE_WORKERS', 4)
+    monkeypatch.setattr(jobs, 'run_parallel', run_parallel)
+    # Same seed, same chunks: the answer does not depend on where they run
+    assert montecarlo.monte_carlo('grounding', GROUNDING, samples, seed=3) == sequential
+    assert calls == [samples // montecarlo.CHUNK_SAMPLES_BY_CALCULATOR['grounding']]
@@ -0,0 +1,30 @@
+"""Feeder tree solver: node validation."""
+import math
+
+import pytest
+
+import main
+import network
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize('node, field', [
+    ({"power_factor": 1.2}, 'power_factor'),
+    ({"cable_type": "steel"}, 'cable_type'),
+    ({"load_kw": math.nan}, 'load_kw'),
+    ({"length_m": -1}, 'length_m'),
+])
+def test_invalid_nodes_name_the_field(client, node, field):
+    response = client.post('/feeder-tree', json={"nodes": [{"id": "A", "load_kw": 10, **node}]})
+    assert response.status_code == 400
+    assert f"nodes[0].{field}" in response.get_json()['errors']
+
+
+def test_valid_nodes_parse_to_columns():
+    columns = network.parse_nodes([{"id": "A", "load_kw": 10}, {"id": "B", "parent": "A", "cable_type": "Al"}])
+    assert columns['load_kw'].tolist() == [10, 0]
+    assert columns['cable_type'].tolist() == ['Cu', 'Al']
@@ -0,0 +1,28 @@
+"""Transformer projects: incremental totals and input validation."""
+import math
+
+import pytest
+
+import main
+import projects
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize('growth_pct', [math.nan, math.inf, -5, "x", None])
+def test_set_growth_rejects_invalid_values(growth_pct):
+    project = projects.TransformerProject()
+    with pytest.raises(ValueError):
+        project.set_growth(growth_pct)
+    assert project.growth_pct == 20
+
+
+def test_patch_with_invalid_growth_is_rejected(client):
+    project_id = client.post('/projects/transformer', json={"loads": [{"kw": 50}]}).get_json()['project_id']
+    response = client.patch(f'/projects/transformer/{project_id}', json={"growth_pct": -10})
+    assert response.status_code == 400
+    assert 'growth_pct' in response.get_json()['errors']
+    assert client.post('/projects/transformer', json={"growth_pct": "NaN"}).status_code == 400
@@ -0,0 +1,63 @@
+"""Short-circuit solver: the mesh-corrected driving points and input validation."""
+import math
+
+import numpy as np
+import pytest
+
+import bench
+import main
+import shortcircuit
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_driving_point_matches_dense_bus_impedance():
+    network = bench._short_circuit_network(30, meshes=4, seed=3)
+    branches = network['branches']
+    buses, parent, via, levels, chords, ends = shortcircuit.build_graph('grid', branches)
+    _, z1max, _, _ = shortcircuit._branch_impedances(branches, 400.0)
+    root = complex(0.0002, 0.0007)
+
+    admittance = np.zeros((len(buses), len(buses)), dtype=complex)
+    admittance[0, 0] = 1 / root
+    for (a, b), z in zip(ends, z1max):
+        admittance[[a, b], [a, b]] += 1 / z
+        admittance[a, b] -= 1 / z
+        admittance[b, a] -= 1 / z
+    expected = np.diag(np.linalg.inv(admittance))
+
+    assert len(chords) == 5  # the second transformer plus four cable meshes
+    actual = shortcircuit._driving_point(root, z1max, parent, via, levels, chords, ends)
+    np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+
+def _network(**cable):
+    return [{"id": "TR1", "from": "grid", "to": "MSB", "type": "transformer", "kva": 630},
+            {"id": "F1", "from": "MSB", "to": "DB1", "cable_mm2": 16, "length_m": 40, **cable}]
+
+
+def test_unknown_cable_type_is_rejected():
+    with pytest.raises(ValueError, match="Cable 'F1': cable_type"):
+        shortcircuit.solve({}, _network(cable_type='copper'))
+
+
+@pytest.mark.parametrize('source, branches', [
+    ({}, _network(length_m=math.nan)),
+    ({}, _network(cable_mm2=math.nan)),
+    ({}, _network(x_ohm_km=math.inf)),
+    ({"sk_mva": math.nan}, _network()),
+    ({"voltage": math.inf}, _network()),
+    ({}, [{**_network()[0], "uk_pct": math.nan}, _network()[1]]),
+])
+def test_non_finite_inputs_are_rejected(source, branches):
+    with pytest.raises(ValueError, match='finite'):
+        shortcircuit.solve(source, branches)
+
+
+def test_invalid_request_is_rejected(client):
+    response = client.post('/short-circuit', json={"branches": _network(cable_type='copper')})
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
@@ -279,12 +279,17 @@ function App() {
 
   const handleGeneratePDF = async () => {
     try {
-      await axios.post(`${API_URL}/generate-pdf`, {
+      const r = await axios.post(`${API_URL}/generate-pdf`, {
         it_load_kw: parseFloat(itLoad), runtime_min: parseInt(runtimeMin),
         redundancy_level: redundancyLevel, power_factor: parseFloat(powerFactor),
         growth_margin: parseInt(growthMargin), safety_margin: parseInt(safetyMargin)
-      })
-      alert('PDF generated successfully!')
+      }, { responseType: 'blob' })
+      const url = URL.createObjectURL(r.data)
+      const a = document.createElement('a')
+      a.href = url
+      a.download = 'ups_report.pdf'
+      a.click()
+      URL.revokeObjectURL(url)
     } catch { alert('Failed to generate PDF') }
   }
 